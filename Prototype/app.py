@@ -1,113 +1,39 @@
-from flask import Flask, render_template, send_file, url_for
+from flask import Flask, render_template, request, send_file, url_for
 import pandas as pd
 import os
 from datetime import datetime
 import pytz
-import json
+
+import dashboard_data
+import plots
 
 app = Flask(__name__)
 
-# Define the path to the forecast summary file
-FORECAST_SUMMARY_PATH = os.path.join('Prototype', 'forecast_summary.csv')
+# Set PROTOTYPE_PLOTS=0 to skip PNG charts and rely on the JSON series only
+RENDER_PLOTS = os.getenv('PROTOTYPE_PLOTS', '1') != '0'
+
+FORECAST_SUMMARY_PATH = dashboard_data.FORECAST_SUMMARY_PATH
+
+# Forecast data is loaded once per run and shared by every request
+DATA = dashboard_data.DashboardData()
+
+
+def request_as_of():
+    """Optional ?as_of=YYYY-MM-DD reference date for next-action queries"""
+    as_of = request.args.get('as_of')
+    try:
+        return datetime.strptime(as_of, '%Y-%m-%d').strftime('%Y-%m-%d') if as_of else None
+    except ValueError:
+        return None
+
 
 @app.route('/')
 def home():
-    # Read the CSV file
     try:
-        df = pd.read_csv(FORECAST_SUMMARY_PATH)
-        # Best-effort: compute overstock_excess from JSON if missing
-        if 'overstock_excess' not in df.columns:
-            try:
-                with open('forecast_status.json', 'r') as f:
-                    status_data = json.load(f)
-                warehouse_to_excess = {}
-                for warehouse_name, data in status_data.items():
-                    over_threshold = data.get('over_threshold', 0)
-                    overstock_info = data.get('overstock_info', [])
-                    total_excess = sum(item.get('forecasted_stock', 0) - over_threshold for item in overstock_info)
-                    warehouse_to_excess[warehouse_name] = total_excess
-                df['overstock_excess'] = df['warehouse_name'].map(warehouse_to_excess).fillna(0)
-            except Exception:
-                df['overstock_excess'] = 0
-
-        # Create human-readable status text
-        def make_status(row):
-            over_excess = float(row.get('overstock_excess', 0) or 0)
-            under_need = float(row.get('stocks to order', 0) or 0)
-            over_excess_int = int(round(over_excess))
-            under_need_int = int(round(under_need))
-            if over_excess_int > 0 and under_need_int == 0:
-                return f"Overstocking by {over_excess_int} units"
-            if under_need_int > 0 and over_excess_int == 0:
-                return f"Understocking by {under_need_int} units"
-            if over_excess_int > 0 and under_need_int > 0:
-                return f"Mixed: over by {over_excess_int}, under by {under_need_int} units"
-            return "On target"
-
-        df['status'] = df.apply(make_status, axis=1)
-
-        # Load detailed status to compute next actions
-        try:
-            with open('forecast_status.json', 'r') as f:
-                status_data = json.load(f)
-        except Exception:
-            status_data = {}
-
-        def compute_next_action(warehouse_name: str) -> str:
-            data = status_data.get(warehouse_name, {})
-            under_threshold = data.get('under_threshold', None)
-            over_threshold = data.get('over_threshold', None)
-            next_under = None
-            next_over = None
-            # Find next understock event
-            for item in sorted(data.get('understock_info', []), key=lambda x: x.get('date', '9999-12-31')):
-                try:
-                    short_by = max(0, (under_threshold or 0) - float(item.get('forecasted_stock', 0)))
-                except Exception:
-                    short_by = 0
-                next_under = (item.get('date'), int(round(short_by)))
-                break
-            # Find next overstock event
-            for item in sorted(data.get('overstock_info', []), key=lambda x: x.get('date', '9999-12-31')):
-                try:
-                    excess_by = max(0, float(item.get('forecasted_stock', 0)) - (over_threshold or 0))
-                except Exception:
-                    excess_by = 0
-                next_over = (item.get('date'), int(round(excess_by)))
-                break
-
-            if next_under and (not next_over or next_under[0] <= next_over[0]):
-                return f"Order {next_under[1]} by {next_under[0]}"
-            if next_over:
-                return f"Reduce {next_over[1]} by {next_over[0]}"
-            return "No action needed"
-
-        df['next_action'] = df['warehouse_name'].apply(compute_next_action)
-
-        # Reorder columns: warehouse_name, status, next_action, then the rest
-        cols = df.columns.tolist()
-        ordered = ['warehouse_name', 'status', 'next_action'] + [c for c in cols if c not in ['warehouse_name', 'status', 'next_action']]
-        df = df[ordered]
-        # Convert for template rendering
-        rows = df.to_dict(orient='records')
-        # Compute dashboard stats
-        try:
-            num_over = sum(1 for r in rows if isinstance(r.get('status'), str) and 'Overstocking' in r['status'])
-            num_under = sum(1 for r in rows if isinstance(r.get('status'), str) and 'Understocking' in r['status'])
-            num_mixed = sum(1 for r in rows if isinstance(r.get('status'), str) and 'Mixed' in r['status'])
-            num_ok = sum(1 for r in rows if isinstance(r.get('status'), str) and 'On target' in r['status'])
-            total_order = int(round(sum(float(r.get('stocks to order', 0) or 0) for r in rows)))
-            total_excess = int(round(sum(float(r.get('overstock_excess', 0) or 0) for r in rows)))
-            dashboard_stats = {
-                'over': num_over,
-                'under': num_under,
-                'mixed': num_mixed,
-                'ok': num_ok,
-                'total_order': total_order,
-                'total_excess': total_excess
-            }
-        except Exception:
-            dashboard_stats = {'over': 0, 'under': 0, 'mixed': 0, 'ok': 0, 'total_order': 0, 'total_excess': 0}
+        snapshot = DATA.snapshot()
+        as_of = request_as_of()
+        rows = snapshot.rows_as_of(as_of) if as_of else snapshot.rows
+        dashboard_stats = snapshot.dashboard_stats
 
         # Get current timestamp in IST using timezone
         ist = pytz.timezone('Asia/Kolkata')
@@ -136,8 +62,7 @@ def download_file():
 @app.route('/api/summary')
 def api_summary():
     try:
-        df = pd.read_csv(FORECAST_SUMMARY_PATH)
-        return df.to_json(orient='records')
+        return DATA.snapshot().summary_json
     except FileNotFoundError:
         return {"error": "forecast_summary.csv not found"}, 404
 
@@ -145,57 +70,24 @@ def api_summary():
 def warehouse_detail(warehouse_slug: str):
     # Decode warehouse name and load data
     warehouse_name = warehouse_slug.replace('_', ' ')
+    as_of = request_as_of()
     try:
-        with open('forecast_status.json', 'r') as f:
-            status_data = json.load(f)
-    except Exception:
-        status_data = {}
-
-    try:
-        df = pd.read_csv(FORECAST_SUMMARY_PATH)
-        row = df[df['warehouse_name'] == warehouse_name].iloc[0].to_dict()
+        snapshot = DATA.snapshot()
     except Exception:
-        row = {}
-
-    data = status_data.get(warehouse_name, {})
+        snapshot = None
+    row = snapshot.summary_rows.get(warehouse_name, {}) if snapshot else {}
+    data = snapshot.status_data.get(warehouse_name, {}) if snapshot else {}
     under_threshold = data.get('under_threshold')
     over_threshold = data.get('over_threshold')
 
-    # Compute next events
-    def parse_date(d):
-        try:
-            return datetime.strptime(d, '%Y-%m-%d')
-        except Exception:
-            return None
-
-    next_under = None
-    for item in sorted(data.get('understock_info', []), key=lambda x: x.get('date', '9999-12-31')):
-        d = parse_date(item.get('date'))
-        if not d:
-            continue
-        short_by = max(0, (under_threshold or 0) - float(item.get('forecasted_stock', 0)))
-        next_under = {'date': item.get('date'), 'short_by': int(round(short_by)), 'forecasted': float(item.get('forecasted_stock', 0))}
-        break
-
-    next_over = None
-    for item in sorted(data.get('overstock_info', []), key=lambda x: x.get('date', '9999-12-31')):
-        d = parse_date(item.get('date'))
-        if not d:
-            continue
-        excess_by = max(0, float(item.get('forecasted_stock', 0)) - (over_threshold or 0))
-        next_over = {'date': item.get('date'), 'excess_by': int(round(excess_by)), 'forecasted': float(item.get('forecasted_stock', 0))}
-        break
-
-    # Build image path
-    image_filename = f"plots/forecast_{warehouse_slug}.png"
-    image_url = url_for('static', filename=image_filename)
+    # Chart image is rendered on first request by warehouse_plot
+    image_url = url_for('warehouse_plot', warehouse_slug=warehouse_slug) if RENDER_PLOTS else None
 
     # Load forecast series for inline chart (future only)
-    forecast_csv_path = os.path.join('Prototype', 'forecast_data', f'forecast_{warehouse_slug}.csv')
     chart_labels = []
     chart_values = []
     try:
-        df_fore = pd.read_csv(forecast_csv_path)
+        df_fore, _ = snapshot.series(warehouse_name, warehouse_slug)
         # Expect columns: ds, yhat, trend, weekly, diwali
         chart_labels = [str(d) for d in df_fore['ds'].tolist()]
         chart_values = [float(v) for v in df_fore['yhat'].tolist()]
@@ -203,29 +95,18 @@ def warehouse_detail(warehouse_slug: str):
         chart_labels = []
         chart_values = []
 
-    # Prepare simple lists of upcoming events for details
-    under_list = sorted(data.get('understock_info', []), key=lambda x: x.get('date', '9999-12-31'))[:5]
-    over_list = sorted(data.get('overstock_info', []), key=lambda x: x.get('date', '9999-12-31'))[:5]
-
-    # Compute upcoming "perfect" days (within limits)
-    perfect_list = []
-    first_perfect = None
-    try:
-        if under_threshold is not None and over_threshold is not None and 'ds' in df_fore.columns and 'yhat' in df_fore.columns:
-            for _, r in df_fore.sort_values('ds').iterrows():
-                try:
-                    y = float(r['yhat'])
-                    if (y >= float(under_threshold)) and (y <= float(over_threshold)):
-                        date_str = str(r['ds'])
-                        perfect_list.append({'date': date_str, 'forecasted_stock': y})
-                        if first_perfect is None:
-                            first_perfect = {'date': date_str, 'forecasted_stock': y}
-                except Exception:
-                    continue
-            perfect_list = perfect_list[:5]
-    except Exception:
-        perfect_list = []
-        first_perfect = None
+    # Upcoming events and "perfect" days (within limits) from the precomputed index
+    if snapshot is not None:
+        events = snapshot.event_index(warehouse_name, warehouse_slug)
+    else:
+        events = dashboard_data.EventIndex(data)
+        events.set_perfect([], [])
+    next_under = events.next_under(as_of)
+    next_over = events.next_over(as_of)
+    under_list = events.upcoming_under(as_of)
+    over_list = events.upcoming_over(as_of)
+    perfect_list = events.upcoming_perfect(as_of)
+    first_perfect = perfect_list[0] if perfect_list else None
 
     ist = pytz.timezone('Asia/Kolkata')
     timestamp = datetime.now(ist).strftime('%Y-%m-%d %I:%M %p IST')
@@ -247,5 +128,38 @@ def warehouse_detail(warehouse_slug: str):
         first_perfect=first_perfect
     )
 
+@app.route('/warehouse/<warehouse_slug>/plot.png')
+def warehouse_plot(warehouse_slug: str):
+    if not RENDER_PLOTS:
+        return "Chart rendering is disabled. Use /api/warehouse/<name>/series instead.", 404
+    warehouse_name = warehouse_slug.replace('_', ' ')
+    try:
+        snapshot = DATA.snapshot()
+        data = snapshot.status_data[warehouse_name]
+    except Exception:
+        return f"No forecast found for {warehouse_name}.", 404
+
+    forecast_df, history_df = snapshot.series(warehouse_name, warehouse_slug)
+    path = plots.cached_plot(warehouse_slug, warehouse_name, forecast_df, history_df,
+                             data['over_threshold'], data['under_threshold'])
+    if path is None:
+        return f"No forecast data found for {warehouse_name}.", 404
+    return send_file(os.path.abspath(path), mimetype='image/png')
+
+@app.route('/api/warehouse/<warehouse_slug>/series')
+def api_warehouse_series(warehouse_slug: str):
+    warehouse_name = warehouse_slug.replace('_', ' ')
+    try:
+        snapshot = DATA.snapshot()
+    except Exception:
+        return {"error": "No forecast run found. Please run the forecast script first."}, 404
+    forecast_df, history_df = snapshot.series(warehouse_name, warehouse_slug)
+    if forecast_df is None:
+        return {"error": f"No forecast data found for {warehouse_name}"}, 404
+    series = plots.series_json(forecast_df, history_df)
+    data = snapshot.status_data.get(warehouse_name, {})
+    series['thresholds'] = {'under': data.get('under_threshold'), 'over': data.get('over_threshold')}
+    return series
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5550)
\ No newline at end of file
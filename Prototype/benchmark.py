@@ -0,0 +1,220 @@
+import pandas as pd
+import numpy as np
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import forecast_logic
+import forecasters
+import ingest
+
+# Rolling-origin backtest defaults: forecast the same horizon the nightly run uses
+default_horizon = forecast_logic.forecast_period_days
+default_folds = 3
+default_step_days = 28
+
+report_path = os.path.join('Prototype', 'benchmark_report.json')
+
+
+def load_series(path):
+    """Ingest an inventory CSV and return ``({warehouse: df_daily}, ingest_stats)``"""
+    df, stats = ingest.load_inventory(path)
+    series = {warehouse: forecast_logic.daily_series(df_wh)
+              for warehouse, df_wh in df.groupby('warehouse_name', sort=False, observed=True)}
+    return series, stats
+
+
+def scale_series(series, factor, seed=0):
+    """Synthetic copies of every series so there are ``factor`` times as many.
+
+    Each copy is the original rescaled by a random factor with added noise,
+    so engines can't short-circuit identical inputs.
+    """
+    if factor <= 1:
+        return dict(series)
+    rng = np.random.default_rng(seed)
+    scaled = dict(series)
+    for warehouse, df_daily in series.items():
+        y = df_daily['y'].to_numpy(dtype='float64')
+        noise_scale = 0.05 * np.nanstd(y)
+        gains = rng.uniform(0.8, 1.2, size=(factor - 1, 1))
+        copies = y[None, :] * gains + rng.normal(0, noise_scale, size=(factor - 1, len(y)))
+        for k, copy in enumerate(copies, start=1):
+            scaled[f'{warehouse} #{k}'] = pd.DataFrame({'ds': df_daily['ds'], 'y': copy})
+    return scaled
+
+
+def backtest_cutoffs(series, horizon, folds, step_days):
+    """Training cut-off dates, oldest first, leaving ``horizon`` days after the last one"""
+    last_date = max(df_daily['ds'].max() for df_daily in series.values())
+    latest = last_date - pd.Timedelta(days=horizon)
+    return [latest - pd.Timedelta(days=step_days * i) for i in reversed(range(folds))]
+
+
+def run_engine(engine, series, horizon, folds, step_days):
+    """Rolling-origin backtest of one engine; meant to run in a fresh process
+    so that peak RSS is attributable to this engine alone."""
+    if engine == forecasters.ProphetForecaster.name:
+        import prophet  # configures its own loggers on import, so load it before quietening them
+    logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
+    logging.getLogger('prophet').setLevel(logging.WARNING)
+
+    started = time.perf_counter()
+    fit_seconds = 0.0
+    predict_seconds = 0.0
+    abs_errors = {w: [] for w in series}
+    pct_errors = {w: [] for w in series}
+
+    for cutoff in backtest_cutoffs(series, horizon, folds, step_days):
+        train = {w: df_daily[df_daily['ds'] <= cutoff] for w, df_daily in series.items()}
+        test_ds = pd.date_range(cutoff + pd.Timedelta(days=1), periods=horizon, freq='D')
+        forecaster = forecasters.get_forecaster(engine, **forecast_logic.engine_kwargs(engine))
+
+        t0 = time.perf_counter()
+        forecaster.fit(train)
+        t1 = time.perf_counter()
+        predictions = forecaster.predict(test_ds)
+        t2 = time.perf_counter()
+        fit_seconds += t1 - t0
+        predict_seconds += t2 - t1
+
+        for warehouse, df_daily in series.items():
+            if warehouse not in predictions:
+                continue
+            actual = df_daily.set_index('ds')['y'].reindex(test_ds).to_numpy(dtype='float64')
+            predicted = predictions[warehouse]['yhat'].to_numpy(dtype='float64')
+            observed = ~np.isnan(actual)
+            error = np.abs(actual[observed] - predicted[observed])
+            abs_errors[warehouse].append(error)
+            nonzero = actual[observed] != 0
+            pct_errors[warehouse].append(error[nonzero] / np.abs(actual[observed][nonzero]))
+
+    per_warehouse = {}
+    for warehouse in series:
+        errors = np.concatenate(abs_errors[warehouse]) if abs_errors[warehouse] else np.array([])
+        pcts = np.concatenate(pct_errors[warehouse]) if pct_errors[warehouse] else np.array([])
+        per_warehouse[warehouse] = {
+            'mae': float(errors.mean()) if errors.size else None,
+            'mape': float(pcts.mean()) if pcts.size else None,
+            'points': int(errors.size),
+        }
+
+    maes = [m['mae'] for m in per_warehouse.values() if m['mae'] is not None]
+    mapes = [m['mape'] for m in per_warehouse.values() if m['mape'] is not None]
+    return {
+        'engine': engine,
+        'series': len(series),
+        'forecasted': sum(1 for m in per_warehouse.values() if m['points']),
+        'wall_seconds': time.perf_counter() - started,
+        'fit_seconds': fit_seconds,
+        'predict_seconds': predict_seconds,
+        'peak_rss_mb': ingest.peak_rss_mb(),
+        'mae': float(np.mean(maes)) if maes else None,
+        'mape': float(np.mean(mapes)) if mapes else None,
+        'per_warehouse': per_warehouse,
+    }
+
+
+def run_isolated(engine, series, horizon, folds, step_days):
+    """run_engine in a freshly spawned process, so each engine gets its own RSS high-water mark"""
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(run_engine, engine, series, horizon, folds, step_days).result()
+
+
+def find_regressions(report, baseline, max_slowdown, max_mape_increase):
+    """Compare a report with a previous one; returns a list of human-readable regressions"""
+    previous = {(r['engine'], r['scale']): r for r in baseline.get('results', [])}
+    regressions = []
+    for result in report['results']:
+        before = previous.get((result['engine'], result['scale']))
+        if before is None:
+            continue
+        label = f"{result['engine']} x{result['scale']}"
+        old_time = before['fit_seconds'] + before['predict_seconds']
+        new_time = result['fit_seconds'] + result['predict_seconds']
+        if old_time > 0 and new_time > old_time * max_slowdown:
+            regressions.append(f"{label}: fit+predict {new_time:.2f}s vs {old_time:.2f}s (> {max_slowdown:.2f}x)")
+        if before['mape'] is not None and result['mape'] is not None and result['mape'] > before['mape'] + max_mape_increase:
+            regressions.append(f"{label}: MAPE {result['mape']:.4f} vs {before['mape']:.4f} (> +{max_mape_increase})")
+    return regressions
+
+
+def print_summary(report):
+    print(f"{'engine':<16}{'scale':>6}{'series':>8}{'wall s':>10}{'fit s':>10}{'predict s':>11}{'peak MB':>10}{'MAE':>10}{'MAPE':>9}")
+    for r in report['results']:
+        peak = f"{r['peak_rss_mb']:.0f}" if r['peak_rss_mb'] is not None else 'n/a'
+        mae = f"{r['mae']:.2f}" if r['mae'] is not None else 'n/a'
+        mape = f"{r['mape']:.2%}" if r['mape'] is not None else 'n/a'
+        print(f"{r['engine']:<16}{r['scale']:>6}{r['series']:>8}{r['wall_seconds']:>10.2f}{r['fit_seconds']:>10.2f}"
+              f"{r['predict_seconds']:>11.3f}{peak:>10}{mae:>10}{mape:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backtest forecasting engines for speed and accuracy')
+    parser.add_argument('--input', default=os.path.join('Prototype', 'inventory_data_large.csv'),
+                        help='Inventory CSV to backtest on')
+    parser.add_argument('--engines', nargs='+', default=sorted(forecasters.ENGINES), choices=sorted(forecasters.ENGINES))
+    parser.add_argument('--scales', nargs='+', type=int, default=[1],
+                        help='Synthetic scale factors, e.g. 1 10 100 (x number of warehouses)')
+    parser.add_argument('--horizon', type=int, default=default_horizon, help='Days forecast per fold')
+    parser.add_argument('--folds', type=int, default=default_folds, help='Rolling origins per backtest')
+    parser.add_argument('--step', type=int, default=default_step_days, help='Days between origins')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for synthetic scaling')
+    parser.add_argument('--output', default=report_path, help='Where to write the JSON report')
+    parser.add_argument('--baseline', help='Previous report to check for regressions')
+    parser.add_argument('--max-slowdown', type=float, default=1.5,
+                        help='Allowed fit+predict time ratio against the baseline')
+    parser.add_argument('--max-mape-increase', type=float, default=0.01,
+                        help='Allowed absolute MAPE increase against the baseline')
+    args = parser.parse_args()
+
+    series, ingest_stats = load_series(args.input)
+    report = {
+        'run_at': datetime.now().isoformat(timespec='seconds'),
+        'input': args.input,
+        'horizon': args.horizon,
+        'folds': args.folds,
+        'step_days': args.step,
+        'ingest': ingest_stats,
+        'results': [],
+    }
+
+    for scale in args.scales:
+        scaled = scale_series(series, scale, seed=args.seed)
+        for engine in args.engines:
+            print(f"Backtesting {engine} on {len(scaled)} series (x{scale})...")
+            try:
+                result = run_isolated(engine, scaled, args.horizon, args.folds, args.step)
+            except Exception as e:
+                print(f"Error benchmarking {engine} x{scale}: {e}")
+                continue
+            result['scale'] = scale
+            report['results'].append(result)
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print_summary(report)
+    print(f"Report saved to '{args.output}'")
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        regressions = find_regressions(report, baseline, args.max_slowdown, args.max_mape_increase)
+        if regressions:
+            print("Regressions against baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("No regressions against baseline.")
+
+
+if __name__ == '__main__':
+    main()
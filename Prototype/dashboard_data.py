@@ -0,0 +1,285 @@
+import pandas as pd
+import numpy as np
+import json
+import os
+import threading
+from bisect import bisect_left
+from datetime import datetime
+
+import forecast_store
+import plots
+
+FORECAST_SUMMARY_PATH = os.path.join('Prototype', 'forecast_summary.csv')
+FORECAST_STATUS_PATH = 'forecast_status.json'
+
+
+def make_status(row):
+    """Human-readable status text for a summary row"""
+    over_excess = float(row.get('overstock_excess', 0) or 0)
+    under_need = float(row.get('stocks to order', 0) or 0)
+    over_excess_int = int(round(over_excess))
+    under_need_int = int(round(under_need))
+    if over_excess_int > 0 and under_need_int == 0:
+        return f"Overstocking by {over_excess_int} units"
+    if under_need_int > 0 and over_excess_int == 0:
+        return f"Understocking by {under_need_int} units"
+    if over_excess_int > 0 and under_need_int > 0:
+        return f"Mixed: over by {over_excess_int}, under by {under_need_int} units"
+    return "On target"
+
+
+class EventIndex:
+    """Sorted stock events and in-band ("perfect") forecast days for one warehouse.
+
+    Dates are kept as ISO strings, which sort chronologically, so the first
+    event on or after a reference date is a bisect on the date list rather
+    than a sort of the whole event list on every request.
+    """
+
+    def __init__(self, data):
+        self.under_threshold = data.get('under_threshold')
+        self.over_threshold = data.get('over_threshold')
+        self.under_dates, self.under_stock, self.under_items = _sorted_events(data.get('understock_info', []))
+        self.over_dates, self.over_stock, self.over_items = _sorted_events(data.get('overstock_info', []))
+        self.perfect_dates = None
+        self.perfect_stock = None
+
+    def set_perfect(self, dates, stock):
+        """In-band forecast days, sorted by date"""
+        self.perfect_dates = dates
+        self.perfect_stock = stock
+
+    def set_forecast(self, ds, yhat):
+        """Compute the in-band days from a forecast series"""
+        ds = np.asarray([str(d) for d in ds])
+        yhat = np.asarray(yhat, dtype='float64')
+        if self.under_threshold is None or self.over_threshold is None:
+            self.set_perfect([], [])
+            return
+        order = np.argsort(ds, kind='stable')
+        ds, yhat = ds[order], yhat[order]
+        mask = (yhat >= float(self.under_threshold)) & (yhat <= float(self.over_threshold))
+        self.set_perfect(ds[mask].tolist(), yhat[mask].tolist())
+
+    def next_under(self, as_of=None):
+        i = bisect_left(self.under_dates, as_of) if as_of else 0
+        if i >= len(self.under_dates):
+            return None
+        short_by = max(0, (self.under_threshold or 0) - self.under_stock[i])
+        return {'date': self.under_dates[i], 'short_by': int(round(short_by)), 'forecasted': self.under_stock[i]}
+
+    def next_over(self, as_of=None):
+        i = bisect_left(self.over_dates, as_of) if as_of else 0
+        if i >= len(self.over_dates):
+            return None
+        excess_by = max(0, self.over_stock[i] - (self.over_threshold or 0))
+        return {'date': self.over_dates[i], 'excess_by': int(round(excess_by)), 'forecasted': self.over_stock[i]}
+
+    def next_action(self, as_of=None):
+        """Next order/reduce action on or after ``as_of`` (default: the first one)"""
+        next_under = self.next_under(as_of)
+        next_over = self.next_over(as_of)
+        if next_under and (not next_over or next_under['date'] <= next_over['date']):
+            return f"Order {next_under['short_by']} by {next_under['date']}"
+        if next_over:
+            return f"Reduce {next_over['excess_by']} by {next_over['date']}"
+        return "No action needed"
+
+    def upcoming_under(self, as_of=None, limit=5):
+        i = bisect_left(self.under_dates, as_of) if as_of else 0
+        return self.under_items[i:i + limit]
+
+    def upcoming_over(self, as_of=None, limit=5):
+        i = bisect_left(self.over_dates, as_of) if as_of else 0
+        return self.over_items[i:i + limit]
+
+    def upcoming_perfect(self, as_of=None, limit=5):
+        if not self.perfect_dates:
+            return []
+        i = bisect_left(self.perfect_dates, as_of) if as_of else 0
+        return [{'date': d, 'forecasted_stock': y}
+                for d, y in zip(self.perfect_dates[i:i + limit], self.perfect_stock[i:i + limit])]
+
+
+def _sorted_events(items):
+    """``(dates, forecasted_stock, items)`` sorted by date; entries without a valid date are dropped"""
+    events = []
+    for item in items:
+        try:
+            datetime.strptime(item.get('date'), '%Y-%m-%d')
+            events.append((item['date'], float(item.get('forecasted_stock', 0)), item))
+        except Exception:
+            continue
+    events.sort(key=lambda e: e[0])
+    return [e[0] for e in events], [e[1] for e in events], [e[2] for e in events]
+
+
+def run_perfect_days(run, indexes):
+    """Fill in every warehouse's in-band days with one mask over the run's forecast table"""
+    names = [w for w in run.index if w in indexes]
+    if not names:
+        return
+    table = run.forecast_table()
+    bounds = np.array([run.index[w]['forecast'] for w in names], dtype='int64').reshape(-1, 2)
+    lengths = bounds[:, 1] - bounds[:, 0]
+    under = np.array([np.nan if indexes[w].under_threshold is None else indexes[w].under_threshold for w in names], dtype='float64')
+    over = np.array([np.nan if indexes[w].over_threshold is None else indexes[w].over_threshold for w in names], dtype='float64')
+
+    # Rows are stored per warehouse in date order, so each warehouse's hits stay sorted
+    yhat = np.asarray(table['yhat'])
+    rows = np.concatenate([np.arange(start, stop) for start, stop in bounds])
+    row_under = np.repeat(under, lengths)
+    row_over = np.repeat(over, lengths)
+    hit = rows[(yhat[rows] >= row_under) & (yhat[rows] <= row_over)]
+    dates = np.datetime_as_string(np.asarray(table['ds'])[hit], unit='D')
+    stock = yhat[hit]
+    for w, (start, stop) in zip(names, bounds):
+        lo, hi = np.searchsorted(hit, [start, stop])
+        indexes[w].set_perfect(dates[lo:hi].tolist(), stock[lo:hi].tolist())
+
+
+def compute_dashboard_stats(rows):
+    try:
+        return {
+            'over': sum(1 for r in rows if isinstance(r.get('status'), str) and 'Overstocking' in r['status']),
+            'under': sum(1 for r in rows if isinstance(r.get('status'), str) and 'Understocking' in r['status']),
+            'mixed': sum(1 for r in rows if isinstance(r.get('status'), str) and 'Mixed' in r['status']),
+            'ok': sum(1 for r in rows if isinstance(r.get('status'), str) and 'On target' in r['status']),
+            'total_order': int(round(sum(float(r.get('stocks to order', 0) or 0) for r in rows))),
+            'total_excess': int(round(sum(float(r.get('overstock_excess', 0) or 0) for r in rows))),
+        }
+    except Exception:
+        return {'over': 0, 'under': 0, 'mixed': 0, 'ok': 0, 'total_order': 0, 'total_excess': 0}
+
+
+class DashboardSnapshot:
+    """Everything the dashboard derives from one forecast run, computed once.
+
+    ``run`` is the forecast store run, or None when the data came from the
+    legacy forecast_status.json / forecast_summary.csv files.
+    """
+
+    def __init__(self, run, status_data, summary_df):
+        self.run = run
+        self.status_data = status_data
+        self.summary_df = summary_df
+        df = summary_df.copy()
+        # Best-effort: compute overstock_excess from the status data if missing
+        if 'overstock_excess' not in df.columns:
+            try:
+                warehouse_to_excess = {}
+                for warehouse_name, data in status_data.items():
+                    over_threshold = data.get('over_threshold', 0)
+                    overstock_info = data.get('overstock_info', [])
+                    warehouse_to_excess[warehouse_name] = sum(item.get('forecasted_stock', 0) - over_threshold for item in overstock_info)
+                df['overstock_excess'] = df['warehouse_name'].map(warehouse_to_excess).fillna(0)
+            except Exception:
+                df['overstock_excess'] = 0
+        df['status'] = df.apply(make_status, axis=1)
+        self.events = {w: EventIndex(data) for w, data in status_data.items()}
+        if run is not None:
+            run_perfect_days(run, self.events)
+        df['next_action'] = df['warehouse_name'].map(self.next_action)
+
+        # Reorder columns: warehouse_name, status, next_action, then the rest
+        first = ['warehouse_name', 'status', 'next_action']
+        df = df[first + [c for c in df.columns if c not in first]]
+        self.rows = df.to_dict(orient='records')
+        self.dashboard_stats = compute_dashboard_stats(self.rows)
+        self.summary_json = summary_df.to_json(orient='records')
+        self.summary_rows = {row['warehouse_name']: row for row in summary_df.to_dict(orient='records')}
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def next_action(self, warehouse_name, as_of=None):
+        events = self.events.get(warehouse_name)
+        return events.next_action(as_of) if events else "No action needed"
+
+    def rows_as_of(self, as_of):
+        """Dashboard rows with next_action taken from ``as_of`` onwards"""
+        return [dict(row, next_action=self.next_action(row['warehouse_name'], as_of)) for row in self.rows]
+
+    def event_index(self, warehouse_name, warehouse_slug):
+        """EventIndex with perfect days filled in (from the legacy CSV series if needed)"""
+        events = self.events.get(warehouse_name)
+        if events is None:
+            events = self.events.setdefault(warehouse_name, EventIndex({}))
+        if events.perfect_dates is None:
+            forecast_df, _ = self.series(warehouse_name, warehouse_slug)
+            if forecast_df is not None and 'ds' in forecast_df.columns and 'yhat' in forecast_df.columns:
+                events.set_forecast(forecast_df['ds'], forecast_df['yhat'])
+            else:
+                events.set_perfect([], [])
+        return events
+
+    def series(self, warehouse_name, warehouse_slug):
+        """``(forecast_df, history_df)`` for one warehouse, loaded on first use"""
+        with self._lock:
+            if warehouse_name not in self._series:
+                self._series[warehouse_name] = self._load_series(warehouse_name, warehouse_slug)
+            return self._series[warehouse_name]
+
+    def _load_series(self, warehouse_name, warehouse_slug):
+        if self.run is None:
+            return plots.load_csv_series(warehouse_slug)
+        forecast_rows = self.run.forecast(warehouse_name)
+        if forecast_rows is None:
+            return None, None
+        history_rows = self.run.history(warehouse_name)
+        return (pd.DataFrame(forecast_store.as_columns(forecast_rows)),
+                pd.DataFrame(forecast_store.as_columns(history_rows)))
+
+
+class DashboardData:
+    """Process-wide cache of the current DashboardSnapshot.
+
+    Each call to :meth:`snapshot` only stats the store's CURRENT marker and
+    the legacy files; the data is reloaded when one of them changes (a new
+    run was published or the forecast script rewrote its outputs).
+    """
+
+    def __init__(self, store=None, summary_path=FORECAST_SUMMARY_PATH, status_path=FORECAST_STATUS_PATH):
+        self.store = store or forecast_store.ForecastStore()
+        self.summary_path = summary_path
+        self.status_path = status_path
+        self._key = None
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def _version(self):
+        key = []
+        for path in (self.store.current_path, self.summary_path, self.status_path):
+            try:
+                st = os.stat(path)
+                key.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                key.append(None)
+        return tuple(key)
+
+    def snapshot(self):
+        """Current snapshot; raises FileNotFoundError / EmptyDataError like the files would"""
+        key = self._version()
+        if key == self._key:
+            return self._snapshot
+        with self._lock:
+            if key != self._key:
+                self._snapshot = self._load()
+                self._key = key
+            return self._snapshot
+
+    def _load(self):
+        try:
+            run = self.store.open()
+        except Exception:
+            run = None
+        if run is not None:
+            if not run.summary:
+                raise pd.errors.EmptyDataError("forecast run has no summary rows")
+            return DashboardSnapshot(run, run.status, pd.DataFrame(run.summary))
+        summary_df = pd.read_csv(self.summary_path)
+        try:
+            with open(self.status_path, 'r') as f:
+                status_data = json.load(f)
+        except Exception:
+            status_data = {}
+        return DashboardSnapshot(None, status_data, summary_df)
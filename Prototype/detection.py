@@ -0,0 +1,93 @@
+import pandas as pd
+import numpy as np
+
+
+def _fmt(values):
+    """Vectorized '{:.2f}' formatting"""
+    return np.char.mod('%.2f', np.asarray(values, dtype='float64')).astype(object)
+
+
+def _join_reasons(parts, fallback):
+    """Join per-row reason columns with ' and ', skipping empty ones"""
+    joined = np.full(len(fallback), '', dtype=object)
+    for part in parts:
+        has_part = part != ''
+        has_joined = joined != ''
+        joined = np.where(has_part & has_joined, joined + ' and ' + part, np.where(has_part, part, joined))
+    return np.where(joined == '', fallback, joined)
+
+
+def _reason(mask, text):
+    return np.where(mask, text, '').astype(object)
+
+
+def classify_frame(frame):
+    """Vectorized over/understock classification of a stacked forecast frame.
+
+    ``frame`` needs ``ds, yhat, trend, weekly, diwali`` plus per-row
+    ``over_threshold``, ``under_threshold``, ``avg_weekly`` and
+    ``historical_mean``. Returns ``(overstock, understock)`` frames with
+    ``date``, ``forecasted_stock`` and ``explanation`` columns (and every
+    other input column, e.g. ``warehouse_name``), in input row order.
+    """
+    yhat = frame['yhat'].to_numpy(dtype='float64')
+    weekly = frame['weekly'].to_numpy(dtype='float64')
+    trend = frame['trend'].to_numpy(dtype='float64')
+    diwali = frame['diwali'].to_numpy(dtype='float64')
+    avg_weekly = frame['avg_weekly'].to_numpy(dtype='float64')
+    hist_mean = frame['historical_mean'].to_numpy(dtype='float64')
+
+    over_mask = yhat > frame['over_threshold'].to_numpy(dtype='float64')
+    under_mask = yhat < frame['under_threshold'].to_numpy(dtype='float64')
+
+    # Overstock reasons
+    o = over_mask
+    over_parts = [
+        _reason(weekly[o] > avg_weekly[o],
+                'seasonal peak (weekly component: ' + _fmt(weekly[o]) + ' > average ' + _fmt(avg_weekly[o]) + ')'),
+        _reason(diwali[o] > 0,
+                'Diwali effect (component: ' + _fmt(diwali[o]) + ')'),
+        _reason(trend[o] > hist_mean[o],
+                'upward trend contribution (' + _fmt(trend[o]) + ' > historical mean ' + _fmt(hist_mean[o]) + ')'),
+    ]
+    overstock = frame.loc[o].copy()
+    overstock['explanation'] = _join_reasons(over_parts, np.full(int(o.sum()), 'combined model factors exceeding threshold', dtype=object))
+
+    # Understock reasons
+    u = under_mask
+    under_parts = [
+        _reason(weekly[u] < avg_weekly[u],
+                'seasonal trough (weekly component: ' + _fmt(weekly[u]) + ' < average ' + _fmt(avg_weekly[u]) + ')'),
+        _reason(trend[u] < hist_mean[u],
+                'downward trend contribution (' + _fmt(trend[u]) + ' < historical mean ' + _fmt(hist_mean[u]) + ')'),
+    ]
+    understock = frame.loc[u].copy()
+    understock['explanation'] = _join_reasons(under_parts, np.full(int(u.sum()), 'combined model factors below threshold', dtype=object))
+
+    for events in (overstock, understock):
+        events['date'] = pd.to_datetime(events['ds']).dt.strftime('%Y-%m-%d')
+        events['forecasted_stock'] = events['yhat']
+    return overstock, understock
+
+
+def _to_records(events):
+    return [
+        {'date': d, 'forecasted_stock': y, 'explanation': e}
+        for d, y, e in zip(events['date'].tolist(), events['forecasted_stock'].tolist(), events['explanation'].tolist())
+    ]
+
+
+def detect_stock_events(forecast_df, over_threshold, under_threshold, historical_mean):
+    """Classify one warehouse's forecast into ``(overstock_info, understock_info)`` lists.
+
+    Each entry is ``{'date', 'forecasted_stock', 'explanation'}`` as written
+    to forecast_status.json.
+    """
+    frame = forecast_df[['ds', 'yhat', 'trend', 'weekly', 'diwali']].copy()
+    frame['over_threshold'] = over_threshold
+    frame['under_threshold'] = under_threshold
+    frame['avg_weekly'] = frame['weekly'].mean()
+    frame['historical_mean'] = historical_mean
+    overstock, understock = classify_frame(frame)
+    return _to_records(overstock), _to_records(understock)
+
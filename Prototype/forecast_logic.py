@@ -1,214 +1,328 @@
 import pandas as pd
 import numpy as np
-from prophet import Prophet
 import json
-from datetime import timedelta
-import matplotlib.pyplot as plt
 import os
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import detection
+import forecast_store
+import forecasters
+import ingest
+import model_cache
 
 # Load and prepare data
 input_file = 'inventory_data.csv'  # Absolute path
-try:
-    df = pd.read_csv(input_file)
-except FileNotFoundError:
-    print(f"Error: The file {input_file} was not found. Please check the path.")
-    exit(1)
-except Exception as e:
-    print(f"Error loading {input_file}: {e}")
-    exit(1)
-
-# Parse date and time with adjustment for hours > 23
-df['date'] = pd.to_datetime(df['date'], format='%Y-%m-%d')
-df['time_hours'] = df['time'].apply(lambda x: int(x.split(':')[0]))
-df['time_minutes'] = df['time'].apply(lambda x: int(x.split(':')[1]))
-df['adjusted_time'] = df.apply(lambda row: f"{(row['time_hours'] % 24):02d}:{row['time_minutes']:02d}", axis=1)
-df['datetime'] = pd.to_datetime(df['date'].astype(str) + ' ' + df['adjusted_time'], format='%Y-%m-%d %H:%M', errors='coerce')
-if df['datetime'].isnull().any():
-    print(f"Warning: {df['datetime'].isnull().sum()} rows had invalid datetime values and were dropped.")
-    df = df.dropna(subset=['datetime'])
-
-# Calculate warehouse-specific statistics
-df['volume'] = df['x_length_m'] * df['y_length_m'] * df['z_height_m']
-warehouse_stats = df.groupby('warehouse_name').agg({'stock': ['mean', 'min', 'max'], 'volume': 'mean'}).reset_index()
-warehouse_stats.columns = ['warehouse_name', 'mean_stock', 'min_stock', 'max_stock', 'mean_volume']
-
-# Define thresholds: overstock = mean + 35, understock = mean - 60, unique per warehouse
-warehouse_stats['over_threshold'] = warehouse_stats['mean_stock'] + 35
-warehouse_stats['under_threshold'] = warehouse_stats['mean_stock'] - 60
-warehouse_stats['under_threshold'] = warehouse_stats['under_threshold'].apply(lambda x: max(x, 0))  # Avoid negative
-
-# Dictionary for quick lookup
-thresholds = dict(zip(warehouse_stats['warehouse_name'], 
-                      zip(warehouse_stats['over_threshold'], warehouse_stats['under_threshold'])))
 
 # Configurable forecast period (e.g., Diwali season)
 forecast_start_date = pd.to_datetime('2025-10-20')  # Set desired start month/day
 forecast_period_days = 40  # Set duration (e.g., Oct 20 to Nov 30, 2025)
+current_time = pd.to_datetime('2025-08-19 16:07:00')  # Updated to current time (04:07 PM IST)
 
-# Process each warehouse
-results = {}
-for warehouse in df['warehouse_name'].unique():
-    df_wh = df[df['warehouse_name'] == warehouse].sort_values('datetime')
-    df_daily = df_wh.resample('D', on='datetime')['stock'].mean().reset_index()
-    df_daily = df_daily.rename(columns={'datetime': 'ds', 'stock': 'y'})
+json_path = 'forecast_status.json'
+
+# Prophet hyperparameters; part of the model cache key, so changing them forces a cold refit
+prophet_params = {
+    'weekly_seasonality': True,
+    'daily_seasonality': False,
+    'yearly_seasonality': False,
+    'seasonality_prior_scale': 5,
+    'seasonality_mode': 'additive',
+    'seasonalities': [{'name': 'diwali', 'period': 365.25, 'fourier_order': 5}],
+}
+model_cache_dir = os.path.join('Prototype', 'model_cache')
 
-    # Fit Prophet model with adjusted parameters
+
+def load_inventory(path):
+    """Read the inventory CSV with parsed datetime and volume columns"""
     try:
-        model = Prophet(weekly_seasonality=True, daily_seasonality=False, yearly_seasonality=False, seasonality_prior_scale=5, seasonality_mode='additive')
-        model.add_seasonality(name='diwali', period=365.25, fourier_order=5)
-        model.fit(df_daily)
+        df, _ = ingest.load_inventory(path)
+    except FileNotFoundError:
+        print(f"Error: The file {path} was not found. Please check the path.")
+        exit(1)
     except Exception as e:
-        print(f"Error fitting Prophet model for {warehouse}: {e}")
-        continue
+        print(f"Error loading {path}: {e}")
+        exit(1)
+    return df
+
+
+def compute_thresholds(df):
+    """Per-warehouse stock statistics plus over/under thresholds"""
+    warehouse_stats = df.groupby('warehouse_name', observed=True).agg({'stock': ['mean', 'min', 'max'], 'volume': 'mean'}).reset_index()
+    warehouse_stats.columns = ['warehouse_name', 'mean_stock', 'min_stock', 'max_stock', 'mean_volume']
+
+    # Define thresholds: overstock = mean + 35, understock = mean - 60, unique per warehouse
+    warehouse_stats['over_threshold'] = warehouse_stats['mean_stock'] + 35
+    warehouse_stats['under_threshold'] = warehouse_stats['mean_stock'] - 60
+    warehouse_stats['under_threshold'] = warehouse_stats['under_threshold'].apply(lambda x: max(x, 0))  # Avoid negative
+    return warehouse_stats
+
+
+def daily_series(df_wh):
+    """Daily mean stock for one warehouse as a Prophet-style (ds, y) frame"""
+    df_wh = df_wh.sort_values('datetime')
+    df_daily = df_wh.resample('D', on='datetime')['stock'].mean().reset_index()
+    return df_daily.rename(columns={'datetime': 'ds', 'stock': 'y'})
+
+
+def future_dates():
+    """Dates to forecast: forecast_period_days starting at forecast_start_date"""
+    return pd.date_range(forecast_start_date, periods=forecast_period_days, freq='D')
 
-    # Forecast from the specified start date for the given period
+
+def engine_kwargs(engine, cache_dir=None):
+    """Constructor arguments for a forecasting engine"""
+    if engine == forecasters.ProphetForecaster.name:
+        return {'params': prophet_params, 'cache_dir': cache_dir}
+    return {}
+
+
+def finish_warehouse(warehouse, df_daily, forecast_df, over_threshold, under_threshold, mean_stock, write_csv=False):
+    """Classify one warehouse's forecast; returns its status entry.
+
+    The series themselves go to the forecast store once every warehouse is
+    done; ``write_csv`` additionally writes the legacy per-warehouse CSVs.
+    Charts are not drawn here: Prototype/app.py renders them on first view.
+    """
+    # Flag forecast windows that start before the latest data point
     last_date = df_daily['ds'].max()
-    current_time = pd.to_datetime('2025-08-19 16:07:00')  # Updated to current time (04:07 PM IST)
     start_forecast = max(last_date, current_time) if last_date else current_time
     if forecast_start_date < start_forecast:
         print(f"Warning: Forecast start date {forecast_start_date} is before last data point {start_forecast}. Using {forecast_start_date}.")
-    future = model.make_future_dataframe(periods=forecast_period_days, include_history=False)
-    future['ds'] = future['ds'] + (forecast_start_date - future['ds'].min())  # Shift to start date
-    forecast = model.predict(future)
-    forecast_df = forecast[['ds', 'yhat', 'trend', 'weekly', 'diwali']].tail(forecast_period_days)  # Only future dates
 
-    # Save forecast data as CSV for the warehouse
-    forecast_csv_path = os.path.join('Prototype', 'forecast_data', f'forecast_{warehouse.replace(" ", "_")}.csv')
-    os.makedirs(os.path.dirname(forecast_csv_path), exist_ok=True)
-    forecast_df.to_csv(forecast_csv_path, index=False)
-    print(f"Saved forecast data for {warehouse} to {forecast_csv_path}")
+    if write_csv:
+        # Save forecast data as CSV for the warehouse
+        forecast_csv_path = os.path.join('Prototype', 'forecast_data', f'forecast_{warehouse.replace(" ", "_")}.csv')
+        os.makedirs(os.path.dirname(forecast_csv_path), exist_ok=True)
+        forecast_df.to_csv(forecast_csv_path, index=False)
+        print(f"Saved forecast data for {warehouse} to {forecast_csv_path}")
 
-    # Average seasonal for comparison
-    avg_weekly = forecast_df['weekly'].mean()
+        # Daily history used for the chart's 'Historical' line
+        history_csv_path = os.path.join('Prototype', 'forecast_data', f'history_{warehouse.replace(" ", "_")}.csv')
+        df_daily.to_csv(history_csv_path, index=False)
 
     # Detect over/understock with explanations
-    over_threshold, under_threshold = thresholds[warehouse]
-    overstock_info = []
-    understock_info = []
-    for _, row in forecast_df.iterrows():
-        date_str = row['ds'].strftime('%Y-%m-%d')
-        yhat = row['yhat']
-        trend = row['trend']
-        seasonal = row['weekly']
-        diwali_effect = row['diwali']
-        
-        if yhat > over_threshold:
-            reason = []
-            if seasonal > avg_weekly:
-                reason.append(f"seasonal peak (weekly component: {seasonal:.2f} > average {avg_weekly:.2f})")
-            if diwali_effect > 0:
-                reason.append(f"Diwali effect (component: {diwali_effect:.2f})")
-            if trend > df_daily['y'].mean():
-                reason.append(f"upward trend contribution ({trend:.2f} > historical mean {df_daily['y'].mean():.2f})")
-            if not reason:
-                reason.append("combined model factors exceeding threshold")
-            overstock_info.append({'date': date_str, 'forecasted_stock': yhat, 'explanation': ' and '.join(reason)})
-        
-        if yhat < under_threshold:
-            reason = []
-            if seasonal < avg_weekly:
-                reason.append(f"seasonal trough (weekly component: {seasonal:.2f} < average {avg_weekly:.2f})")
-            if trend < df_daily['y'].mean():
-                reason.append(f"downward trend contribution ({trend:.2f} < historical mean {df_daily['y'].mean():.2f})")
-            if not reason:
-                reason.append("combined model factors below threshold")
-            understock_info.append({'date': date_str, 'forecasted_stock': yhat, 'explanation': ' and '.join(reason)})
-
-    results[warehouse] = {
+    overstock_info, understock_info = detection.detect_stock_events(
+        forecast_df, over_threshold, under_threshold, df_daily['y'].mean())
+
+    result = {
         'overstock_info': overstock_info,
         'understock_info': understock_info,
-        'mean_stock': float(warehouse_stats.loc[warehouse_stats['warehouse_name'] == warehouse, 'mean_stock'].iloc[0]),
+        'mean_stock': mean_stock,
         'over_threshold': over_threshold,
         'under_threshold': under_threshold
     }
 
     # Debug: Print threshold and sample forecast values
-    print(f"{warehouse}: mean_stock={results[warehouse]['mean_stock']:.2f}, "
+    print(f"{warehouse}: mean_stock={result['mean_stock']:.2f}, "
           f"over_threshold={over_threshold}, under_threshold={under_threshold}")
     print(f"Sample forecast range: min={forecast_df['yhat'].min():.2f}, max={forecast_df['yhat'].max():.2f}")
     print(f"Forecast start date: {forecast_df['ds'].min().strftime('%Y-%m-%d')}")
 
-    # Plot and save graph with adjusted y-limits
-    plt.figure(figsize=(10, 6))
-    plt.plot(df_daily['ds'], df_daily['y'], label='Historical')
-    plt.plot(forecast_df['ds'], forecast_df['yhat'], label='Forecast')
-    plt.axhline(over_threshold, color='r', linestyle='--', label=f'Overstock Threshold ({over_threshold:.0f})')
-    plt.axhline(under_threshold, color='g', linestyle='--', label=f'Understock Threshold ({under_threshold:.0f})')
-    plt.ylim(min(under_threshold * 0.9, forecast_df['yhat'].min() * 0.9), max(over_threshold * 1.1, forecast_df['yhat'].max() * 1.1))
-    plt.title(f'{warehouse} Forecast ({forecast_start_date.strftime("%b %d, %Y")} - {(forecast_start_date + timedelta(days=forecast_period_days-1)).strftime("%b %d, %Y")})')
-    plt.xlabel('Date')
-    plt.ylabel('Stock Level')
-    plt.legend()
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    # Save plots to both nested and top-level static paths for app compatibility
-    plot_dir_nested = os.path.join('Prototype', 'static', 'plots')
-    plot_dir_top = os.path.join('static', 'plots')
-    os.makedirs(plot_dir_nested, exist_ok=True)
-    os.makedirs(plot_dir_top, exist_ok=True)
-    filename = f'forecast_{warehouse.replace(" ", "_")}.png'
-    plt.savefig(os.path.join(plot_dir_nested, filename))
+    return result
+
+
+def _forecast_task(args):
+    """Pool entry point: never raises, so one bad warehouse can't kill the run.
+
+    ``forecast_df`` is already filled in for warehouses handled by a batched
+    engine; otherwise the warehouse's own engine is fitted here.
+    """
+    warehouse, df_daily, forecast_df, engine, cache_dir, thresholds, write_csv = args
     try:
-        plt.savefig(os.path.join(plot_dir_top, filename))
-    except Exception:
-        pass
-    plt.close()
+        cache_status = None
+        if forecast_df is None:
+            forecaster = forecasters.get_forecaster(engine, **engine_kwargs(engine, cache_dir))
+            forecast_df = forecaster.forecast({warehouse: df_daily}, future_dates())[warehouse]
+            cache_status = forecaster.cache_status.get(warehouse)
+        result = finish_warehouse(warehouse, df_daily, forecast_df, *thresholds, write_csv=write_csv)
+        return warehouse, result, forecast_df, cache_status, None
+    except Exception as e:
+        return warehouse, None, None, None, e
 
-# Save to JSON at specified absolute path with debug check
-json_path = 'forecast_status.json'
 
-try:
-    with open(json_path, 'w') as f:
-        json.dump(results, f, default=str)
-    print(f"Successfully wrote to '{json_path}'")
-except Exception as e:
-    print(f"Failed to write to '{json_path}': {e}")
-
-# Save to CSV in Prototype
-flattened_results = []
-for warehouse, data in results.items():
-    for item in data['overstock_info']:
-        flattened_results.append({
-            'warehouse_name': warehouse,
-            'date': item['date'],
-            'status': 'overstock',
-            'forecasted_stock': item['forecasted_stock'],
-            'explanation': item['explanation']
-        })
-    for item in data['understock_info']:
-        flattened_results.append({
+def run_forecasts(df, warehouse_stats, workers=1, cache_dir=None, engine='prophet', warehouse_engines=None, write_csv=False):
+    """Forecast every warehouse, serially or across a process pool.
+
+    ``engine`` is the default forecasting engine and ``warehouse_engines``
+    overrides it per warehouse name. Batched engines fit all of their
+    warehouses in one call up front; the rest are fitted inside the pool.
+
+    Results are keyed in first-appearance order of ``warehouse_name`` no matter
+    which worker finishes first, so the outputs match a serial run. Returns
+    ``(results, forecasts, histories, cache_stats)``: status entries, forecast
+    frames and daily history frames keyed by warehouse, plus counts of model
+    cache outcomes.
+    """
+    warehouse_engines = warehouse_engines or {}
+    stats = warehouse_stats.set_index('warehouse_name')
+    series = {warehouse: daily_series(df_wh)
+              for warehouse, df_wh in df.groupby('warehouse_name', sort=False, observed=True)}
+    engines = {warehouse: warehouse_engines.get(warehouse, engine) for warehouse in series}
+
+    # Batched engines run once over all of their warehouses
+    precomputed = {}
+    failed = {}
+    for name in dict.fromkeys(engines.values()):
+        forecaster = forecasters.get_forecaster(name, **engine_kwargs(name, cache_dir))
+        if not forecaster.batched:
+            continue
+        batch = {w: series[w] for w, e in engines.items() if e == name}
+        try:
+            forecasts = forecaster.forecast(batch, future_dates())
+            error = ValueError(f"no usable history for {name}")
+        except Exception as e:
+            forecasts = {}
+            error = e
+        precomputed.update(forecasts)
+        failed.update({w: error for w in batch if w not in forecasts})
+
+    tasks = []
+    for warehouse, df_daily in series.items():
+        if warehouse in failed:
+            continue
+        row = stats.loc[warehouse]
+        thresholds = (row['over_threshold'], row['under_threshold'], float(row['mean_stock']))
+        tasks.append((warehouse, df_daily, precomputed.get(warehouse), engines[warehouse], cache_dir, thresholds, write_csv))
+
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(tasks)) or 1
+
+    if workers == 1:
+        outcomes = map(_forecast_task, tasks)
+    else:
+        print(f"Forecasting {len(tasks)} warehouses with {workers} worker processes")
+        executor = ProcessPoolExecutor(max_workers=workers)
+        outcomes = executor.map(_forecast_task, tasks)
+
+    outcome_by_warehouse = {}
+    try:
+        for warehouse, result, forecast_df, cache_status, error in outcomes:
+            outcome_by_warehouse[warehouse] = (result, forecast_df, cache_status, error)
+    finally:
+        if workers > 1:
+            executor.shutdown()
+
+    results = {}
+    forecasts = {}
+    cache_stats = {model_cache.HIT: 0, model_cache.WARM: 0, model_cache.COLD: 0}
+    for warehouse in series:
+        result, forecast_df, cache_status, error = outcome_by_warehouse.get(warehouse, (None, None, None, failed.get(warehouse)))
+        if error is not None:
+            print(f"Error forecasting {warehouse} ({engines[warehouse]}): {error}")
+            continue
+        results[warehouse] = result
+        forecasts[warehouse] = forecast_df
+        if cache_status is not None:
+            cache_stats[cache_status] += 1
+    return results, forecasts, series, cache_stats
+
+
+def summarize(results):
+    """One summary row per warehouse with stocks to order and overstock excess"""
+    summary_data = []
+    for warehouse, data in results.items():
+        under_threshold = data['under_threshold']
+        over_threshold = data['over_threshold']
+        understock_info = data['understock_info']
+        overstock_info = data['overstock_info']
+        stocks_to_order = sum(under_threshold - entry['forecasted_stock'] for entry in understock_info)
+        overstock_excess = sum(entry['forecasted_stock'] - over_threshold for entry in overstock_info)
+        summary_data.append({
             'warehouse_name': warehouse,
-            'date': item['date'],
-            'status': 'understock',
-            'forecasted_stock': item['forecasted_stock'],
-            'explanation': item['explanation']
+            'mean_stock': data['mean_stock'],
+            'over_threshold': over_threshold,
+            'under_threshold': under_threshold,
+            'overstock_count': len(overstock_info),
+            'understock_count': len(understock_info),
+            'overstock_excess': overstock_excess,
+            'stocks to order': stocks_to_order
         })
-df_results = pd.DataFrame(flattened_results)
-df_results.to_csv(os.path.join('Prototype', 'forecast_structured.csv'), index=False)
-
-# Create and update summary CSV with stocks to order and overstock excess
-summary_data = []
-for warehouse, data in results.items():
-    under_threshold = data['under_threshold']
-    over_threshold = data['over_threshold']
-    understock_info = data['understock_info']
-    overstock_info = data['overstock_info']
-    stocks_to_order = sum(under_threshold - entry['forecasted_stock'] for entry in understock_info)
-    overstock_excess = sum(entry['forecasted_stock'] - over_threshold for entry in overstock_info)
-    summary_data.append({
-        'warehouse_name': warehouse,
-        'mean_stock': data['mean_stock'],
-        'over_threshold': over_threshold,
-        'under_threshold': under_threshold,
-        'overstock_count': len(overstock_info),
-        'understock_count': len(understock_info),
-        'overstock_excess': overstock_excess,
-        'stocks to order': stocks_to_order
-    })
-
-df_summary = pd.DataFrame(summary_data)
-df_summary.to_csv(os.path.join('Prototype', 'forecast_summary.csv'), index=False)
-
-print(f"Results saved to '{json_path}'")
-print("Summary saved to 'Prototype/forecast_summary.csv'")
-print("Graphs saved in 'Prototype/static/plots' as 'forecast_[warehouse_name].png' for each warehouse")
\ No newline at end of file
+    return summary_data
+
+
+def write_outputs(results, summary_data):
+    """Write forecast_status.json, forecast_structured.csv and forecast_summary.csv"""
+    # Save to JSON at specified absolute path with debug check
+    try:
+        with open(json_path, 'w') as f:
+            json.dump(results, f, default=str)
+        print(f"Successfully wrote to '{json_path}'")
+    except Exception as e:
+        print(f"Failed to write to '{json_path}': {e}")
+
+    # Save to CSV in Prototype
+    flattened_results = []
+    for warehouse, data in results.items():
+        for item in data['overstock_info']:
+            flattened_results.append({
+                'warehouse_name': warehouse,
+                'date': item['date'],
+                'status': 'overstock',
+                'forecasted_stock': item['forecasted_stock'],
+                'explanation': item['explanation']
+            })
+        for item in data['understock_info']:
+            flattened_results.append({
+                'warehouse_name': warehouse,
+                'date': item['date'],
+                'status': 'understock',
+                'forecasted_stock': item['forecasted_stock'],
+                'explanation': item['explanation']
+            })
+    df_results = pd.DataFrame(flattened_results)
+    df_results.to_csv(os.path.join('Prototype', 'forecast_structured.csv'), index=False)
+
+    # Summary CSV with stocks to order and overstock excess
+    df_summary = pd.DataFrame(summary_data)
+    df_summary.to_csv(os.path.join('Prototype', 'forecast_summary.csv'), index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Forecast per-warehouse stock levels')
+    parser.add_argument('--input', default=input_file, help='Inventory CSV to forecast from')
+    parser.add_argument('--workers', type=int, default=int(os.getenv('FORECAST_WORKERS', '1')),
+                        help='Worker processes for per-warehouse fitting (1 = serial, 0 = all cores)')
+    parser.add_argument('--engine', default='prophet', choices=sorted(forecasters.ENGINES),
+                        help='Default forecasting engine')
+    parser.add_argument('--warehouse-engine', action='append', default=[], metavar='WAREHOUSE=ENGINE',
+                        help='Use a different engine for one warehouse (repeatable)')
+    parser.add_argument('--store', default=forecast_store.STORE_DIR,
+                        help='Forecast store directory read by Prototype/app.py')
+    parser.add_argument('--csv', action='store_true',
+                        help='Also write per-warehouse forecast/history CSVs to Prototype/forecast_data')
+    parser.add_argument('--model-cache', default=model_cache_dir,
+                        help='Directory for cached fitted models')
+    parser.add_argument('--no-model-cache', action='store_true',
+                        help='Always fit every model from scratch')
+    args = parser.parse_args()
+
+    warehouse_engines = {}
+    for override in args.warehouse_engine:
+        warehouse, _, engine = override.rpartition('=')
+        if not warehouse or engine not in forecasters.ENGINES:
+            parser.error(f"--warehouse-engine expects WAREHOUSE=ENGINE with ENGINE one of {', '.join(forecasters.ENGINES)}")
+        warehouse_engines[warehouse] = engine
+
+    df = load_inventory(args.input)
+    warehouse_stats = compute_thresholds(df)
+    cache_dir = None if args.no_model_cache else args.model_cache
+    results, forecasts, histories, cache_stats = run_forecasts(
+        df, warehouse_stats, workers=args.workers, cache_dir=cache_dir,
+        engine=args.engine, warehouse_engines=warehouse_engines, write_csv=args.csv)
+    summary_data = summarize(results)
+    write_outputs(results, summary_data)
+    run_id = forecast_store.ForecastStore(args.store).write_run(results, summary_data, forecasts, histories)
+    print(f"Published forecast run {run_id} to '{args.store}'")
+    if cache_dir is not None and sum(cache_stats.values()):
+        print(f"Model cache: {cache_stats[model_cache.HIT]} hit, {cache_stats[model_cache.WARM]} warm refit, "
+              f"{cache_stats[model_cache.COLD]} cold fit")
+
+    print(f"Results saved to '{json_path}'")
+    print("Summary saved to 'Prototype/forecast_summary.csv'")
+    print("Graphs are rendered on demand by Prototype/app.py (run Prototype/plots.py to pre-render them)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+import numpy as np
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime
+
+STORE_DIR = os.path.join('Prototype', 'forecast_store')
+
+FORECAST_DTYPE = np.dtype([('ds', 'M8[D]'), ('yhat', 'f8'), ('trend', 'f8'), ('weekly', 'f8'), ('diwali', 'f8')])
+HISTORY_DTYPE = np.dtype([('ds', 'M8[D]'), ('y', 'f8')])
+
+
+class ForecastRun:
+    """One immutable forecast run, read through memory maps.
+
+    ``manifest.json`` holds the run ID, the per-warehouse status entries (the
+    same shape as forecast_status.json), the summary rows and a row-range
+    index into ``forecast.npy`` / ``history.npy``. Each warehouse's rows are
+    contiguous, so :meth:`forecast` returns a zero-copy view that only pages
+    in that warehouse's slice of the file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'manifest.json'), 'r') as f:
+            manifest = json.load(f)
+        self.run_id = manifest['run_id']
+        self.created_at = manifest['created_at']
+        self.status = manifest['status']
+        self.summary = manifest['summary']
+        self.index = manifest['index']
+        self._arrays = {}
+
+    @property
+    def warehouses(self):
+        return list(self.index)
+
+    def _array(self, name):
+        if name not in self._arrays:
+            self._arrays[name] = np.load(os.path.join(self.path, f'{name}.npy'), mmap_mode='r')
+        return self._arrays[name]
+
+    def _slice(self, name, warehouse):
+        entry = self.index.get(warehouse)
+        if entry is None:
+            return None
+        start, stop = entry[name]
+        return self._array(name)[start:stop]
+
+    def forecast_table(self):
+        """All warehouses' forecast rows; ``index[w]['forecast']`` gives each one's range"""
+        return self._array('forecast')
+
+    def forecast(self, warehouse):
+        """Structured view with FORECAST_DTYPE fields, or None for an unknown warehouse"""
+        return self._slice('forecast', warehouse)
+
+    def history(self, warehouse):
+        """Structured view with HISTORY_DTYPE fields, or None for an unknown warehouse"""
+        return self._slice('history', warehouse)
+
+
+class ForecastStore:
+    """Versioned forecast runs under ``root``.
+
+    Each run is written to a temporary directory, renamed into ``runs/<run_id>``
+    and only then published by atomically replacing the ``CURRENT`` marker,
+    so readers never see a half-written run.
+    """
+
+    def __init__(self, root=STORE_DIR):
+        self.root = root
+        self.runs_dir = os.path.join(root, 'runs')
+        self.current_path = os.path.join(root, 'CURRENT')
+
+    def current_run_id(self):
+        try:
+            with open(self.current_path, 'r') as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def open(self, run_id=None):
+        """The given run (default: the current one), or None if there is none"""
+        run_id = run_id or self.current_run_id()
+        if run_id is None:
+            return None
+        path = os.path.join(self.runs_dir, run_id)
+        if not os.path.isdir(path):
+            return None
+        return ForecastRun(path)
+
+    def write_run(self, status, summary, forecasts, histories, keep=3):
+        """Write and publish a run; returns its run ID.
+
+        ``status`` is the forecast_status.json dict, ``summary`` the summary
+        rows, ``forecasts`` maps warehouse -> frame with ds/yhat/trend/weekly/
+        diwali and ``histories`` maps warehouse -> frame with ds/y.
+        """
+        names = [w for w in status if w in forecasts]
+        forecast_rows = _pack(FORECAST_DTYPE, [forecasts[w] for w in names])
+        history_rows = _pack(HISTORY_DTYPE, [histories.get(w) for w in names])
+
+        index = {}
+        f_start = h_start = 0
+        for w in names:
+            f_stop = f_start + len(forecasts[w])
+            h_stop = h_start + (len(histories[w]) if histories.get(w) is not None else 0)
+            index[w] = {'forecast': [f_start, f_stop], 'history': [h_start, h_stop]}
+            f_start, h_start = f_stop, h_stop
+
+        digest = hashlib.sha256(forecast_rows.tobytes())
+        digest.update(history_rows.tobytes())
+        digest.update(json.dumps(status, sort_keys=True, default=str).encode())
+        run_id = f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{digest.hexdigest()[:8]}"
+
+        os.makedirs(self.runs_dir, exist_ok=True)
+        tmp_dir = os.path.join(self.runs_dir, f'.{run_id}.{os.getpid()}.tmp')
+        os.makedirs(tmp_dir)
+        np.save(os.path.join(tmp_dir, 'forecast.npy'), forecast_rows)
+        np.save(os.path.join(tmp_dir, 'history.npy'), history_rows)
+        manifest = {
+            'run_id': run_id,
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'status': {w: status[w] for w in names},
+            'summary': [row for row in summary if row['warehouse_name'] in index],
+            'index': index,
+        }
+        with open(os.path.join(tmp_dir, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f, default=str)
+
+        run_dir = os.path.join(self.runs_dir, run_id)
+        if os.path.exists(run_dir):
+            shutil.rmtree(tmp_dir)
+        else:
+            os.rename(tmp_dir, run_dir)
+
+        tmp_current = f'{self.current_path}.{os.getpid()}.tmp'
+        with open(tmp_current, 'w') as f:
+            f.write(run_id)
+        os.replace(tmp_current, self.current_path)
+
+        self.prune(keep)
+        return run_id
+
+    def prune(self, keep=3):
+        """Remove all but the newest ``keep`` runs (never the current one)"""
+        current = self.current_run_id()
+        runs = sorted(d for d in os.listdir(self.runs_dir) if not d.startswith('.'))
+        for run_id in runs[:-keep] if keep else runs:
+            if run_id != current:
+                shutil.rmtree(os.path.join(self.runs_dir, run_id), ignore_errors=True)
+
+
+def _pack(dtype, frames):
+    """Concatenate frames into one structured array with ``dtype``'s fields"""
+    frames = [f for f in frames if f is not None and len(f)]
+    total = sum(len(f) for f in frames)
+    packed = np.empty(total, dtype=dtype)
+    offset = 0
+    for frame in frames:
+        stop = offset + len(frame)
+        for field in dtype.names:
+            packed[field][offset:stop] = np.asarray(frame[field]).astype(dtype[field])
+        offset = stop
+    return packed
+
+
+def as_columns(rows):
+    """Structured rows -> {field: list} with ISO date strings (for templates/JSON)"""
+    records = {}
+    for field in rows.dtype.names:
+        values = rows[field]
+        if np.issubdtype(values.dtype, np.datetime64):
+            records[field] = np.datetime_as_string(values, unit='D').tolist()
+        else:
+            records[field] = [None if np.isnan(v) else v for v in values.tolist()]
+    return records
@@ -0,0 +1,265 @@
+import pandas as pd
+import numpy as np
+import itertools
+
+# Columns every engine produces; forecast_logic.py and app.py read these
+FORECAST_COLUMNS = ['ds', 'yhat', 'trend', 'weekly', 'diwali']
+
+
+class Forecaster:
+    """Base class for forecasting engines.
+
+    ``fit(series)`` takes ``{warehouse: df_daily}`` (columns ``ds``, ``y``);
+    ``predict(future_ds)`` then returns ``{warehouse: DataFrame[FORECAST_COLUMNS]}``.
+    Warehouses an engine cannot forecast are left out of the result. Batched
+    engines fit every series in one call; the others are dispatched one
+    warehouse at a time so the process pool can spread them over cores.
+    """
+    name = None
+    batched = False
+
+    def __init__(self):
+        # warehouse -> model cache status, for engines that use the cache
+        self.cache_status = {}
+
+    def fit(self, series):
+        raise NotImplementedError
+
+    def predict(self, future_ds):
+        raise NotImplementedError
+
+    def forecast(self, series, future_ds):
+        self.fit(series)
+        return self.predict(future_ds)
+
+
+class ProphetForecaster(Forecaster):
+    """Prophet with a custom 'diwali' yearly seasonality; optional model cache"""
+    name = 'prophet'
+
+    def __init__(self, params, cache_dir=None):
+        super().__init__()
+        self.params = params
+        self.cache_dir = cache_dir
+
+    def build_model(self):
+        """Unfitted Prophet model configured from ``params``"""
+        from prophet import Prophet
+
+        params = dict(self.params)
+        seasonalities = params.pop('seasonalities', [])
+        model = Prophet(**params)
+        for seasonality in seasonalities:
+            model.add_seasonality(**seasonality)
+        return model
+
+    def fit_model(self, warehouse, df_daily):
+        """Fit (or reuse) the warehouse model; returns ``(model, cache_status)``"""
+        if self.cache_dir is None:
+            model = self.build_model()
+            model.fit(df_daily)
+            return model, None
+        import model_cache
+        return model_cache.ModelCache(self.cache_dir).fit(warehouse, df_daily, self.params, self.build_model)
+
+    def fit(self, series):
+        self.models = {}
+        for warehouse, df_daily in series.items():
+            self.models[warehouse], self.cache_status[warehouse] = self.fit_model(warehouse, df_daily)
+        return self
+
+    def predict(self, future_ds):
+        future = pd.DataFrame({'ds': future_ds})
+        forecasts = {}
+        for warehouse, model in self.models.items():
+            forecasts[warehouse] = model.predict(future)[FORECAST_COLUMNS].reset_index(drop=True)
+        return forecasts
+
+
+class BatchedForecaster(Forecaster):
+    """Shared setup for the NumPy engines.
+
+    All series are aligned on one daily date axis into a (warehouses x days)
+    matrix. A smoothed day-of-year profile (reported as the ``diwali``
+    component) is removed first, and subclasses model the remaining level,
+    trend and weekly pattern on the whole matrix at once.
+    """
+    batched = True
+    season_length = 7
+
+    def __init__(self, annual=True, annual_window=3):
+        super().__init__()
+        self.annual = annual
+        self.annual_window = annual_window
+
+    def fit(self, series):
+        self.names = [w for w, df_daily in series.items() if df_daily['y'].notna().any()]
+        if not self.names:
+            return self
+        start = min(series[w]['ds'].min() for w in self.names)
+        end = max(series[w]['ds'].max() for w in self.names)
+        dates = pd.date_range(start, end, freq='D')
+        self.last_date = dates[-1]
+        self.n_history = len(dates)
+
+        # warehouses x days, gaps interpolated and edges padded
+        matrix = pd.DataFrame({w: series[w].set_index('ds')['y'].reindex(dates) for w in self.names}).T
+        Y = matrix.interpolate(axis=1, limit_direction='both').to_numpy(dtype='float64')
+
+        self.profile = self._annual_profile(Y, dates)
+        self._fit(Y - self.profile[:, dates.dayofyear.to_numpy() - 1])
+        return self
+
+    def predict(self, future_ds):
+        if not self.names:
+            return {}
+        future_ds = pd.DatetimeIndex(future_ds)
+        steps = (future_ds - self.last_date).days.to_numpy()
+        if (steps < 1).any():
+            raise ValueError(f"{self.name} can only forecast dates after the last observation ({self.last_date.date()})")
+
+        trend, weekly = self._predict(steps)
+        diwali = self.profile[:, future_ds.dayofyear.to_numpy() - 1]
+
+        forecasts = {}
+        for i, warehouse in enumerate(self.names):
+            forecasts[warehouse] = pd.DataFrame({
+                'ds': future_ds,
+                'yhat': trend[i] + weekly[i] + diwali[i],
+                'trend': trend[i],
+                'weekly': weekly[i],
+                'diwali': diwali[i],
+            })
+        return forecasts
+
+    def _annual_profile(self, Y, dates):
+        """(warehouses x 366) mean deviation from each calendar year's mean,
+        averaged over a +/- annual_window day-of-year window"""
+        profile = np.zeros((Y.shape[0], 366))
+        if not self.annual or len(dates) < 365:
+            return profile
+        deviation = Y.copy()
+        years = dates.year.to_numpy()
+        for year in np.unique(years):
+            in_year = years == year
+            deviation[:, in_year] -= deviation[:, in_year].mean(axis=1, keepdims=True)
+        doy = dates.dayofyear.to_numpy() - 1
+        distance = np.abs(doy[:, None] - np.arange(366)[None, :])
+        window = (np.minimum(distance, 366 - distance) <= self.annual_window).astype('float64')
+        counts = window.sum(axis=0)
+        np.divide(deviation @ window, counts, out=profile, where=counts > 0)
+        return profile
+
+    def _weekly_slots(self, steps):
+        return (self.n_history - 1 + steps) % self.season_length
+
+    def _fit(self, Y):
+        """Fit the (warehouses x days) matrix with the annual profile removed"""
+        raise NotImplementedError
+
+    def _predict(self, steps):
+        """Return ``(trend, weekly)`` arrays of shape (warehouses x len(steps))"""
+        raise NotImplementedError
+
+
+class HoltWintersForecaster(BatchedForecaster):
+    """Additive damped Holt-Winters with weekly seasonality.
+
+    Smoothing parameters are picked per warehouse from a small grid by
+    one-step-ahead squared error; the grid is an extra array axis, so the
+    whole search is still a single pass over the history.
+    """
+    name = 'holt_winters'
+
+    def __init__(self, alphas=(0.05, 0.1, 0.2, 0.3, 0.5), betas=(0.0, 0.01, 0.05),
+                 gammas=(0.05, 0.1, 0.3), phis=(0.9, 0.98), **kwargs):
+        super().__init__(**kwargs)
+        grid = np.array(list(itertools.product(alphas, betas, gammas, phis)), dtype='float64')
+        self.alpha, self.beta, self.gamma, self.phi = grid.T
+
+    def _fit(self, Y):
+        m = self.season_length
+        n_series, n_history = Y.shape
+        if n_history < 2 * m:
+            raise ValueError(f"holt_winters needs at least {2 * m} days of history")
+        alpha, beta, gamma, phi = self.alpha, self.beta, self.gamma, self.phi
+
+        # Initial states from the first two weeks, broadcast over the grid
+        first, second = Y[:, :m].mean(axis=1), Y[:, m:2 * m].mean(axis=1)
+        level = np.repeat(first[:, None], len(alpha), axis=1)
+        slope = np.repeat(((second - first) / m)[:, None], len(alpha), axis=1)
+        season = np.repeat((Y[:, :m] - first[:, None])[:, None, :], len(alpha), axis=1)
+        sse = np.zeros_like(level)
+
+        for t in range(n_history):
+            y = Y[:, t, None]
+            slot = t % m
+            damped = phi * slope
+            error = y - (level + damped + season[:, :, slot])
+            if t >= m:
+                sse += error ** 2
+            new_level = alpha * (y - season[:, :, slot]) + (1 - alpha) * (level + damped)
+            season[:, :, slot] = gamma * (y - level - damped) + (1 - gamma) * season[:, :, slot]
+            slope = beta * (new_level - level) + (1 - beta) * damped
+            level = new_level
+
+        best = sse.argmin(axis=1)
+        rows = np.arange(n_series)
+        level, slope, season, phi = level[rows, best], slope[rows, best], season[rows, best], phi[best]
+
+        # Centre the weekly pattern so it reads like Prophet's component
+        offset = season.mean(axis=1)
+        self.season = season - offset[:, None]
+        self.level = level + offset
+        self.slope = slope
+        self.damping = phi
+
+    def _predict(self, steps):
+        phi = self.damping[:, None]
+        h = steps[None, :].astype('float64')
+        damped_sum = np.where(phi < 1, phi * (1 - phi ** h) / np.where(phi < 1, 1 - phi, 1), h)
+        trend = self.level[:, None] + self.slope[:, None] * damped_sum
+        weekly = self.season[:, self._weekly_slots(steps)]
+        return trend, weekly
+
+
+class SeasonalNaiveForecaster(BatchedForecaster):
+    """Repeat the average week of the last ``weeks`` weeks"""
+    name = 'seasonal_naive'
+
+    def __init__(self, weeks=4, **kwargs):
+        super().__init__(**kwargs)
+        self.weeks = weeks
+
+    def _fit(self, Y):
+        m = self.season_length
+        n_history = Y.shape[1]
+        span = min(self.weeks, n_history // m) * m
+        if span == 0:
+            raise ValueError(f"seasonal_naive needs at least {m} days of history")
+        recent = Y[:, n_history - span:]
+        level = recent.mean(axis=1)
+        # Column j of `recent` is history index n_history - span + j
+        slots = (np.arange(n_history - span, n_history)) % m
+        self.season = np.stack([recent[:, slots == s].mean(axis=1) for s in range(m)], axis=1) - level[:, None]
+        self.level = level
+
+    def _predict(self, steps):
+        trend = np.repeat(self.level[:, None], len(steps), axis=1)
+        weekly = self.season[:, self._weekly_slots(steps)]
+        return trend, weekly
+
+
+ENGINES = {
+    ProphetForecaster.name: ProphetForecaster,
+    HoltWintersForecaster.name: HoltWintersForecaster,
+    SeasonalNaiveForecaster.name: SeasonalNaiveForecaster,
+}
+
+
+def get_forecaster(name, **kwargs):
+    try:
+        engine = ENGINES[name]
+    except KeyError:
+        raise ValueError(f"Unknown forecasting engine '{name}'. Choose from: {', '.join(ENGINES)}")
+    return engine(**kwargs)
@@ -1,8 +1,16 @@
 import pandas as pd
 import numpy as np
-from datetime import timedelta
+import argparse
+import os
+import time
 
-# Define warehouse details from the sample
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet output is optional
+    pa = pq = None
+
+# Define warehouse details from the sample: (id, name, x_length_m, y_length_m, z_height_m)
 warehouses = [
     ("WH001", "Bawana Main", 50, 40, 12),
     ("WH002", "Okhla Depot", 45, 35, 10),
@@ -12,11 +20,10 @@ warehouses = [
     ("WH006", "Kirti Nagar Hub", 52, 42, 13),
     ("WH007", "Sarai Kale Khan Depot", 50, 40, 12)
 ]
-
-# Date range
-start_date = pd.to_datetime("2023-01-01")
-end_date = pd.to_datetime("2024-12-31")
-dates = pd.date_range(start=start_date, end=end_date, freq='D')
+base_means = {
+    "WH001": 900, "WH002": 700, "WH003": 1000, "WH004": 850,
+    "WH005": 900, "WH006": 950, "WH007": 1000
+}
 
 # Seasonal events (date, adjustment: positive for peaks, negative for troughs)
 events = [
@@ -29,25 +36,144 @@ events = [
     ("2023-12-25", 200), ("2024-12-25", 200)   # Christmas
 ]
 
-# Generate data
-data = []
-base_means = {
-    "WH001": 900, "WH002": 700, "WH003": 1000, "WH004": 850,
-    "WH005": 900, "WH006": 950, "WH007": 1000
-}
-for date in dates:
-    base_stock_adjustment = 0
-    for event_date, adj in events:
-        if date.strftime("%Y-%m-%d") == event_date:
-            base_stock_adjustment = adj
-    for warehouse_id, warehouse_name, x_length_m, y_length_m, z_height_m in warehouses:
-        mean_stock = base_means[warehouse_id]
-        for i in range(20):  # 20 entries per day
-            time = f"{(i * 3):02d}:{(i * 3 % 60):02d}"  # 3-minute increments for 20 entries
-            base_stock = mean_stock + np.random.normal(0, 50)  # Baseline with noise
-            stock = max(0, base_stock + base_stock_adjustment + np.random.uniform(-100, 100))
-            loaded_unloaded = "loaded" if np.random.random() > 0.5 else "unloaded"
-            data.append([date.strftime("%Y-%m-%d"), time, int(stock), loaded_unloaded, warehouse_id, warehouse_name, x_length_m, y_length_m, z_height_m])
-
-df = pd.DataFrame(data, columns=["date", "time", "stock", "loaded_unloaded", "warehouse_id", "warehouse_name", "x_length_m", "y_length_m", "z_height_m"])
-df.to_csv("Prototype/inventory_data_simulated.csv", index=False)
\ No newline at end of file
+columns = ["date", "time", "stock", "loaded_unloaded", "warehouse_id", "warehouse_name", "x_length_m", "y_length_m", "z_height_m"]
+
+default_output = os.path.join("Prototype", "inventory_data_simulated.csv")
+
+
+def warehouse_table(count, rng):
+    """``count`` warehouses: the sample ones first, then synthetic hubs with random sizes and means"""
+    rows = [(wid, name, x, y, z, base_means[wid]) for wid, name, x, y, z in warehouses[:count]]
+    for n in range(len(rows) + 1, count + 1):
+        rows.append((f"WH{n:03d}", f"Synthetic Hub {n}", int(rng.integers(40, 60)), int(rng.integers(30, 50)),
+                     int(rng.integers(10, 16)), int(rng.integers(7, 11)) * 100))
+    return pd.DataFrame(rows, columns=["warehouse_id", "warehouse_name", "x_length_m", "y_length_m", "z_height_m", "mean_stock"])
+
+
+def event_adjustments(dates):
+    """Stock adjustment per date, as an array aligned with ``dates``.
+
+    Listed event dates apply as-is. Years with no listed events reuse the
+    latest listed year's calendar, so long ranges keep their seasonality.
+    """
+    event_dates = pd.to_datetime([d for d, _ in events])
+    adjustments = np.array([adj for _, adj in events])
+    listed_years = set(event_dates.year)
+    template = event_dates.year == max(listed_years)
+
+    lookup = np.zeros(len(dates), dtype=np.int64)
+    start = dates[0]
+    for year in range(dates[0].year, dates[-1].year + 1):
+        if year in listed_years:
+            when, adj = event_dates[event_dates.year == year], adjustments[event_dates.year == year]
+        else:
+            # Feb 29 events fold onto Feb 28 in non-leap years
+            when = pd.to_datetime([f"{year}-{d.month:02d}-{min(d.day, 28) if d.month == 2 else d.day:02d}"
+                                   for d in event_dates[template]])
+            adj = adjustments[template]
+        offsets = (when - start).days.values
+        inside = (offsets >= 0) & (offsets < len(dates))
+        lookup[offsets[inside]] = adj[inside]
+    return lookup
+
+
+def reading_times(readings):
+    """Time labels for the readings of a day, in the sample data's format"""
+    return [f"{(i * 3):02d}:{(i * 3 % 60):02d}" for i in range(readings)]
+
+
+def generate_chunks(warehouse_count=len(warehouses), readings=20, years=2, start="2023-01-01", seed=None, chunk_days=30):
+    """Yield DataFrames covering ``chunk_days`` days each of the (date x warehouse x reading) grid.
+
+    Every value in a chunk comes from whole-array draws broadcast over the
+    grid; labels are categoricals built from codes, so no per-row Python
+    objects are created. The same seed and chunk_days give the same data.
+    """
+    rng = np.random.default_rng(seed)
+    start = pd.to_datetime(start)
+    dates = pd.date_range(start=start, end=start + pd.DateOffset(years=years) - pd.Timedelta(days=1), freq='D')
+    adjustments = event_adjustments(dates)
+    table = warehouse_table(warehouse_count, rng)
+    means = table["mean_stock"].to_numpy(dtype=np.float64)
+    times = pd.Index(reading_times(readings))
+    warehouse_codes = np.arange(warehouse_count)
+    reading_codes = np.arange(readings)
+
+    for first in range(0, len(dates), chunk_days):
+        chunk_dates = dates[first:first + chunk_days]
+        days = len(chunk_dates)
+        shape = (days, warehouse_count, readings)
+
+        # Baseline with noise, plus the day's event and a uniform swing
+        stock = (means[None, :, None]
+                 + rng.normal(0, 50, shape)
+                 + adjustments[first:first + days, None, None]
+                 + rng.uniform(-100, 100, shape))
+        stock = np.maximum(stock, 0).astype(np.int32)
+        loaded = rng.random(shape) > 0.5
+
+        day_index = np.broadcast_to(np.arange(days)[:, None, None], shape).ravel()
+        warehouse_index = np.broadcast_to(warehouse_codes[None, :, None], shape).ravel()
+        reading_index = np.broadcast_to(reading_codes[None, None, :], shape).ravel()
+
+        chunk = pd.DataFrame({
+            "date": pd.Categorical.from_codes(day_index, chunk_dates.strftime("%Y-%m-%d")),
+            "time": pd.Categorical.from_codes(reading_index, times),
+            "stock": stock.ravel(),
+            "loaded_unloaded": pd.Categorical.from_codes(loaded.ravel().astype(np.int8), ["unloaded", "loaded"]),
+            "warehouse_id": pd.Categorical.from_codes(warehouse_index, table["warehouse_id"]),
+            "warehouse_name": pd.Categorical.from_codes(warehouse_index, table["warehouse_name"]),
+        })
+        for column in ("x_length_m", "y_length_m", "z_height_m"):
+            chunk[column] = table[column].to_numpy(dtype=np.int32)[warehouse_index]
+        yield chunk[columns]
+
+
+def write_chunks(chunks, path):
+    """Stream chunks to ``path`` as CSV, or Parquet if it ends in .parquet; returns rows written"""
+    rows = 0
+    if path.endswith(".parquet"):
+        if pq is None:
+            raise RuntimeError("Parquet output needs pyarrow (pip install pyarrow)")
+        writer = None
+        try:
+            for chunk in chunks:
+                # Plain strings, so every row group shares one schema
+                table = pa.Table.from_pandas(chunk.astype({c: str for c in chunk.select_dtypes('category')}),
+                                             preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+                rows += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+        return rows
+
+    for i, chunk in enumerate(chunks):
+        chunk.to_csv(path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+        rows += len(chunk)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate simulated warehouse inventory readings')
+    parser.add_argument('--warehouses', type=int, default=len(warehouses),
+                        help=f'Warehouses to simulate; beyond {len(warehouses)} synthetic ones are added')
+    parser.add_argument('--readings', type=int, default=20, help='Readings per warehouse per day')
+    parser.add_argument('--years', type=int, default=2, help='Years of daily data')
+    parser.add_argument('--start', default='2023-01-01', help='First date (YYYY-MM-DD)')
+    parser.add_argument('--seed', type=int, help='Random seed for reproducible output')
+    parser.add_argument('--chunk-days', type=int, default=30, help='Days generated and written per chunk')
+    parser.add_argument('--output', default=default_output, help='Output path (.csv or .parquet)')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    chunks = generate_chunks(args.warehouses, args.readings, args.years, args.start, args.seed, args.chunk_days)
+    rows = write_chunks(chunks, args.output)
+    seconds = time.perf_counter() - started
+    print(f"Wrote {rows:,} rows to {args.output} in {seconds:.1f}s ({rows / seconds:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
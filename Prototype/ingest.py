@@ -0,0 +1,135 @@
+import pandas as pd
+import numpy as np
+import os
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Columns the forecast pipeline reads from inventory exports
+INVENTORY_COLUMNS = ['warehouse_id', 'warehouse_name', 'x_length_m', 'y_length_m', 'z_height_m',
+                     'date', 'time', 'stock', 'loaded_unloaded']
+
+# Compact dtypes: repeated labels as categoricals, 32-bit numerics. Stock is
+# read as-is and coerced afterwards, so a blank or malformed cell drops its
+# row instead of failing the whole read
+INVENTORY_DTYPES = {
+    'warehouse_id': 'category',
+    'warehouse_name': 'category',
+    'loaded_unloaded': 'category',
+    'date': 'category',
+    'time': 'category',
+    'x_length_m': 'float32',
+    'y_length_m': 'float32',
+    'z_height_m': 'float32',
+}
+STOCK_DTYPE = 'int32'
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None if unavailable"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes on Linux
+    if sys.platform == 'darwin':
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def parse_datetimes(date, time_of_day):
+    """Vectorized date + 'HH:MM[:SS]' parsing with hours > 23 wrapped onto the same day.
+
+    Both inputs may be categoricals, in which case each distinct value is
+    parsed once and broadcast back through the codes. Unparseable rows are NaT.
+    """
+    if isinstance(date.dtype, pd.CategoricalDtype):
+        days = pd.to_datetime(date.cat.categories, format='%Y-%m-%d', errors='coerce')
+        days = days.values[date.cat.codes.values]
+        days[date.cat.codes.values < 0] = np.datetime64('NaT')
+    else:
+        days = pd.to_datetime(date, format='%Y-%m-%d', errors='coerce').values
+
+    if isinstance(time_of_day.dtype, pd.CategoricalDtype):
+        offsets = _time_offsets(pd.Series(time_of_day.cat.categories.astype(str)))
+        offsets = np.append(offsets, np.int64(-1))[time_of_day.cat.codes.values]
+    else:
+        offsets = _time_offsets(time_of_day.astype(str))
+
+    minutes = offsets.astype('timedelta64[m]')
+    result = days + minutes
+    result[offsets < 0] = np.datetime64('NaT')
+    return pd.Series(result, index=date.index)
+
+
+def _time_offsets(time_strings):
+    """Minutes past midnight for each 'HH:MM[:SS]' string, -1 where invalid"""
+    parts = time_strings.str.extract(r'^\s*(\d+):(\d+)', expand=True)
+    hours = pd.to_numeric(parts[0], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+    minutes = pd.to_numeric(parts[1], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+    valid = ~np.isnan(hours) & ~np.isnan(minutes) & (minutes < 60)
+    offsets = np.where(valid, (np.nan_to_num(hours) % 24) * 60 + np.nan_to_num(minutes), -1)
+    return offsets.astype('int64')
+
+
+def load_inventory(path, verbose=True):
+    """Load an inventory CSV (or Parquet file) into compact dtypes with parsed ``datetime`` and ``volume``.
+
+    Returns ``(df, stats)`` where stats holds rows, seconds, rows_per_sec,
+    memory_mb (frame size) and peak_rss_mb (process high-water mark).
+    """
+    started = time.perf_counter()
+    if path.endswith('.parquet'):
+        df = pd.read_parquet(path, columns=INVENTORY_COLUMNS).astype(INVENTORY_DTYPES)
+    else:
+        df = pd.read_csv(path, usecols=INVENTORY_COLUMNS, dtype=INVENTORY_DTYPES)
+    rows_read = len(df)
+
+    # Parse date and time with adjustment for hours > 23
+    df['datetime'] = parse_datetimes(df['date'], df['time'])
+    invalid = df['datetime'].isnull()
+    if invalid.any():
+        print(f"Warning: {int(invalid.sum())} rows had invalid datetime values and were dropped.")
+        df = df[~invalid].reset_index(drop=True)
+
+    # Stock is a unit count: fractional or out-of-range values are dropped, not truncated or wrapped
+    stock = pd.to_numeric(df['stock'], errors='coerce')
+    limits = np.iinfo(STOCK_DTYPE)
+    invalid = stock.isnull() | (stock % 1 != 0) | (stock < limits.min) | (stock > limits.max)
+    if invalid.any():
+        print(f"Warning: {int(invalid.sum())} rows had missing, non-integer or out-of-range stock values and were dropped.")
+        df, stock = df[~invalid].reset_index(drop=True), stock[~invalid].reset_index(drop=True)
+    df['stock'] = stock.astype(STOCK_DTYPE)
+    df['date'] = df['datetime'].dt.normalize()
+    df = df.drop(columns=['time'])
+
+    df['volume'] = df['x_length_m'] * df['y_length_m'] * df['z_height_m']
+
+    seconds = time.perf_counter() - started
+    stats = {
+        'rows': rows_read,
+        'seconds': seconds,
+        'rows_per_sec': rows_read / seconds if seconds > 0 else float('inf'),
+        'memory_mb': df.memory_usage(deep=True).sum() / (1024 * 1024),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+    if verbose:
+        print(format_stats(path, stats))
+    return df, stats
+
+
+def format_stats(path, stats):
+    peak = f"{stats['peak_rss_mb']:.1f} MB" if stats['peak_rss_mb'] is not None else "n/a"
+    return (f"Loaded {stats['rows']:,} rows from {os.path.basename(path)} in {stats['seconds']:.2f}s "
+            f"({stats['rows_per_sec']:,.0f} rows/sec, frame {stats['memory_mb']:.1f} MB, peak RSS {peak})")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("Usage: python Prototype/ingest.py <inventory.csv> [...]")
+        exit(1)
+    for csv_path in sys.argv[1:]:
+        load_inventory(csv_path)
@@ -0,0 +1,103 @@
+import pandas as pd
+import numpy as np
+import hashlib
+import json
+import os
+
+# Cache outcomes reported per warehouse
+HIT = 'hit'     # same data and hyperparameters: fitted model reused as-is
+WARM = 'warm'   # same hyperparameters, new data: refit from previous parameters
+COLD = 'cold'   # nothing usable cached: fit from scratch
+
+
+def data_hash(df_daily):
+    """Stable hash of the daily training frame (ds, y)"""
+    hashed = pd.util.hash_pandas_object(df_daily[['ds', 'y']], index=False)
+    return hashlib.sha256(hashed.values.tobytes()).hexdigest()
+
+
+def params_hash(params):
+    return hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def warm_start_params(model):
+    """Initial values for Stan taken from an already fitted model"""
+    res = {}
+    for pname in ['k', 'm', 'sigma_obs']:
+        if model.mcmc_samples == 0:
+            res[pname] = model.params[pname][0][0]
+        else:
+            res[pname] = np.mean(model.params[pname])
+    for pname in ['delta', 'beta']:
+        if model.mcmc_samples == 0:
+            res[pname] = model.params[pname][0]
+        else:
+            res[pname] = np.mean(model.params[pname], axis=0)
+    return res
+
+
+class ModelCache:
+    """Fitted Prophet models on disk, one entry per warehouse.
+
+    Each entry records the hash of the training data and of the
+    hyperparameters it was fitted with, so callers can tell whether the
+    stored model can be reused directly or only as a warm start.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+
+    def _path(self, warehouse):
+        return os.path.join(self.cache_dir, f'model_{warehouse.replace(" ", "_")}.json')
+
+    def load(self, warehouse):
+        """Return ``(model, data_hash, params_hash)`` or ``None`` if missing/unreadable"""
+        from prophet.serialize import model_from_json
+
+        try:
+            with open(self._path(warehouse), 'r') as f:
+                entry = json.load(f)
+            return model_from_json(entry['model']), entry['data_hash'], entry['params_hash']
+        except Exception:
+            return None
+
+    def save(self, warehouse, model, d_hash, p_hash):
+        from prophet.serialize import model_to_json
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(warehouse)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'data_hash': d_hash, 'params_hash': p_hash, 'model': model_to_json(model)}, f)
+        os.replace(tmp_path, path)
+
+    def fit(self, warehouse, df_daily, params, build_model):
+        """Fitted model for ``df_daily``, reusing or warm-starting from the cache.
+
+        ``build_model()`` returns a fresh, unfitted model for ``params``.
+        Returns ``(model, status)`` where status is HIT, WARM or COLD.
+        """
+        d_hash = data_hash(df_daily)
+        p_hash = params_hash(params)
+        cached = self.load(warehouse)
+
+        if cached is not None and cached[2] == p_hash:
+            cached_model, cached_d_hash, _ = cached
+            if cached_d_hash == d_hash:
+                return cached_model, HIT
+            model = build_model()
+            try:
+                model.fit(df_daily, init=warm_start_params(cached_model))
+                status = WARM
+            except Exception:
+                # Parameter shapes can change (e.g. fewer changepoints); fall back to a cold fit
+                model = build_model()
+                model.fit(df_daily)
+                status = COLD
+        else:
+            model = build_model()
+            model.fit(df_daily)
+            status = COLD
+
+        self.save(warehouse, model, d_hash, p_hash)
+        return model, status
@@ -0,0 +1,117 @@
+import pandas as pd
+import numpy as np
+import hashlib
+import os
+import sys
+
+import forecast_store
+
+FORECAST_DIR = os.path.join('Prototype', 'forecast_data')
+PLOT_CACHE_DIR = os.path.join('Prototype', 'plot_cache')
+
+
+def forecast_csv_path(warehouse_slug):
+    return os.path.join(FORECAST_DIR, f'forecast_{warehouse_slug}.csv')
+
+
+def history_csv_path(warehouse_slug):
+    return os.path.join(FORECAST_DIR, f'history_{warehouse_slug}.csv')
+
+
+def load_csv_series(warehouse_slug):
+    """``(forecast_df, history_df)`` from the legacy per-warehouse CSVs; either may be None"""
+    forecast_path = forecast_csv_path(warehouse_slug)
+    history_path = history_csv_path(warehouse_slug)
+    forecast_df = pd.read_csv(forecast_path) if os.path.exists(forecast_path) else None
+    history_df = pd.read_csv(history_path) if os.path.exists(history_path) else None
+    return forecast_df, history_df
+
+
+def content_hash(forecast_df, history_df, extra=''):
+    """Short sha256 over the plotted series plus ``extra``"""
+    digest = hashlib.sha256(extra.encode())
+    frames = [(forecast_df, 'yhat'), (history_df, 'y')]
+    for frame, column in frames:
+        if frame is None:
+            continue
+        digest.update(pd.to_datetime(frame['ds']).to_numpy().astype('M8[D]').tobytes())
+        digest.update(np.ascontiguousarray(frame[column], dtype='float64').tobytes())
+    return digest.hexdigest()[:16]
+
+
+def render_forecast(warehouse_name, forecast_df, over_threshold, under_threshold, history_df=None):
+    """Forecast chart as an Agg-backed Figure (no pyplot, safe inside a web worker)"""
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=(10, 6))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ds = pd.to_datetime(forecast_df['ds'])
+    if history_df is not None and len(history_df):
+        ax.plot(pd.to_datetime(history_df['ds']), history_df['y'], label='Historical')
+    ax.plot(ds, forecast_df['yhat'], label='Forecast')
+    ax.axhline(over_threshold, color='r', linestyle='--', label=f'Overstock Threshold ({over_threshold:.0f})')
+    ax.axhline(under_threshold, color='g', linestyle='--', label=f'Understock Threshold ({under_threshold:.0f})')
+    ax.set_ylim(min(under_threshold * 0.9, forecast_df['yhat'].min() * 0.9), max(over_threshold * 1.1, forecast_df['yhat'].max() * 1.1))
+    ax.set_title(f'{warehouse_name} Forecast ({ds.min().strftime("%b %d, %Y")} - {ds.max().strftime("%b %d, %Y")})')
+    ax.set_xlabel('Date')
+    ax.set_ylabel('Stock Level')
+    ax.legend()
+    ax.tick_params(axis='x', labelrotation=45)
+    fig.tight_layout()
+    return fig
+
+
+def cached_plot(warehouse_slug, warehouse_name, forecast_df, history_df, over_threshold, under_threshold):
+    """Path to the PNG for a warehouse, rendering it on first use.
+
+    Cached files are named by a hash of the plotted series and the
+    thresholds, so a new forecast run produces a new file and older renders
+    for the same warehouse are removed. Returns None if there is no forecast.
+    """
+    if forecast_df is None or not len(forecast_df):
+        return None
+    key = content_hash(forecast_df, history_df, f'{over_threshold}|{under_threshold}')
+    filename = f'forecast_{warehouse_slug}_{key}.png'
+    path = os.path.join(PLOT_CACHE_DIR, filename)
+    if os.path.exists(path):
+        return path
+
+    fig = render_forecast(warehouse_name, forecast_df, over_threshold, under_threshold, history_df)
+
+    os.makedirs(PLOT_CACHE_DIR, exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    fig.savefig(tmp_path, format='png')
+    os.replace(tmp_path, path)
+
+    # Drop renders of older forecasts for this warehouse
+    prefix = f'forecast_{warehouse_slug}_'
+    for old in os.listdir(PLOT_CACHE_DIR):
+        if old.startswith(prefix) and old.endswith('.png') and old != filename:
+            try:
+                os.remove(os.path.join(PLOT_CACHE_DIR, old))
+            except OSError:
+                pass
+    return path
+
+
+def series_json(forecast_df, history_df=None):
+    """Forecast (and history, when present) as JSON-ready lists"""
+    series = {column: forecast_df[column].tolist() for column in forecast_df.columns}
+    if history_df is not None:
+        series['history'] = {'ds': history_df['ds'].tolist(), 'y': [None if pd.isna(v) else v for v in history_df['y'].tolist()]}
+    return series
+
+
+if __name__ == '__main__':
+    # Pre-render every warehouse in the current forecast run (optional; the app renders on demand)
+    run = forecast_store.ForecastStore(sys.argv[1] if len(sys.argv) > 1 else forecast_store.STORE_DIR).open()
+    if run is None:
+        print("No forecast run found. Please run the forecast script first.")
+        exit(1)
+    for name, data in run.status.items():
+        forecast_df = pd.DataFrame(forecast_store.as_columns(run.forecast(name)))
+        history_df = pd.DataFrame(forecast_store.as_columns(run.history(name)))
+        path = cached_plot(name.replace(' ', '_'), name, forecast_df, history_df, data['over_threshold'], data['under_threshold'])
+        print(f"{name}: {path or 'no forecast data'}")
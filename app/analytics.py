@@ -0,0 +1,180 @@
+from collections import defaultdict
+from datetime import date, datetime
+from sqlalchemy import and_, cast, event, func, insert, inspect, select, update
+
+from . import db
+from .models import Order, OrderDailyRollup
+
+rollups = OrderDailyRollup.__table__
+
+# Rollup dimensions, in primary key order
+DIMENSIONS = ("user_id", "warehouse_id", "day", "order_type", "package_priority", "package_type")
+
+PRIORITIES = ["High", "Medium", "Low", "Urgent"]
+PACKAGE_TYPES = ["Fragile", "Heavy", "Liquid", "Solid", "Hazardous", "Regular"]
+
+# Primary key columns can't hold NULL, so missing categories are stored as ''
+MISSING = ""
+
+
+def rollup_key(values):
+    """Rollup primary key for an order given as a mapping of column values"""
+    created_at = values.get("created_at") or datetime.now()
+    return (
+        values["user_id"],
+        values["warehouse_id"],
+        created_at.date() if isinstance(created_at, datetime) else created_at,
+        values.get("order_type") or MISSING,
+        values.get("package_priority") or MISSING,
+        values.get("package_type") or MISSING,
+    )
+
+
+def apply_orders(connection, orders, sign=1):
+    """Add (sign=1) or remove (sign=-1) orders from the rollup table.
+
+    ``orders`` is an iterable of column-value mappings. Orders are first
+    summed per rollup key, so a batch costs one UPDATE (plus an INSERT for
+    new keys) per distinct key rather than per order.
+    """
+    deltas = defaultdict(lambda: [0, 0])
+    for values in orders:
+        delta = deltas[rollup_key(values)]
+        delta[0] += sign
+        delta[1] += sign * int(values.get("quantity") or 0)
+
+    for key, (count, quantity) in deltas.items():
+        match = and_(*(rollups.c[name] == value for name, value in zip(DIMENSIONS, key)))
+        result = connection.execute(
+            update(rollups).where(match).values(
+                order_count=rollups.c.order_count + count,
+                quantity=rollups.c.quantity + quantity,
+            )
+        )
+        if result.rowcount == 0 and count > 0:
+            connection.execute(insert(rollups).values(**dict(zip(DIMENSIONS, key)), order_count=count, quantity=quantity))
+        elif count < 0:
+            # Drop the key once its last order is gone
+            connection.execute(rollups.delete().where(match, rollups.c.order_count <= 0))
+
+
+def _order_values(order):
+    return {name: getattr(order, name) for name in ("user_id", "warehouse_id", "created_at", "order_type",
+                                                    "package_priority", "package_type", "quantity")}
+
+
+@event.listens_for(Order, "after_insert")
+def _order_inserted(mapper, connection, target):
+    apply_orders(connection, [_order_values(target)], 1)
+
+
+@event.listens_for(Order, "after_delete")
+def _order_deleted(mapper, connection, target):
+    apply_orders(connection, [_order_values(target)], -1)
+
+
+@event.listens_for(Order, "after_update")
+def _order_updated(mapper, connection, target):
+    state = inspect(target)
+    old = _order_values(target)
+    changed = False
+    for name in old:
+        history = state.attrs[name].history
+        if history.has_changes():
+            changed = True
+            if history.deleted:
+                old[name] = history.deleted[0]
+    if changed:
+        apply_orders(connection, [old], -1)
+        apply_orders(connection, [_order_values(target)], 1)
+
+
+def rebuild_rollups(user_id=None):
+    """Recompute the rollup table (or one user's rows) from orders with a single GROUP BY; the caller commits"""
+    if db.engine.dialect.name == "sqlite":
+        day = func.date(Order.created_at)
+    else:
+        day = cast(Order.created_at, db.Date)
+    grouped = select(
+        Order.user_id,
+        Order.warehouse_id,
+        day,
+        func.coalesce(Order.order_type, MISSING),
+        func.coalesce(Order.package_priority, MISSING),
+        func.coalesce(Order.package_type, MISSING),
+        func.count(Order.id),
+        func.coalesce(func.sum(Order.quantity), 0),
+    ).group_by(
+        Order.user_id, Order.warehouse_id, day,
+        func.coalesce(Order.order_type, MISSING),
+        func.coalesce(Order.package_priority, MISSING),
+        func.coalesce(Order.package_type, MISSING),
+    )
+    delete = rollups.delete()
+    if user_id is not None:
+        grouped = grouped.where(Order.user_id == user_id)
+        delete = delete.where(rollups.c.user_id == user_id)
+
+    db.session.execute(delete)
+    db.session.execute(insert(rollups).from_select(list(DIMENSIONS) + ["order_count", "quantity"], grouped))
+
+
+def _scoped(query, user_id, warehouse_id):
+    query = query.where(rollups.c.user_id == user_id)
+    if warehouse_id:
+        query = query.where(rollups.c.warehouse_id == warehouse_id)
+    return query
+
+
+def order_breakdown(user_id, warehouse_id=None):
+    """Order totals by type, priority and package type from the rollup table"""
+    rows = db.session.execute(_scoped(
+        select(rollups.c.order_type, rollups.c.package_priority, rollups.c.package_type,
+               func.sum(rollups.c.order_count))
+        .group_by(rollups.c.order_type, rollups.c.package_priority, rollups.c.package_type),
+        user_id, warehouse_id,
+    )).all()
+
+    breakdown = {
+        "total": 0,
+        "order_type": defaultdict(int),
+        "priority": {p: 0 for p in PRIORITIES},
+        "package_type": {t: 0 for t in PACKAGE_TYPES},
+    }
+    for order_type, priority, package_type, count in rows:
+        breakdown["total"] += count
+        breakdown["order_type"][order_type] += count
+        if priority in breakdown["priority"]:
+            breakdown["priority"][priority] += count
+        if package_type in breakdown["package_type"]:
+            breakdown["package_type"][package_type] += count
+    return breakdown
+
+
+def month_starts(months, today=None):
+    """First day of each of the last ``months`` calendar months, oldest first"""
+    today = today or date.today()
+    starts = []
+    year, month = today.year, today.month
+    for _ in range(months):
+        starts.append(date(year, month, 1))
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+    return starts[::-1]
+
+
+def monthly_orders(user_id, warehouse_id=None, months=6, today=None):
+    """Orders created in each of the last ``months`` calendar months (current month to date)"""
+    starts = month_starts(months, today)
+    rows = db.session.execute(_scoped(
+        select(rollups.c.day, func.sum(rollups.c.order_count))
+        .where(rollups.c.day >= starts[0])
+        .group_by(rollups.c.day),
+        user_id, warehouse_id,
+    )).all()
+
+    counts = {start: 0 for start in starts}
+    for day, count in rows:
+        month = date(day.year, day.month, 1)
+        if month in counts:
+            counts[month] += count
+    return [{"month": start.strftime("%b %Y"), "orders": counts[start]} for start in starts]
@@ -0,0 +1,19 @@
+from sqlalchemy import event
+
+from . import db
+
+
+def configure_engine(app):
+    """Apply ``SQLITE_PRAGMAS`` to every connection the app's SQLite engine opens"""
+    pragmas = app.config.get('SQLITE_PRAGMAS') or {}
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
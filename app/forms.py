@@ -1,6 +1,6 @@
 from flask_wtf import FlaskForm
-from wtforms import StringField, SubmitField, IntegerField, TextAreaField,DateField,TimeField,SelectField, BooleanField, HiddenField
-from wtforms.validators import DataRequired, Email,Length,Optional
+from wtforms import StringField, SubmitField, IntegerField, TextAreaField,DateField,TimeField,SelectField, BooleanField, HiddenField, FloatField
+from wtforms.validators import DataRequired, Email,Length,Optional, NumberRange
 
 
 class BaseProfileForm(FlaskForm):
@@ -19,6 +19,8 @@ class WarehouseForm(FlaskForm):
     pincode = StringField('Pincode', validators=[DataRequired(), Length(max=10)])
     contact_person = StringField('Contact Person', validators=[Optional(), Length(max=100)])
     contact_phone = StringField('Contact Phone', validators=[Optional(), Length(max=15)])
+    latitude = FloatField('Latitude', validators=[Optional(), NumberRange(min=-90, max=90)])
+    longitude = FloatField('Longitude', validators=[Optional(), NumberRange(min=-180, max=180)])
     is_active = BooleanField('Active')
     
     submit = SubmitField('Save Warehouse')
@@ -0,0 +1,249 @@
+"""Bulk order import from CSV or JSON.
+
+Rows use OrderForm's field names (``order_type``, ``pickup_address``,
+``package_name``, ``driver_phone`` ...) plus an optional ``warehouse_id``
+or ``warehouse`` (name) column; rows without one go to the user's current
+warehouse. The form's own validators are applied column by column over
+the whole file, warehouses and drivers are resolved with one lookup each,
+and valid rows are written with executemany inserts in batches.
+
+import_orders() is a generator of result events, so callers can stream
+errors back while later batches are still being written.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from sqlalchemy import bindparam, insert, select
+from wtforms import DateField, IntegerField, SelectField, SubmitField
+from wtforms.fields.core import UnboundField
+from wtforms.validators import DataRequired, Length
+
+from . import db
+from .analytics import apply_orders
+from .forms import OrderForm
+from .inventory import movement_values, record_movements
+from .live import queue_orders
+from .models import Driver, Order, Warehouse
+from .orders import normalize_order_type, normalize_phone, route_addresses
+
+DEFAULT_BATCH_SIZE = 1000
+
+# Form fields that are not Order columns
+DRIVER_FIELDS = {"driver_name": "name", "driver_phone": "phone", "driver_truck_no": "truck_no"}
+SKIPPED_FIELDS = {"order_type", "selected_warehouse_id"}
+
+orders_table = Order.__table__
+
+# Chunk size for IN (...) lookups, below SQLite's bound parameter limit
+LOOKUP_CHUNK = 500
+
+
+class FieldSpec:
+    """What OrderForm's validators require of one import column"""
+
+    def __init__(self, name, field):
+        validators = field.kwargs.get("validators") or []
+        self.name = name
+        self.required = any(isinstance(v, DataRequired) for v in validators)
+        self.max_length = next((v.max for v in validators if isinstance(v, Length) and v.max >= 0), None)
+        self.choices = {value for value, _ in field.kwargs["choices"]} if field.field_class is SelectField else None
+        self.field_class = field.field_class
+
+    def parse(self, value, required=None):
+        """Converted value, or raise ValueError with the message for the row"""
+        if isinstance(value, str):
+            value = value.strip()
+        if value is None or value == "":
+            if self.required if required is None else required:
+                raise ValueError("This field is required.")
+            return None
+        if self.field_class is IntegerField:
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                raise ValueError("Not a valid integer value.")
+        elif self.field_class is DateField:
+            try:
+                value = datetime.strptime(str(value), "%Y-%m-%d").date()
+            except ValueError:
+                raise ValueError("Not a valid date value (YYYY-MM-DD).")
+        else:
+            value = str(value)
+            if self.max_length is not None and len(value) > self.max_length:
+                raise ValueError(f"Field cannot be longer than {self.max_length} characters.")
+        if self.choices is not None and value not in self.choices:
+            raise ValueError("Not a valid choice.")
+        return value
+
+
+def _field_specs():
+    fields = [(name, field) for name, field in vars(OrderForm).items()
+              if isinstance(field, UnboundField) and field.field_class is not SubmitField and name not in SKIPPED_FIELDS]
+    fields.sort(key=lambda item: item[1].creation_counter)
+    return [FieldSpec(name, field) for name, field in fields]
+
+
+FIELD_SPECS = _field_specs()
+
+
+def read_rows(data, filename=None):
+    """Rows from CSV text or a JSON array; JSON is detected from the name or the first character"""
+    if isinstance(data, bytes):
+        data = data.decode("utf-8-sig")
+    if (filename or "").lower().endswith(".json") or data.lstrip().startswith("["):
+        rows = json.loads(data)
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise ValueError("JSON import must be an array of objects")
+        return rows
+    return list(csv.DictReader(io.StringIO(data)))
+
+
+def _chunks(items, size):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def validate_rows(rows, warehouses, default_warehouse):
+    """Parse every row against the form's fields, one column at a time.
+
+    Returns ``(parsed, errors)``: parsed values per row (None for rows with
+    errors) and ``{row_number: {field: [messages]}}``. Row numbers are
+    1-based, counting data rows only.
+    """
+    errors = {}
+    parsed = [{"order_type": normalize_order_type(row.get("order_type"))} for row in rows]
+
+    def fail(index, field, message):
+        errors.setdefault(index + 1, {})[field] = [message]
+
+    for spec in FIELD_SPECS:
+        # The warehouse end of the route is filled in on import, so only the other end is required
+        routed_type = {"pickup_address": "outgoing", "delivery_address": "incoming"}.get(spec.name)
+        for index, row in enumerate(rows):
+            values = parsed[index]
+            required = False if values["order_type"] == routed_type else None
+            try:
+                values[spec.name] = spec.parse(row.get(spec.name), required)
+            except ValueError as e:
+                fail(index, spec.name, str(e))
+
+    by_id = {str(w.id): w for w in warehouses}
+    by_name = {w.name.strip().lower(): w for w in warehouses}
+    for index, row in enumerate(rows):
+        key = str(row.get("warehouse_id") or "").strip()
+        name = str(row.get("warehouse") or "").strip().lower()
+        warehouse = by_id.get(key) if key else by_name.get(name) if name else default_warehouse
+        if warehouse is None:
+            fail(index, "warehouse", "Not an active warehouse of this account.")
+        parsed[index]["warehouse"] = warehouse
+
+    for index, values in enumerate(parsed):
+        if values.get("driver_phone") and normalize_phone(values["driver_phone"]) is None:
+            fail(index, "driver_phone", "Not a valid phone number.")
+
+    return [None if index + 1 in errors else values for index, values in enumerate(parsed)], errors
+
+
+def resolve_drivers(parsed):
+    """Driver id per normalized phone: one lookup for known phones, one insert for new ones"""
+    new = {}
+    for values in parsed:
+        if values is not None:
+            new.setdefault(normalize_phone(values["driver_phone"]), values)
+
+    driver_ids = {}
+    for chunk in _chunks(new, LOOKUP_CHUNK):
+        driver_ids.update(db.session.execute(
+            select(Driver.phone_normalized, Driver.id).where(Driver.phone_normalized.in_(chunk))
+        ).all())
+
+    # Known drivers keep their details, as in orders.upsert_driver; only empty ones are filled in
+    drivers = Driver.__table__
+    for field, column in DRIVER_FIELDS.items():
+        fills = [{"driver": driver_ids[key], "value": values[field]}
+                 for key, values in new.items() if key in driver_ids and values.get(field)]
+        if fills:
+            db.session.execute(
+                drivers.update()
+                .where(drivers.c.id == bindparam("driver"), drivers.c[column].is_(None) | (drivers.c[column] == ""))
+                .values({column: bindparam("value")}),
+                fills,
+            )
+
+    now = datetime.now()
+    missing = [
+        dict({column: values[field] for field, column in DRIVER_FIELDS.items()},
+             phone_normalized=key, is_active=True, created_at=now)
+        for key, values in new.items() if key not in driver_ids
+    ]
+    for chunk in _chunks(missing, LOOKUP_CHUNK):
+        inserted = db.session.execute(
+            insert(Driver).returning(Driver.phone_normalized, Driver.id, sort_by_parameter_order=True), chunk
+        )
+        driver_ids.update(inserted.all())
+    return driver_ids
+
+
+def import_orders(user, rows, batch_size=DEFAULT_BATCH_SIZE):
+    """Validate and insert ``rows`` for ``user``, yielding result events.
+
+    Events are ``{"row": n, "errors": {...}}`` for each rejected row,
+    ``{"rows": [first, last], "imported": n}`` (or ``"error"``) per batch,
+    and a final ``{"imported": n, "failed": n}``. Each batch commits on
+    its own, together with its new drivers and its rollup and stock ledger
+    entries, which the bulk insert would otherwise skip since it bypasses
+    the ORM events. Live viewers get the new orders once each batch commits.
+    """
+    batch_size = max(1, batch_size or DEFAULT_BATCH_SIZE)
+    warehouses = Warehouse.query.filter_by(user_id=user.id, is_active=True).all()
+    default_warehouse = next((w for w in warehouses if w.id == user.current_warehouse_id), None)
+
+    parsed, errors = validate_rows(rows, warehouses, default_warehouse)
+    failed = len(errors)
+    for row_number in sorted(errors):
+        yield {"row": row_number, "errors": errors[row_number]}
+
+    valid = [(index + 1, values) for index, values in enumerate(parsed) if values is not None]
+    if not valid:
+        yield {"imported": 0, "failed": failed}
+        return
+
+    imported = 0
+    for batch in _chunks(valid, batch_size):
+        try:
+            # Drivers are created in the batch's own transaction, so a failed batch leaves none behind
+            driver_ids = resolve_drivers([values for _, values in batch])
+            now = datetime.now()
+            orders = []
+            for _, values in batch:
+                order = {key: value for key, value in values.items()
+                         if key not in DRIVER_FIELDS and key != "warehouse"}
+                route_addresses(order, order["order_type"], user, values["warehouse"])
+                order.update(
+                    user_id=user.id,
+                    warehouse_id=values["warehouse"].id,
+                    driver_id=driver_ids[normalize_phone(values["driver_phone"])],
+                    created_at=now,
+                )
+                orders.append(order)
+
+            # Core insert: the ORM bulk path splits rows on their NULL columns into many small batches
+            ids = db.session.execute(insert(orders_table).returning(orders_table.c.id, sort_by_parameter_order=True),
+                                     orders).scalars().all()
+            connection = db.session.connection()
+            apply_orders(connection, orders, 1)
+            inserted = [dict(order, id=order_id) for order, order_id in zip(orders, ids)]
+            record_movements(connection, [movement_values(order) for order in inserted])
+            queue_orders(db.session, inserted)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            failed += len(batch)
+            yield {"rows": [batch[0][0], batch[-1][0]], "error": str(e)}
+            continue
+        imported += len(batch)
+        yield {"rows": [batch[0][0], batch[-1][0]], "imported": len(batch)}
+
+    yield {"imported": imported, "failed": failed}
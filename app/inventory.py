@@ -0,0 +1,156 @@
+from datetime import datetime
+from sqlalchemy import and_, case, event, func, insert, inspect, select, update
+
+from . import db
+from .models import InventoryItem, Order, StockMovement
+
+movements = StockMovement.__table__
+items = InventoryItem.__table__
+
+# Item key columns, shared by both tables
+ITEM_KEY = ("user_id", "warehouse_id", "package_name", "package_type")
+
+
+def movement_values(values):
+    """stock_movements row for an order given as a mapping of column values"""
+    quantity = int(values.get("quantity") or 0)
+    return {
+        "order_id": values.get("id"),
+        "user_id": values["user_id"],
+        "warehouse_id": values["warehouse_id"],
+        "package_name": values.get("package_name") or "Unknown",
+        "package_type": values.get("package_type") or "general",
+        "quantity": quantity if values.get("order_type") == "incoming" else -quantity,
+        "created_at": values.get("created_at") or datetime.now(),
+    }
+
+
+def _item_match(table, movement):
+    return and_(*(table.c[name] == movement[name] for name in ITEM_KEY))
+
+
+def record_movement(connection, movement):
+    """Append a movement and fold it into its inventory item, on the caller's transaction"""
+    record_movements(connection, [movement])
+
+
+def record_movements(connection, batch):
+    """Append movements in one executemany, then fold them into their items.
+
+    Movements are summed per item first, so a batch costs one UPDATE (plus
+    an INSERT for new items) per distinct item rather than per movement.
+    """
+    if not batch:
+        return
+    connection.execute(insert(movements), batch)
+
+    totals = {}
+    for movement in batch:
+        key = tuple(movement[name] for name in ITEM_KEY)
+        quantity, count, latest = totals.get(key, (0, 0, movement["created_at"]))
+        totals[key] = (quantity + movement["quantity"], count + 1, max(latest, movement["created_at"]))
+
+    for key, (quantity, count, latest) in totals.items():
+        item = dict(zip(ITEM_KEY, key))
+        result = connection.execute(
+            update(items).where(_item_match(items, item)).values(
+                quantity=items.c.quantity + quantity,
+                usage_count=items.c.usage_count + count,
+                last_movement=case(
+                    (items.c.last_movement.is_(None) | (items.c.last_movement < latest), latest),
+                    else_=items.c.last_movement,
+                ),
+            )
+        )
+        if result.rowcount == 0:
+            connection.execute(insert(items).values(**item, quantity=quantity, usage_count=count, last_movement=latest))
+
+
+def remove_movement(connection, order_id):
+    """Delete an order's movement and take it back out of its inventory item"""
+    movement = connection.execute(select(movements).where(movements.c.order_id == order_id)).mappings().first()
+    if movement is None:
+        return
+    connection.execute(movements.delete().where(movements.c.id == movement["id"]))
+
+    # The item's latest remaining movement; an index lookup on ix_stock_movements_item
+    latest = select(func.max(movements.c.created_at)).where(_item_match(movements, movement)).scalar_subquery()
+    match = _item_match(items, movement)
+    connection.execute(
+        update(items).where(match).values(
+            quantity=items.c.quantity - movement["quantity"],
+            usage_count=items.c.usage_count - 1,
+            last_movement=latest,
+        )
+    )
+    connection.execute(items.delete().where(match, items.c.usage_count <= 0))
+
+
+def _order_values(order):
+    return {name: getattr(order, name) for name in ("id", "user_id", "warehouse_id", "package_name",
+                                                    "package_type", "quantity", "order_type", "created_at")}
+
+
+@event.listens_for(Order, "after_insert")
+def _order_inserted(mapper, connection, target):
+    record_movement(connection, movement_values(_order_values(target)))
+
+
+@event.listens_for(Order, "before_delete")
+def _order_deleted(mapper, connection, target):
+    remove_movement(connection, target.id)
+
+
+@event.listens_for(Order, "after_update")
+def _order_updated(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in _order_values(target)):
+        remove_movement(connection, target.id)
+        record_movement(connection, movement_values(_order_values(target)))
+
+
+def rebuild_inventory(user_id=None):
+    """Rebuild the ledger (or one user's part) from orders, then the items with a GROUP BY"""
+    signed = case((Order.order_type == "incoming", Order.quantity), else_=-Order.quantity)
+    from_orders = select(
+        Order.id, Order.user_id, Order.warehouse_id,
+        func.coalesce(Order.package_name, "Unknown"), func.coalesce(Order.package_type, "general"),
+        signed, Order.created_at,
+    )
+    grouped = select(
+        *(movements.c[name] for name in ITEM_KEY),
+        func.sum(movements.c.quantity), func.count(movements.c.id), func.max(movements.c.created_at),
+    ).group_by(*(movements.c[name] for name in ITEM_KEY))
+    delete_movements = movements.delete()
+    delete_items = items.delete()
+    if user_id is not None:
+        from_orders = from_orders.where(Order.user_id == user_id)
+        grouped = grouped.where(movements.c.user_id == user_id)
+        delete_movements = delete_movements.where(movements.c.user_id == user_id)
+        delete_items = delete_items.where(items.c.user_id == user_id)
+
+    db.session.execute(delete_movements)
+    db.session.execute(insert(movements).from_select(
+        ["order_id", *ITEM_KEY, "quantity", "created_at"], from_orders))
+    db.session.execute(delete_items)
+    db.session.execute(insert(items).from_select(
+        [*ITEM_KEY, "quantity", "usage_count", "last_movement"], grouped))
+
+
+def inventory_snapshot(user_id, warehouse_id=None):
+    """Inventory rows for the page: one per item, summed over warehouses when none is selected"""
+    query = select(
+        items.c.package_name, items.c.package_type,
+        func.sum(items.c.quantity), func.sum(items.c.usage_count), func.max(items.c.last_movement),
+    ).where(items.c.user_id == user_id)
+    if warehouse_id:
+        query = query.where(items.c.warehouse_id == warehouse_id)
+    query = query.group_by(items.c.package_name, items.c.package_type).order_by(items.c.package_name, items.c.package_type)
+
+    return [{
+        'name': name,
+        'type': package_type,
+        'quantity': quantity,
+        'last_movement': last_movement,
+        'usage_count': usage_count,
+    } for name, package_type, quantity, usage_count, last_movement in db.session.execute(query)]
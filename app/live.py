@@ -0,0 +1,223 @@
+"""Live push of driver positions and order changes to MSME browsers (server-sent events).
+
+Each connected page is a Subscriber watching a set of warehouses and the
+drivers on their orders. Publishers (location ingestion, geofence zone
+changes and committed order changes) never wait on a browser: they only
+drop the update into the subscriber's mailbox and wake it. Position
+updates coalesce per driver, so a subscriber holds at most one pending
+fix per driver however fast the fleet reports. Order and zone events
+queue up to LIVE_MAX_PENDING; past that the backlog is discarded and the
+client is told to resync, so one slow browser costs bounded memory and
+never stalls the fan-out.
+
+Every stream holds a worker thread (or greenlet) for its lifetime; serve
+with a threaded or gevent worker when hundreds of viewers are expected.
+"""
+import json
+import threading
+import time
+from collections import deque
+from sqlalchemy import event, inspect, select
+
+from . import db
+from .locations import position_json
+from .models import Order, Warehouse
+
+
+class Subscriber:
+    """One connected stream: its filters and mailbox"""
+
+    def __init__(self, user_id, warehouse_ids, driver_ids, max_pending):
+        self.user_id = user_id
+        self.warehouse_ids = set(warehouse_ids)
+        self.driver_ids = set(driver_ids)
+        self.max_pending = max_pending
+        self.positions = {}
+        self.events = deque()
+        self.overflowed = False
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+
+    def offer_position(self, position):
+        with self.lock:
+            # Coalesce: only the newest fix per driver is kept
+            self.positions[position.driver_id] = position
+        self.wake.set()
+
+    def offer_event(self, event_name, payload):
+        with self.lock:
+            if len(self.events) >= self.max_pending:
+                self.events.clear()
+                self.overflowed = True
+            else:
+                self.events.append((event_name, payload))
+        self.wake.set()
+
+    def drain(self):
+        """Pending ``(positions, events, overflowed)``, leaving the mailbox empty"""
+        with self.lock:
+            positions, self.positions = self.positions, {}
+            events, self.events = list(self.events), deque()
+            overflowed, self.overflowed = self.overflowed, False
+            self.wake.clear()
+        return list(positions.values()), events, overflowed
+
+
+class LiveHub:
+    """Routes published updates to the subscribers watching them"""
+
+    def __init__(self, max_pending=200):
+        self.max_pending = max_pending
+        self.by_driver = {}
+        self.by_warehouse = {}
+        self.lock = threading.Lock()
+
+    def subscribe(self, user_id, warehouse_ids, driver_ids):
+        subscriber = Subscriber(user_id, warehouse_ids, driver_ids, self.max_pending)
+        with self.lock:
+            for driver_id in subscriber.driver_ids:
+                self.by_driver.setdefault(driver_id, set()).add(subscriber)
+            for warehouse_id in subscriber.warehouse_ids:
+                self.by_warehouse.setdefault(warehouse_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            for index, keys in ((self.by_driver, subscriber.driver_ids), (self.by_warehouse, subscriber.warehouse_ids)):
+                for key in keys:
+                    watchers = index.get(key)
+                    if watchers is not None:
+                        watchers.discard(subscriber)
+                        if not watchers:
+                            del index[key]
+
+    def __len__(self):
+        with self.lock:
+            return len({s for watchers in self.by_warehouse.values() for s in watchers})
+
+    def publish_positions(self, positions):
+        """Hand each Position to the subscribers watching its driver"""
+        by_driver = self.by_driver
+        for position in positions:
+            watchers = by_driver.get(position.driver_id)
+            if watchers:
+                for subscriber in tuple(watchers):
+                    subscriber.offer_position(position)
+
+    def publish_order(self, payload):
+        """Hand an order change to the subscribers of its warehouse, who then also watch its driver"""
+        with self.lock:
+            watchers = tuple(self.by_warehouse.get(payload["warehouse_id"], ()))
+            driver_id = payload.get("driver_id")
+            if driver_id is not None:
+                for subscriber in watchers:
+                    if driver_id not in subscriber.driver_ids:
+                        subscriber.driver_ids.add(driver_id)
+                        self.by_driver.setdefault(driver_id, set()).add(subscriber)
+        for subscriber in watchers:
+            subscriber.offer_event("order", payload)
+
+    def publish_zone_events(self, events):
+        """Hand geofence enter/exit events to the warehouse's subscribers that watch the driver"""
+        for payload in events:
+            with self.lock:
+                watchers = [subscriber for subscriber in self.by_warehouse.get(payload["warehouse_id"], ())
+                            if payload["driver_id"] in subscriber.driver_ids]
+            for subscriber in watchers:
+                subscriber.offer_event("zone", payload)
+
+
+def sse(event_name, data):
+    return f"event: {event_name}\ndata: {json.dumps(data)}\n\n"
+
+
+def stream(hub, subscriber, snapshot, interval, heartbeat):
+    """SSE frames for one subscriber: the ``snapshot`` payload, then coalesced deltas at most every ``interval`` seconds"""
+    try:
+        yield sse("snapshot", snapshot)
+        last_push = 0.0
+        while True:
+            if not subscriber.wake.wait(heartbeat):
+                yield ": keepalive\n\n"
+                continue
+            # Let updates pile up (and coalesce) for the rest of the push interval
+            wait = last_push + interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            positions, events, overflowed = subscriber.drain()
+            if overflowed:
+                yield sse("resync", {"reason": "too many pending updates"})
+            for event_name, payload in events:
+                yield sse(event_name, payload)
+            if positions:
+                yield sse("positions", {"positions": [position_json(p) for p in positions]})
+            last_push = time.monotonic()
+    finally:
+        hub.unsubscribe(subscriber)
+
+
+def subscriber_filters(user_id, warehouse_id=None):
+    """The user's active warehouses (or just ``warehouse_id``) and the drivers on their orders"""
+    warehouse_ids = set(db.session.execute(
+        select(Warehouse.id).where(Warehouse.user_id == user_id, Warehouse.is_active.is_(True))
+    ).scalars())
+    if warehouse_id is not None:
+        warehouse_ids &= {warehouse_id}
+    driver_ids = set(db.session.execute(
+        select(Order.driver_id).where(Order.user_id == user_id, Order.warehouse_id.in_(warehouse_ids),
+                                      Order.driver_id.isnot(None)).distinct()
+    ).scalars()) if warehouse_ids else set()
+    return warehouse_ids, driver_ids
+
+
+# -----------------------------
+# Order changes, published once committed
+# -----------------------------
+PAYLOAD_FIELDS = ("id", "warehouse_id", "order_type", "package_name", "date", "time_slot", "driver_id")
+
+
+def _order_payload(values, change):
+    """Live payload of an order from its column values (a mapping)"""
+    payload = {"change": change}
+    payload.update((name, values.get(name)) for name in PAYLOAD_FIELDS)
+    payload["date"] = payload["date"].isoformat() if payload["date"] else None
+    return payload
+
+
+def queue_orders(session, orders, change="created"):
+    """Publish orders written with Core (column value dicts with ``id``) once ``session`` commits"""
+    session.info.setdefault("live_orders", []).extend(_order_payload(order, change) for order in orders)
+
+
+def _queue(change):
+    def listener(mapper, connection, target):
+        values = {name: getattr(target, name) for name in PAYLOAD_FIELDS}
+        inspect(target).session.info.setdefault("live_orders", []).append(_order_payload(values, change))
+    return listener
+
+
+event.listen(Order, "after_insert", _queue("created"))
+event.listen(Order, "after_update", _queue("updated"))
+event.listen(Order, "after_delete", _queue("deleted"))
+
+
+@event.listens_for(db.session, "after_commit")
+def _publish_committed(session):
+    payloads = session.info.pop("live_orders", None)
+    if payloads:
+        from flask import current_app
+        hub = current_app.extensions.get("live_hub")
+        if hub is not None:
+            for payload in payloads:
+                hub.publish_order(payload)
+
+
+@event.listens_for(db.session, "after_rollback")
+def _discard_rolled_back(session):
+    session.info.pop("live_orders", None)
+
+
+def init_app(app):
+    hub = LiveHub(app.config['LIVE_MAX_PENDING'])
+    app.extensions['live_hub'] = hub
+    return hub
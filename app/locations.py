@@ -0,0 +1,293 @@
+"""Driver location ingestion.
+
+Fixes posted by the driver app are parsed in the request and go to two
+places (see ingest()):
+
+- a PositionRegistry holding each driver's latest fix in memory, which
+  answers "where is everyone now" without touching the database;
+- a write-behind buffer; a background thread writes it to driver_locations
+  with one executemany per flush, together with each driver's
+  last_location_update. A flush happens every LOCATION_FLUSH_MS, or as
+  soon as LOCATION_BUFFER_SIZE fixes are waiting, so requests never wait
+  on the database. LOCATION_WRITE_THROUGH = False keeps positions in
+  memory only.
+"""
+import atexit
+import math
+import threading
+import time
+from array import array
+from collections import namedtuple
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import and_, bindparam, select
+
+from . import db
+from .models import Driver, DriverLocation
+
+locations = DriverLocation.__table__
+drivers = Driver.__table__
+
+# Fixes accepted in one request
+MAX_BATCH = 1000
+# How far ahead of the server clock a device may report; later fixes are rejected
+MAX_CLOCK_SKEW = timedelta(minutes=2)
+
+
+def parse_timestamp(value):
+    """Fix time from epoch milliseconds (as browsers report it) or an ISO string; now if missing"""
+    if value is None or value == "":
+        return datetime.now()
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value / 1000)
+    parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    # Stored as naive local time, like the rest of the app
+    return parsed.astimezone().replace(tzinfo=None) if parsed.tzinfo else parsed
+
+
+def parse_fix(data):
+    """driver_locations row for one posted fix, or raise ValueError"""
+    try:
+        latitude = float(data["latitude"])
+        longitude = float(data["longitude"])
+        accuracy = float(data["accuracy"]) if data.get("accuracy") is not None else None
+        driver_id = int(data["driver_id"])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("latitude, longitude and driver_id are required numbers")
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError("latitude/longitude out of range")
+    try:
+        timestamp = parse_timestamp(data.get("timestamp"))
+    except (TypeError, ValueError, OverflowError, OSError):
+        raise ValueError("timestamp must be epoch milliseconds or an ISO date-time")
+    # A future fix would outrank every real one in the position registry
+    if timestamp > datetime.now() + MAX_CLOCK_SKEW:
+        raise ValueError("timestamp is in the future")
+    return {
+        "driver_id": driver_id,
+        "latitude": latitude,
+        "longitude": longitude,
+        "accuracy": accuracy,
+        "timestamp": timestamp,
+    }
+
+
+def known_drivers(connection, driver_ids):
+    """Those of ``driver_ids`` that exist in drivers"""
+    if not driver_ids:
+        return set()
+    return set(connection.execute(select(drivers.c.id).where(drivers.c.id.in_(set(driver_ids)))).scalars())
+
+
+def write_fixes(connection, fixes):
+    """Insert fixes and advance each driver's last_location_update, on the caller's transaction.
+
+    Fixes for unknown drivers are dropped. Returns the number written.
+    """
+    known = known_drivers(connection, {fix["driver_id"] for fix in fixes})
+    fixes = [fix for fix in fixes if fix["driver_id"] in known]
+    if not fixes:
+        return 0
+    connection.execute(locations.insert(), fixes)
+
+    latest = {}
+    for fix in fixes:
+        if fix["driver_id"] not in latest or fix["timestamp"] > latest[fix["driver_id"]]:
+            latest[fix["driver_id"]] = fix["timestamp"]
+    connection.execute(
+        drivers.update()
+        .where(drivers.c.id == bindparam("driver"),
+               drivers.c.last_location_update.is_(None) | (drivers.c.last_location_update < bindparam("seen")))
+        .values(last_location_update=bindparam("seen")),
+        [{"driver": driver_id, "seen": seen} for driver_id, seen in latest.items()],
+    )
+    return len(fixes)
+
+
+# A driver's latest fix; timestamp is epoch seconds and a missing accuracy is NaN
+Position = namedtuple("Position", "driver_id latitude longitude accuracy timestamp")
+
+
+def position_json(position):
+    return {
+        "driver_id": position.driver_id,
+        "latitude": position.latitude,
+        "longitude": position.longitude,
+        "accuracy": None if math.isnan(position.accuracy) else position.accuracy,
+        "timestamp": datetime.fromtimestamp(position.timestamp).isoformat(timespec="seconds"),
+    }
+
+
+class PositionRegistry:
+    """Latest fix per driver, in parallel arrays indexed through a driver id -> slot map.
+
+    A removed driver's slot is refilled with the last one, so the arrays
+    stay dense and a scan over the whole fleet is a tight loop over
+    machine values.
+    """
+
+    def __init__(self):
+        self.slots = {}
+        self.driver_ids = array('q')
+        self.latitudes = array('d')
+        self.longitudes = array('d')
+        self.accuracies = array('d')
+        self.timestamps = array('d')
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.driver_ids)
+
+    def update(self, fixes):
+        """Record fixes, ignoring any older than the position already held; returns the Positions taken"""
+        changed = []
+        with self.lock:
+            for fix in fixes:
+                position = Position(fix["driver_id"], fix["latitude"], fix["longitude"],
+                                    math.nan if fix["accuracy"] is None else fix["accuracy"],
+                                    fix["timestamp"].timestamp())
+                slot = self.slots.get(position.driver_id)
+                if slot is None:
+                    self.slots[position.driver_id] = len(self.driver_ids)
+                    self.driver_ids.append(position.driver_id)
+                    self.latitudes.append(position.latitude)
+                    self.longitudes.append(position.longitude)
+                    self.accuracies.append(position.accuracy)
+                    self.timestamps.append(position.timestamp)
+                elif position.timestamp >= self.timestamps[slot]:
+                    self.latitudes[slot] = position.latitude
+                    self.longitudes[slot] = position.longitude
+                    self.accuracies[slot] = position.accuracy
+                    self.timestamps[slot] = position.timestamp
+                else:
+                    continue
+                changed.append(position)
+        return changed
+
+    def remove(self, driver_id):
+        with self.lock:
+            slot = self.slots.pop(driver_id, None)
+            if slot is None:
+                return
+            columns = (self.driver_ids, self.latitudes, self.longitudes, self.accuracies, self.timestamps)
+            last = len(self.driver_ids) - 1
+            if slot != last:
+                for column in columns:
+                    column[slot] = column[last]
+                self.slots[self.driver_ids[slot]] = slot
+            for column in columns:
+                column.pop()
+
+    def get(self, driver_id):
+        """Latest Position of one driver, or None"""
+        with self.lock:
+            slot = self.slots.get(driver_id)
+            if slot is None:
+                return None
+            return Position(driver_id, self.latitudes[slot], self.longitudes[slot],
+                            self.accuracies[slot], self.timestamps[slot])
+
+    def active(self, max_age=None, driver_ids=None):
+        """Positions reported within ``max_age`` seconds (all if None), optionally only for ``driver_ids``"""
+        cutoff = time.time() - max_age if max_age is not None else -math.inf
+        with self.lock:
+            if driver_ids is None:
+                rows = zip(self.driver_ids, self.latitudes, self.longitudes, self.accuracies, self.timestamps)
+                return [tuple.__new__(Position, row) for row in rows if row[4] >= cutoff]
+            slots = [self.slots[d] for d in driver_ids if d in self.slots]
+            return [Position(self.driver_ids[slot], self.latitudes[slot], self.longitudes[slot],
+                             self.accuracies[slot], self.timestamps[slot])
+                    for slot in slots if self.timestamps[slot] >= cutoff]
+
+    def load(self, connection):
+        """Warm start from each driver's newest stored fix, one indexed lookup per driver"""
+        rows = connection.execute(
+            select(locations.c.driver_id, locations.c.latitude, locations.c.longitude,
+                   locations.c.accuracy, locations.c.timestamp)
+            .join(drivers, and_(drivers.c.id == locations.c.driver_id,
+                                drivers.c.last_location_update == locations.c.timestamp))
+        ).mappings().all()
+        return len(self.update(rows))
+
+
+class LocationBuffer:
+    """Thread-safe write-behind buffer of fixes, flushed in bulk by a daemon thread"""
+
+    def __init__(self, app, max_points=500, flush_ms=250):
+        self.app = app
+        self.max_points = max_points
+        self.interval = flush_ms / 1000
+        self.pending = []
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.thread = None
+        self.written = 0
+
+    def add(self, fixes):
+        with self.lock:
+            self.pending.extend(fixes)
+            full = len(self.pending) >= self.max_points
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="location-flush", daemon=True)
+                self.thread.start()
+        if full:
+            self.wake.set()
+
+    def flush(self):
+        """Write everything pending in one transaction; returns the number of fixes written"""
+        with self.lock:
+            batch, self.pending = self.pending, []
+        if not batch:
+            return 0
+        with self.app.app_context():
+            with db.engine.begin() as connection:
+                written = write_fixes(connection, batch)
+        self.written += written
+        return written
+
+    def _run(self):
+        while True:
+            self.wake.wait(self.interval)
+            self.wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                self.app.logger.error(f"Error writing driver locations: {e}")
+
+
+def ingest(fixes):
+    """Record parsed fixes in the current app's position registry and, with write-through, the database.
+
+    Positions that moved a driver forward update the geofence and are
+    pushed to live viewers, with any zone enter/exit events they caused.
+    """
+    changed = current_app.extensions['driver_positions'].update(fixes)
+    geofence = current_app.extensions.get('geofence')
+    zone_events = geofence.update(changed) if geofence is not None and changed else []
+    hub = current_app.extensions.get('live_hub')
+    if hub is not None and changed:
+        hub.publish_positions(changed)
+        hub.publish_zone_events(zone_events)
+    if current_app.config['LOCATION_WRITE_THROUGH']:
+        current_app.extensions['location_buffer'].add(fixes)
+
+
+def forget_driver(driver_id):
+    """Drop a deleted driver from the current app's in-memory positions and geofence"""
+    current_app.extensions['driver_positions'].remove(driver_id)
+    geofence = current_app.extensions.get('geofence')
+    if geofence is not None:
+        geofence.remove_driver(driver_id)
+
+
+def init_app(app):
+    registry = PositionRegistry()
+    with app.app_context():
+        with db.engine.connect() as connection:
+            registry.load(connection)
+    app.extensions['driver_positions'] = registry
+
+    buffer = LocationBuffer(app, app.config['LOCATION_BUFFER_SIZE'], app.config['LOCATION_FLUSH_MS'])
+    app.extensions['location_buffer'] = buffer
+    # Don't lose the last partial batch on shutdown
+    atexit.register(buffer.flush)
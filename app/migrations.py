@@ -0,0 +1,226 @@
+"""Versioned data migrations.
+
+Each migration runs once per database: applied versions are recorded in
+``schema_migrations``, so after the first boot startup only reads that
+table. Migrations work in set-based SQL rather than loading orders into
+Python. A migration's version row is inserted before it runs and commits
+with it, so a second process racing on the same version fails on that
+insert and skips it.
+"""
+from datetime import datetime, time
+from collections import defaultdict
+from sqlalchemy import bindparam, delete, exists, func, inspect, select, text, update
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.schema import CreateColumn
+
+from . import db
+from .models import Driver, DriverLocation, DriverLocationMinute, Order, SchemaMigration, User, Warehouse
+
+MIGRATIONS = []
+
+
+def migration(version, name):
+    """Register ``fn`` as migration ``version``; versions run in ascending order"""
+    def register(fn):
+        MIGRATIONS.append((version, name, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return register
+
+
+def applied_versions():
+    return set(db.session.execute(select(SchemaMigration.version)).scalars())
+
+
+def run_migrations():
+    """Apply pending migrations; each one commits together with its version row"""
+    done = applied_versions()
+    for version, name, fn in MIGRATIONS:
+        if version in done:
+            continue
+        print(f"Applying migration {version:04d}: {name}")
+        try:
+            db.session.add(SchemaMigration(version=version, name=name, applied_at=datetime.now()))
+            db.session.flush()
+        except IntegrityError:
+            # Another process recorded this version first
+            db.session.rollback()
+            continue
+        try:
+            fn()
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            current_app.logger.exception(f"Migration {version:04d} ({name}) failed")
+            raise
+
+
+def existing_columns(table):
+    return {column["name"] for column in inspect(db.session.connection()).get_columns(table.name)}
+
+
+def add_missing_column(column):
+    """ALTER TABLE ... ADD COLUMN for a model column create_all() can't add to an existing table"""
+    if column.name not in existing_columns(column.table):
+        ddl = CreateColumn(column).compile(dialect=db.engine.dialect)
+        db.session.execute(text(f"ALTER TABLE {column.table.name} ADD COLUMN {ddl}"))
+
+
+def create_missing_indexes():
+    """Create declared indexes on tables that create_all() found already present.
+
+    Indexes over columns that a later migration adds are left to that migration.
+    """
+    connection = db.session.connection()
+    for table in db.metadata.tables.values():
+        columns = existing_columns(table)
+        for index in table.indexes:
+            if all(column.name in columns for column in index.columns):
+                index.create(connection, checkfirst=True)
+
+
+@migration(1, "default warehouse for orders without one")
+def assign_default_warehouse():
+    if not db.session.execute(select(Order.id).where(Order.warehouse_id.is_(None)).limit(1)).first():
+        return
+    first_user = User.query.first()
+    if not first_user:
+        print("No users found. Cannot create default warehouse.")
+        return
+
+    default_warehouse = Warehouse(
+        name="Default Warehouse",
+        address="Default Address",
+        city="Default City",
+        state="Default State",
+        pincode="000000",
+        contact_person=first_user.name,
+        contact_phone="N/A",
+        is_active=True,
+        user_id=first_user.id
+    )
+    db.session.add(default_warehouse)
+    db.session.flush()
+    result = db.session.execute(
+        update(Order).where(Order.warehouse_id.is_(None)).values(warehouse_id=default_warehouse.id)
+    )
+    print(f"Moved {result.rowcount} orders to the default warehouse")
+
+
+@migration(2, "classify orders picked up at their own warehouse as incoming")
+def classify_incoming_orders():
+    # Pickup address matches the order's warehouse address (case and whitespace insensitive)
+    picked_up_at_warehouse = exists().where(
+        Warehouse.id == Order.warehouse_id,
+        func.lower(func.trim(Warehouse.address)) == func.lower(func.trim(Order.pickup_address)),
+    )
+    msme_name = select(User.name).where(User.id == Order.user_id).scalar_subquery()
+    result = db.session.execute(
+        update(Order)
+        .where((Order.order_type == "outgoing") | Order.order_type.is_(None), picked_up_at_warehouse)
+        .values(
+            order_type="incoming",
+            # Auto-fill customer name with MSME details if not already set
+            customer_name=func.coalesce(func.nullif(Order.customer_name, ""), msme_name),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    print(f"Classified {result.rowcount} orders as incoming")
+
+
+@migration(3, "order listing and inventory indexes")
+def add_indexes():
+    create_missing_indexes()
+
+
+@migration(4, "build order rollups and inventory ledger")
+def build_aggregates():
+    # Bulk updates above bypass the ORM events that maintain these tables
+    from .analytics import rebuild_rollups
+    from .inventory import rebuild_inventory
+    rebuild_rollups()
+    rebuild_inventory()
+
+
+@migration(5, "warehouse and dashboard indexes")
+def add_performance_indexes():
+    create_missing_indexes()
+
+
+@migration(6, "merge drivers sharing a phone number")
+def dedupe_drivers():
+    from .orders import normalize_phone
+    add_missing_column(Driver.__table__.c.phone_normalized)
+
+    # Keep the oldest row per phone number with its details, as orders.upsert_driver does for
+    # drivers entered later; the duplicates only fill in a missing truck number
+    by_phone = defaultdict(list)
+    truck_nos = {}
+    for driver_id, phone, truck_no in db.session.execute(
+            select(Driver.id, Driver.phone, Driver.truck_no).order_by(Driver.id)):
+        by_phone[normalize_phone(phone)].append(driver_id)
+        truck_nos[driver_id] = truck_no
+
+    merged = 0
+    for key, ids in by_phone.items():
+        if key is None or len(ids) == 1:
+            continue
+        keep, duplicates = ids[0], ids[1:]
+        if not truck_nos[keep]:
+            truck_no = next((truck_nos[d] for d in reversed(duplicates) if truck_nos[d]), None)
+            if truck_no:
+                db.session.execute(update(Driver).where(Driver.id == keep).values(truck_no=truck_no)
+                                   .execution_options(synchronize_session=False))
+        for model in (Order, DriverLocation, DriverLocationMinute):
+            db.session.execute(update(model).where(model.driver_id.in_(duplicates)).values(driver_id=keep)
+                               .execution_options(synchronize_session=False))
+        db.session.execute(delete(Driver).where(Driver.id.in_(duplicates)).execution_options(synchronize_session=False))
+        merged += len(duplicates)
+
+    drivers = Driver.__table__
+    keys = [{"driver_id": ids[0], "key": key} for key, ids in by_phone.items() if key is not None]
+    if keys:
+        db.session.execute(
+            drivers.update().where(drivers.c.id == bindparam("driver_id")).values(phone_normalized=bindparam("key")),
+            keys,
+        )
+    create_missing_indexes()
+    print(f"Merged {merged} duplicate drivers")
+
+
+@migration(7, "driver location index")
+def add_location_index():
+    create_missing_indexes()
+
+
+@migration(8, "order driver index for the fleet positions feed")
+def add_order_driver_index():
+    create_missing_indexes()
+
+
+@migration(9, "warehouse coordinates")
+def add_warehouse_coordinates():
+    add_missing_column(Warehouse.__table__.c.latitude)
+    add_missing_column(Warehouse.__table__.c.longitude)
+
+
+@migration(10, "creation time for orders without one")
+def backfill_order_created_at():
+    # Listings page on (created_at, id); a NULL would end the cursor. SQLite can't add NOT NULL to an
+    # existing column, so older databases rely on the model default and this backfill
+    rows = db.session.execute(select(Order.id, Order.user_id, Order.date).where(Order.created_at.is_(None))).all()
+    if not rows:
+        return
+    orders = Order.__table__
+    db.session.execute(
+        orders.update().where(orders.c.id == bindparam("order_id")).values(created_at=bindparam("at")),
+        [{"order_id": order_id, "at": datetime.combine(day, time.min)} for order_id, _, day in rows],
+    )
+    # Rollup days and ledger times were derived from the missing value
+    from .analytics import rebuild_rollups
+    from .inventory import rebuild_inventory
+    for user_id in {user_id for _, user_id, _ in rows}:
+        rebuild_rollups(user_id)
+        rebuild_inventory(user_id)
+    print(f"Dated {len(rows)} orders by their scheduled day")
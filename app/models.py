@@ -8,6 +8,9 @@ from datetime import datetime
 # -----------------------------
 class Warehouse(db.Model):
     __tablename__ = "warehouses"
+    __table_args__ = (
+        db.Index("ix_warehouses_user_active", "user_id", "is_active"),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -17,6 +20,9 @@ class Warehouse(db.Model):
     pincode = db.Column(db.String(10), nullable=False)
     contact_person = db.Column(db.String(100))
     contact_phone = db.Column(db.String(15))
+    # Site coordinates, for geofencing (see app.spatial)
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.now)
     
@@ -73,6 +79,22 @@ class User(db.Model, UserMixin):
 # -----------------------------
 class Order(db.Model):
     __tablename__ = "orders"
+    __table_args__ = (
+        # Newest-first listings, keyset-paginated on (created_at, id)
+        db.Index("ix_orders_user_created", "user_id", "created_at"),
+        db.Index("ix_orders_user_type_created", "user_id", "order_type", "created_at"),
+        db.Index("ix_orders_user_warehouse_created", "user_id", "warehouse_id", "created_at"),
+        db.Index("ix_orders_user_warehouse_type_created", "user_id", "warehouse_id", "order_type", "created_at"),
+        # Covers the dashboard counters (order_type, date >= today) without touching the table
+        db.Index("ix_orders_user_warehouse_type_date", "user_id", "warehouse_id", "order_type", "date"),
+        # Analysis page: top logistics companies per user
+        db.Index("ix_orders_user_logistic", "user_id", "logistic_company"),
+        # driver.orders when deleting an order, warehouse.orders when deleting a warehouse
+        db.Index("ix_orders_driver", "driver_id"),
+        db.Index("ix_orders_warehouse", "warehouse_id"),
+        # The user's drivers, for the fleet positions feed
+        db.Index("ix_orders_user_driver", "user_id", "driver_id"),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
     warehouse_id = db.Column(db.Integer, db.ForeignKey("warehouses.id"), nullable=False)
@@ -103,7 +125,8 @@ class Order(db.Model):
     date = db.Column(db.Date, nullable=False)
     time_slot = db.Column(db.String(20), nullable=False)  # Changed from Time to String
 
-    created_at = db.Column(db.DateTime, default=datetime.now)
+    # Part of the listing's keyset cursor, so never NULL (migration 10 backfills older rows)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
 
     # Relationships
     driver = db.relationship("Driver", back_populates="orders")
@@ -111,11 +134,68 @@ class Order(db.Model):
     warehouse = db.relationship("Warehouse", back_populates="orders")
 
 
+# -----------------------------
+# ORDER ROLLUP (analytics)
+# -----------------------------
+class OrderDailyRollup(db.Model):
+    """Order count and quantity per user, warehouse, day and category; maintained by app.analytics"""
+    __tablename__ = "order_daily_rollups"
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    warehouse_id = db.Column(db.Integer, db.ForeignKey("warehouses.id"), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    order_type = db.Column(db.String(20), primary_key=True)
+    package_priority = db.Column(db.String(20), primary_key=True)
+    package_type = db.Column(db.String(50), primary_key=True)
+
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+
+
+# -----------------------------
+# INVENTORY (stock ledger)
+# -----------------------------
+class StockMovement(db.Model):
+    """Signed stock change from one order: incoming adds, outgoing removes"""
+    __tablename__ = "stock_movements"
+    __table_args__ = (
+        db.Index("ix_stock_movements_item", "user_id", "warehouse_id", "package_name", "package_type", "created_at"),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, db.ForeignKey("orders.id"), unique=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    warehouse_id = db.Column(db.Integer, db.ForeignKey("warehouses.id"), nullable=False)
+    package_name = db.Column(db.String(100), nullable=False)
+    package_type = db.Column(db.String(50), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.now)
+
+
+class InventoryItem(db.Model):
+    """Current stock per warehouse and item, kept in step with stock_movements by app.inventory"""
+    __tablename__ = "inventory_items"
+    __table_args__ = (
+        db.UniqueConstraint("user_id", "warehouse_id", "package_name", "package_type", name="uq_inventory_items_item"),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    warehouse_id = db.Column(db.Integer, db.ForeignKey("warehouses.id"), nullable=False)
+    package_name = db.Column(db.String(100), nullable=False)
+    package_type = db.Column(db.String(50), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    usage_count = db.Column(db.Integer, nullable=False, default=0)
+    last_movement = db.Column(db.DateTime)
+
+
 class Driver(db.Model):
     __tablename__ = "drivers"
+    __table_args__ = (
+        # One driver per phone number; see app.orders.upsert_driver
+        db.Index("uq_drivers_phone_normalized", "phone_normalized", unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     phone = db.Column(db.String(15), nullable=False)
+    phone_normalized = db.Column(db.String(15))
     truck_no = db.Column(db.String(50), nullable=True)
     email = db.Column(db.String(120), unique=True, nullable=True)
     is_active = db.Column(db.Boolean, default=True)
@@ -124,13 +204,19 @@ class Driver(db.Model):
 
     # Relationship with Order
     orders = db.relationship("Order", back_populates="driver")
-    locations = db.relationship("DriverLocation", back_populates="driver", lazy="dynamic")
+    # Location history goes with the driver; see app.orders.delete_driver
+    locations = db.relationship("DriverLocation", back_populates="driver", lazy="dynamic",
+                                cascade="all, delete-orphan", passive_deletes=True)
 
 
 class DriverLocation(db.Model):
     __tablename__ = "driver_locations"
+    __table_args__ = (
+        # A driver's track, and their latest fix, in time order
+        db.Index("ix_driver_locations_driver_time", "driver_id", "timestamp"),
+    )
     id = db.Column(db.Integer, primary_key=True)
-    driver_id = db.Column(db.Integer, db.ForeignKey("drivers.id"), nullable=False)
+    driver_id = db.Column(db.Integer, db.ForeignKey("drivers.id", ondelete="CASCADE"), nullable=False)
     latitude = db.Column(db.Float, nullable=False)
     longitude = db.Column(db.Float, nullable=False)
     accuracy = db.Column(db.Float)
@@ -139,6 +225,40 @@ class DriverLocation(db.Model):
     # Relationship
     driver = db.relationship("Driver", back_populates="locations")
 
+
+class DriverLocationMinute(db.Model):
+    """Mean position per driver and minute for fixes past full retention; maintained by app.trajectories"""
+    __tablename__ = "driver_location_minutes"
+    __table_args__ = {"sqlite_with_rowid": False}
+    driver_id = db.Column(db.Integer, db.ForeignKey("drivers.id", ondelete="CASCADE"), primary_key=True)
+    minute = db.Column(db.DateTime, primary_key=True)
+    latitude = db.Column(db.Float, nullable=False)
+    longitude = db.Column(db.Float, nullable=False)
+    samples = db.Column(db.Integer, nullable=False, default=1)
+
+
+class LocationCompaction(db.Model):
+    """One run of the driver location compaction job, with what it removed"""
+    __tablename__ = "location_compactions"
+    id = db.Column(db.Integer, primary_key=True)
+    ran_at = db.Column(db.DateTime, default=datetime.now)
+    # Closed trips before this time have been simplified
+    simplified_before = db.Column(db.DateTime, nullable=False)
+    simplified = db.Column(db.Integer, nullable=False, default=0)
+    downsampled = db.Column(db.Integer, nullable=False, default=0)
+    purged = db.Column(db.Integer, nullable=False, default=0)
+    bytes_saved = db.Column(db.Integer)
+
+# -----------------------------
+# SCHEMA MIGRATIONS
+# -----------------------------
+class SchemaMigration(db.Model):
+    """Data migrations already applied to this database (see app.migrations)"""
+    __tablename__ = "schema_migrations"
+    version = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(200), nullable=False)
+    applied_at = db.Column(db.DateTime, default=datetime.now)
+
 # Login Manager
 # ----------------------------
 @login_manager.user_loader
@@ -0,0 +1,111 @@
+import re
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+
+from . import db
+from .models import Driver, DriverLocation, DriverLocationMinute, Order
+
+ORDER_TYPES = ("incoming", "outgoing")
+
+
+def normalize_phone(phone):
+    """Digits of a phone number without country code or trunk prefix, so
+    ``+91 98111-22334`` and ``098111 22334`` give the same key"""
+    digits = re.sub(r"\D", "", phone or "")
+    return digits[-10:] if len(digits) > 10 else digits or None
+
+
+def upsert_driver(name, phone, truck_no=None):
+    """The driver with this phone number, created if it's new.
+
+    Drivers are shared by every MSME that enters the same phone number, so
+    an existing driver keeps its details; only empty ones are filled in.
+    A new driver is only added to the session; the caller commits it with
+    whatever uses it (see create_order() for the race on the phone number).
+    """
+    key = normalize_phone(phone)
+    driver = db.session.execute(select(Driver).where(Driver.phone_normalized == key)).scalar_one_or_none() if key else None
+    if driver is None:
+        driver = Driver(name=name, phone=phone, truck_no=truck_no, phone_normalized=key)
+        db.session.add(driver)
+        return driver
+
+    fill_driver_details(driver, {"name": name, "phone": phone, "truck_no": truck_no})
+    return driver
+
+
+def fill_driver_details(driver, details):
+    """Set those of ``details`` (column -> value) the driver has no value for yet"""
+    for column, value in details.items():
+        if value and not getattr(driver, column):
+            setattr(driver, column, value)
+
+
+def delete_driver(driver):
+    """Delete a driver and their location history.
+
+    Only flushes; after committing, the caller drops the driver from the
+    in-memory positions with locations.forget_driver().
+    """
+    # SQLite doesn't enforce ON DELETE CASCADE without PRAGMA foreign_keys, so delete explicitly
+    for model in (DriverLocation, DriverLocationMinute):
+        db.session.execute(delete(model).where(model.driver_id == driver.id))
+    db.session.delete(driver)
+
+
+def format_warehouse_address(warehouse):
+    return f"{warehouse.address}, {warehouse.city}, {warehouse.state}" if warehouse else ""
+
+
+def normalize_order_type(order_type):
+    order_type = (order_type or "outgoing").strip().lower()
+    return order_type if order_type in ORDER_TYPES else "outgoing"
+
+
+def route_addresses(fields, order_type, user, warehouse):
+    """Fill the warehouse end of an order: incoming orders are delivered to
+    ``warehouse``, outgoing ones are picked up there"""
+    if order_type == "incoming":
+        fields["delivery_address"] = format_warehouse_address(warehouse)
+        # Incoming goods are received by the MSME itself
+        fields["customer_name"] = fields.get("customer_name") or user.name
+    else:
+        fields["pickup_address"] = format_warehouse_address(warehouse)
+    return fields
+
+
+def create_order(user, warehouse, driver, order_type="outgoing", route_warehouse=None, **fields):
+    """Create an order and its driver in a single transaction.
+
+    ``driver`` is a mapping with ``name``, ``phone`` and ``truck_no``; the
+    driver row is reused when the phone number is already known. The
+    order is routed through ``route_warehouse`` (default ``warehouse``),
+    see route_addresses(). Rolls back and re-raises on failure, so a failed
+    order never leaves a new driver behind.
+    """
+    order_type = normalize_order_type(order_type)
+    route_addresses(fields, order_type, user, route_warehouse or warehouse)
+
+    for attempt in range(2):
+        new_driver = False
+        try:
+            order_driver = upsert_driver(driver["name"], driver["phone"], driver.get("truck_no"))
+            new_driver = order_driver.id is None
+            order = Order(
+                user_id=user.id,
+                warehouse_id=warehouse.id,
+                order_type=order_type,
+                driver=order_driver,
+                **fields,
+            )
+            db.session.add(order)
+            db.session.commit()
+            return order
+        except IntegrityError:
+            db.session.rollback()
+            # Another request created a driver with this phone first; the retry finds their row
+            if attempt or not new_driver:
+                raise
+        except Exception:
+            db.session.rollback()
+            raise
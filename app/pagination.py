@@ -0,0 +1,50 @@
+from datetime import datetime
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(created_at, row_id):
+    return f"{created_at.isoformat()}~{row_id}"
+
+
+def decode_cursor(cursor):
+    """``(created_at, id)`` from a cursor string, or None if it is missing or malformed"""
+    if not cursor:
+        return None
+    try:
+        created_at, row_id = cursor.rsplit("~", 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except ValueError:
+        return None
+
+
+def page_size(value):
+    """Clamp a requested page size to 1..MAX_PAGE_SIZE"""
+    if not value or value < 1:
+        return DEFAULT_PAGE_SIZE
+    return min(value, MAX_PAGE_SIZE)
+
+
+def keyset_page(query, created_col, id_col, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """Newest-first page of ``query`` after ``cursor``; returns ``(items, next_cursor)``.
+
+    Pages are keyed on ``(created_col, id_col)`` rather than OFFSET, so each
+    page is an index range scan no matter how deep into the list it is.
+    """
+    position = decode_cursor(cursor)
+    if position:
+        created_at, row_id = position
+        # The redundant bound lets the database range-scan the (…, created_at) index
+        query = query.filter(created_col <= created_at,
+                             or_(created_col < created_at, and_(created_col == created_at, id_col < row_id)))
+
+    # One extra row tells us whether another page exists
+    items = query.order_by(created_col.desc(), id_col.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, created_col.key), getattr(last, id_col.key))
+    return items, next_cursor
@@ -1,7 +1,11 @@
-from flask import Blueprint, render_template, request, jsonify, session
+from flask import Blueprint, render_template, request, jsonify, session, current_app
+from sqlalchemy import select
 from ..models import Driver, Order
 from .. import db
+from ..locations import MAX_BATCH, ingest, known_drivers, parse_fix
+from ..orders import normalize_phone
 from datetime import datetime
+import hmac
 
 
 drivers = Blueprint('drivers', __name__)
@@ -31,6 +35,11 @@ def verify_otp():
     }
         session['driver_verified'] = True
         session['delivery'] = delivery
+        # Link the phone to a driver row so their fixes are stored server-side
+        key = normalize_phone(data.get('phone'))
+        if key:
+            session['driver_id'] = db.session.execute(
+                select(Driver.id).where(Driver.phone_normalized == key)).scalar()
         return jsonify({'success': True, 'delivery': delivery})
     else:
         return jsonify({'success': False, 'message': 'Invalid OTP'})
@@ -59,9 +68,67 @@ def update_location():
                 'lng': longitude,
                 'timestamp': datetime.now().isoformat()
             }
+            # Queue it for driver_locations when the verified driver is a known one
+            driver_id = session.get('driver_id')
+            if driver_id and known_drivers(db.session.connection(), {driver_id}):
+                ingest([parse_fix(dict(data, driver_id=driver_id))])
             return jsonify({'success': True})
         else:
             return jsonify({'success': False, 'message': 'Location data required'})
     
     except Exception as e:
-        return jsonify({'success': False, 'message': str(e)})
\ No newline at end of file
+        return jsonify({'success': False, 'message': str(e)})
+
+
+def is_gateway():
+    """Whether the request carries the fleet gateway's bearer token"""
+    token = current_app.config['LOCATION_GATEWAY_TOKEN']
+    header = request.headers.get('Authorization', '')
+    return bool(token) and header.startswith('Bearer ') and hmac.compare_digest(header[7:], token)
+
+
+@drivers.route('/api/locations', methods=['POST'])
+def update_locations():
+    """Batch of fixes from the driver app or a fleet gateway.
+
+    Body is a JSON array of fixes, or ``{"driver_id": ..., "fixes": [...]}``.
+    Each fix has latitude, longitude and optionally accuracy and timestamp
+    (epoch ms or ISO). The OTP-verified driver can only post their own
+    fixes; a fleet gateway (LOCATION_GATEWAY_TOKEN) may name the driver in
+    the body or per fix. Valid fixes for known drivers are queued for a
+    bulk write; the rest are reported by index.
+    """
+    gateway = is_gateway()
+    if not gateway and not session.get('driver_id'):
+        return jsonify({'success': False, 'message': 'Driver not verified'}), 401
+
+    data = request.get_json(silent=True)
+    fixes = data.get('fixes') if isinstance(data, dict) else data
+    if not isinstance(fixes, list):
+        return jsonify({'success': False, 'message': 'Expected an array of fixes'}), 400
+    if len(fixes) > MAX_BATCH:
+        return jsonify({'success': False, 'message': f'At most {MAX_BATCH} fixes per request'}), 413
+
+    parsed, errors = [], []
+    for index, fix in enumerate(fixes):
+        try:
+            if not isinstance(fix, dict):
+                raise ValueError("Each fix must be an object")
+            if gateway:
+                fix = dict(fix, driver_id=fix.get('driver_id') or (data.get('driver_id') if isinstance(data, dict) else None))
+            else:
+                fix = dict(fix, driver_id=session['driver_id'])
+            parsed.append((index, parse_fix(fix)))
+        except ValueError as e:
+            errors.append({'index': index, 'message': str(e)})
+
+    known = known_drivers(db.session.connection(), {fix['driver_id'] for _, fix in parsed})
+    accepted = []
+    for index, fix in parsed:
+        if fix['driver_id'] in known:
+            accepted.append(fix)
+        else:
+            errors.append({'index': index, 'message': 'Unknown driver'})
+    errors.sort(key=lambda error: error['index'])
+    ingest(accepted)
+    return jsonify({'success': True, 'accepted': len(accepted), 'errors': errors}), 202
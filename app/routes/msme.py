@@ -1,51 +1,56 @@
-from flask import Blueprint, render_template, redirect, url_for, request, flash, session, jsonify
-from ..models import Order, User, Driver, Warehouse
+from flask import Blueprint, render_template, redirect, url_for, request, flash, session, jsonify, current_app, Response, stream_with_context
+from ..models import Order, User, Warehouse
 from .. import db
 from flask_login import login_required, current_user
 from ..forms import OrderForm, WarehouseForm
-from datetime import datetime
+from ..stats import dashboard_stats
+from ..analytics import order_breakdown, monthly_orders
+from ..pagination import keyset_page, page_size
+from ..inventory import inventory_snapshot
+from ..orders import create_order, delete_driver
+from ..importer import import_orders, read_rows
+from ..locations import forget_driver, parse_timestamp, position_json
+from ..live import stream, subscriber_filters
+from ..trajectories import route_history
+from ..spatial import zone_for
+from sqlalchemy.orm import joinedload
+from datetime import datetime, timedelta
+import json
 
 msme = Blueprint('msme', __name__)
 
 @msme.route('/')
 @login_required
 def dashboard():
-    # Get warehouse count and recent orders for dashboard
-    warehouse_count = Warehouse.query.filter_by(user_id=current_user.id, is_active=True).count()
-
     # Determine selected warehouse (if any)
     selected_warehouse_id = current_user.current_warehouse_id
 
-    # Base query for user's orders
-    base_query = Order.query.filter_by(user_id=current_user.id)
+    # All counters in one query - scoped to selected warehouse if set
+    stats = dashboard_stats(current_user.id, selected_warehouse_id)
+
+    # Recent orders - scoped to selected warehouse if set; drivers are loaded in the same query
+    recent_orders_query = Order.query.filter_by(user_id=current_user.id)
     if selected_warehouse_id:
-        base_query = base_query.filter_by(warehouse_id=selected_warehouse_id)
+        recent_orders_query = recent_orders_query.filter_by(warehouse_id=selected_warehouse_id)
+    recent_orders = recent_orders_query.options(joinedload(Order.driver)).order_by(Order.created_at.desc()).limit(5).all()
 
-    # Recent orders - scoped to selected warehouse if set
-    recent_orders = base_query.order_by(Order.created_at.desc()).limit(5).all()
-    
-    # Get order type statistics - scoped if warehouse selected
-    incoming_orders = base_query.filter_by(order_type="incoming").count()
-    outgoing_orders = base_query.filter_by(order_type="outgoing").count()
-    
     # Get user's warehouses for selection
     user_warehouses = Warehouse.query.filter_by(user_id=current_user.id, is_active=True).all()
-    
-    # Active orders (today or future)
-    active_orders_query = Order.query.filter_by(user_id=current_user.id).filter(Order.date >= datetime.now().date())
-    if selected_warehouse_id:
-        active_orders_query = active_orders_query.filter_by(warehouse_id=selected_warehouse_id)
-    active_orders_count = active_orders_query.count()
-    
+
+    # Reuse the loaded list for the current warehouse instead of another lookup
+    current_warehouse = next((w for w in user_warehouses if w.id == selected_warehouse_id), None)
+    if current_warehouse is None and selected_warehouse_id:
+        current_warehouse = current_user.current_warehouse
+
     return render_template('msme/dashboard.html', 
-                         warehouse_count=warehouse_count, 
+                         warehouse_count=stats.warehouse_count, 
                          recent_orders=recent_orders,
-                         incoming_orders=incoming_orders,
-                         outgoing_orders=outgoing_orders,
+                         incoming_orders=stats.incoming_orders,
+                         outgoing_orders=stats.outgoing_orders,
                          user_warehouses=user_warehouses,
-                         current_warehouse=current_user.current_warehouse,
+                         current_warehouse=current_warehouse,
                          now_date=datetime.now().date(),
-                         active_orders_count=active_orders_count)
+                         active_orders_count=stats.active_orders)
 
 
 @msme.route('/set-warehouse/<int:warehouse_id>')
@@ -69,7 +74,10 @@ def set_warehouse(warehouse_id):
 @login_required
 def warehouses():
     warehouses = Warehouse.query.filter_by(user_id=current_user.id).order_by(Warehouse.created_at.desc()).all()
-    return render_template('msme/warehouses.html', warehouses=warehouses)
+    # Order counts per warehouse in one grouped query instead of loading each warehouse's orders
+    order_counts = dict(db.session.query(Order.warehouse_id, db.func.count(Order.id))
+                        .filter_by(user_id=current_user.id).group_by(Order.warehouse_id).all())
+    return render_template('msme/warehouses.html', warehouses=warehouses, order_counts=order_counts)
 
 
 @msme.route('/warehouses/add', methods=['GET', 'POST'])
@@ -86,6 +94,8 @@ def add_warehouse():
             pincode=form.pincode.data,
             contact_person=form.contact_person.data,
             contact_phone=form.contact_phone.data,
+            latitude=form.latitude.data,
+            longitude=form.longitude.data,
             is_active=form.is_active.data,
             user_id=current_user.id
         )
@@ -123,6 +133,8 @@ def edit_warehouse(warehouse_id):
         warehouse.pincode = form.pincode.data
         warehouse.contact_person = form.contact_person.data
         warehouse.contact_phone = form.contact_phone.data
+        warehouse.latitude = form.latitude.data
+        warehouse.longitude = form.longitude.data
         warehouse.is_active = form.is_active.data
         
         db.session.commit()
@@ -143,7 +155,7 @@ def delete_warehouse(warehouse_id):
         return redirect(url_for('msme.warehouses'))
     
     # Check if warehouse has orders
-    if warehouse.orders:
+    if Order.query.filter_by(warehouse_id=warehouse.id).first():
         flash("Cannot delete warehouse with existing orders", "danger")
         return redirect(url_for('msme.warehouses'))
     
@@ -162,11 +174,11 @@ def delete_warehouse(warehouse_id):
 #################################              ORDER ROUTES                       #####################################
 #######################################################################################################################
 
-@msme.route('/orders')
-@login_required
-def orders():
+def _order_list(cursor=None):
+    """Filtered, newest-first page of the user's orders with driver and warehouse loaded"""
     warehouse_id = request.args.get('warehouse_id', type=int)
     order_type = request.args.get('order_type', type=str)
+    limit = page_size(request.args.get('limit', type=int))
     
     # Build query
     query = Order.query.filter_by(user_id=current_user.id)
@@ -182,15 +194,169 @@ def orders():
         # Filter orders by type
         query = query.filter_by(order_type=order_type)
     
-    orders = query.order_by(Order.created_at.desc()).all()
+    query = query.options(joinedload(Order.driver), joinedload(Order.warehouse))
+    orders, next_cursor = keyset_page(query, Order.created_at, Order.id, cursor=cursor, limit=limit)
+    return orders, next_cursor, warehouse, order_type
+
+
+@msme.route('/orders')
+@login_required
+def orders():
+    orders, next_cursor, warehouse, order_type = _order_list()
     
     return render_template('msme/orders.html', 
                          orders=orders, 
+                         next_cursor=next_cursor,
                          selected_warehouse=warehouse,
                          selected_order_type=order_type,
                          now_date=datetime.now().date())
 
 
+@msme.route('/api/orders')
+@login_required
+def orders_json():
+    """Next page of the orders list for infinite scroll"""
+    orders, next_cursor, _, _ = _order_list(cursor=request.args.get('cursor'))
+    
+    return jsonify({
+        'orders': [{
+            'id': order.id,
+            'created_at': order.created_at.isoformat() if order.created_at else None,
+            'date': order.date.isoformat(),
+            'time_slot': order.time_slot,
+            'order_type': order.order_type,
+            'package_name': order.package_name,
+            'package_type': order.package_type,
+            'package_priority': order.package_priority,
+            'quantity': order.quantity,
+            'warehouse': order.warehouse.name if order.warehouse else None,
+            'driver': order.driver.name if order.driver else None,
+            'logistic_company': order.logistic_company,
+        } for order in orders],
+        'html': render_template('msme/_order_rows.html', orders=orders, now_date=datetime.now().date()),
+        'next_cursor': next_cursor,
+    })
+
+
+
+@msme.route('/api/drivers/positions')
+@login_required
+def driver_positions():
+    """Where each of the user's recently reporting drivers is now, from the in-memory registry"""
+    driver_ids = db.session.execute(
+        db.select(Order.driver_id).where(Order.user_id == current_user.id, Order.driver_id.isnot(None)).distinct()
+    ).scalars().all()
+    positions = current_app.extensions['driver_positions'].active(current_app.config['LOCATION_ACTIVE_SECONDS'], driver_ids)
+    return jsonify({'positions': [position_json(position) for position in positions]})
+
+
+@msme.route('/api/drivers/<int:driver_id>/route')
+@login_required
+def driver_route(driver_id):
+    """A driver's track between ?start= and ?end= (ISO or epoch ms; default the last 24 hours)"""
+    assigned = db.session.execute(
+        db.select(Order.id).where(Order.user_id == current_user.id, Order.driver_id == driver_id).limit(1)
+    ).first()
+    if assigned is None:
+        return jsonify({'error': 'Driver not found'}), 404
+    try:
+        end = parse_timestamp(request.args.get('end'))
+        start = parse_timestamp(request.args.get('start')) if request.args.get('start') else end - timedelta(hours=24)
+    except (TypeError, ValueError, OverflowError, OSError):
+        return jsonify({'error': 'start and end must be ISO date-times or epoch milliseconds'}), 400
+
+    points = route_history(driver_id, start, end)
+    for point in points:
+        point['timestamp'] = point['timestamp'].isoformat(timespec='seconds')
+    return jsonify({'driver_id': driver_id, 'points': points})
+
+
+@msme.route('/api/drivers/<int:driver_id>/zone')
+@login_required
+def driver_zone(driver_id):
+    """The zone of the user's nearest warehouse the driver's latest position is in (nulls outside every zone)"""
+    assigned = db.session.execute(
+        db.select(Order.id).where(Order.user_id == current_user.id, Order.driver_id == driver_id).limit(1)
+    ).first()
+    if assigned is None:
+        return jsonify({'error': 'Driver not found'}), 404
+
+    warehouse_ids = set(db.session.execute(
+        db.select(Warehouse.id).where(Warehouse.user_id == current_user.id)
+    ).scalars())
+    located = current_app.extensions['geofence'].zone_of(driver_id, warehouse_ids)
+    return jsonify({'driver_id': driver_id, **(located or {'warehouse_id': None, 'zone': None, 'distance': None})})
+
+
+@msme.route('/api/warehouses/<int:warehouse_id>/drivers')
+@login_required
+def warehouse_nearby_drivers(warehouse_id):
+    """The user's drivers within ?radius= metres (default 1000, at most 50 km) of a warehouse, nearest first"""
+    warehouse = Warehouse.query.filter_by(id=warehouse_id, user_id=current_user.id).first()
+    if warehouse is None:
+        return jsonify({'error': 'Warehouse not found'}), 404
+    if warehouse.latitude is None or warehouse.longitude is None:
+        return jsonify({'error': 'Warehouse has no coordinates'}), 400
+    radius = min(max(request.args.get('radius', 1000, type=float), 0), 50000)
+
+    mine = set(db.session.execute(
+        db.select(Order.driver_id).where(Order.user_id == current_user.id, Order.driver_id.isnot(None)).distinct()
+    ).scalars())
+    nearby = current_app.extensions['geofence'].drivers_near(warehouse_id, radius)
+    return jsonify({
+        'warehouse_id': warehouse_id,
+        'radius': radius,
+        'drivers': [{'driver_id': driver_id, 'distance': round(distance, 1), 'zone': zone_for(distance)}
+                    for driver_id, distance in nearby if driver_id in mine],
+    })
+
+
+@msme.route('/api/live')
+@login_required
+def live_updates():
+    """Server-sent events: a snapshot of driver positions and zones, then position, zone and order changes.
+
+    Limited to the user's warehouses, or one of them with ?warehouse_id=.
+    """
+    warehouse_ids, driver_ids = subscriber_filters(current_user.id, request.args.get('warehouse_id', type=int))
+    registry = current_app.extensions['driver_positions']
+    hub = current_app.extensions['live_hub']
+    subscriber = hub.subscribe(current_user.id, warehouse_ids, driver_ids)
+    positions = registry.active(current_app.config['LOCATION_ACTIVE_SECONDS'], driver_ids)
+    zones = current_app.extensions['geofence'].zones(driver_ids)
+    snapshot = {
+        'positions': [position_json(position) for position in positions],
+        'zones': [zone for zone in zones if zone['warehouse_id'] in warehouse_ids],
+    }
+    # Nothing else needs the session while the stream is open
+    db.session.remove()
+
+    frames = stream(hub, subscriber, snapshot,
+                    current_app.config['LIVE_PUSH_INTERVAL_MS'] / 1000, current_app.config['LIVE_HEARTBEAT_SECONDS'])
+    return Response(stream_with_context(frames), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@msme.route('/api/orders/import', methods=['POST'])
+@login_required
+def import_orders_api():
+    """Bulk-create orders from an uploaded CSV or JSON array (OrderForm field names as columns).
+
+    Streams newline-delimited JSON: one line per rejected row, one per
+    written batch, then the totals.
+    """
+    upload = request.files.get('file')
+    try:
+        rows = read_rows(upload.read(), upload.filename) if upload else read_rows(request.get_data())
+    except ValueError as e:
+        return jsonify({'error': f"Could not read import: {e}"}), 400
+
+    batch_size = request.args.get('batch_size', type=int) or current_app.config['IMPORT_BATCH_SIZE']
+    events = import_orders(current_user._get_current_object(), rows, batch_size)
+    return Response(stream_with_context(json.dumps(event) + '\n' for event in events),
+                    mimetype='application/x-ndjson')
+
+
 # Add a new order
 @msme.route('/add_order', methods=['GET', 'POST'])
 @login_required
@@ -200,13 +366,12 @@ def add_order():
         flash("Please select a warehouse first from your dashboard", "warning")
         return redirect(url_for('msme.dashboard'))
     
-    # Check if current warehouse is still active
-    current_warehouse = Warehouse.query.filter_by(
-        id=current_user.current_warehouse_id, 
-        user_id=current_user.id, 
-        is_active=True
-    ).first()
+    # Active warehouses, loaded once for the current warehouse check, the routing choices and the POST lookup
+    user_active_warehouses = Warehouse.query.filter_by(user_id=current_user.id, is_active=True).all()
+    warehouses_by_id = {w.id: w for w in user_active_warehouses}
     
+    # Check if current warehouse is still active
+    current_warehouse = warehouses_by_id.get(current_user.current_warehouse_id)
     if not current_warehouse:
         flash("Your selected warehouse is no longer active. Please select another warehouse.", "warning")
         current_user.current_warehouse_id = None
@@ -215,28 +380,9 @@ def add_order():
     
     form = OrderForm()
     
-    # Populate warehouse choices for order routing
-    user_active_warehouses = Warehouse.query.filter_by(user_id=current_user.id, is_active=True).all()
-    
-    # Ensure we have at least one warehouse
-    if not user_active_warehouses:
-        flash("No active warehouses found. Please create a warehouse first.", "warning")
-        return redirect(url_for('msme.dashboard'))
-    
-    # Set warehouse choices with proper validation
+    # Set warehouse choices, defaulting to the current warehouse
     form.selected_warehouse_id.choices = [(w.id, w.name) for w in user_active_warehouses]
-    
-    # Set default warehouse if current warehouse exists in choices
-    if current_user.current_warehouse_id:
-        # Check if current warehouse is in the choices
-        current_wh_ids = [w.id for w in user_active_warehouses]
-        if current_user.current_warehouse_id in current_wh_ids:
-            form.selected_warehouse_id.default = current_user.current_warehouse_id
-        else:
-            # If current warehouse is not in choices, set first available
-            form.selected_warehouse_id.default = user_active_warehouses[0].id
-            current_user.current_warehouse_id = user_active_warehouses[0].id
-            db.session.commit()
+    form.selected_warehouse_id.default = current_warehouse.id
     
     # Set default order type
     if request.method == 'GET':
@@ -245,79 +391,25 @@ def add_order():
         form.process()
     
     if request.method == 'POST':
-        print(f"Form submitted - Valid: {form.validate()}")
-        if form.errors:
-            print(f"Form errors: {form.errors}")
-        
-        # Re-populate choices after POST to ensure validation works
-        form.selected_warehouse_id.choices = [(w.id, w.name) for w in user_active_warehouses]
-        
         if form.validate_on_submit():
+            # Selected warehouse for routing; choices validation already limits it to active ones
+            selected_wh = warehouses_by_id.get(form.selected_warehouse_id.data)
             try:
-                # 1. Resolve selected warehouse for routing
-                selected_wh = None
-                try:
-                    if form.selected_warehouse_id.data:
-                        # Validate that the selected warehouse exists and belongs to user
-                        selected_wh = Warehouse.query.filter_by(
-                            id=form.selected_warehouse_id.data, 
-                            user_id=current_user.id,
-                            is_active=True
-                        ).first()
-                        if not selected_wh:
-                            flash("Selected warehouse is not valid. Please try again.", "error")
-                            return render_template("msme/add_order.html", 
-                                               form=form, 
-                                               current_warehouse=current_warehouse, 
-                                               user_warehouses=user_active_warehouses,
-                                               current_user=current_user)
-                except Exception as e:
-                    print(f"Error resolving warehouse: {e}")
-                    selected_wh = None
-
-                # 2. Save Driver first
-                driver = Driver(
-                    name=form.driver_name.data,
-                    phone=form.driver_phone.data,
-                    truck_no=form.driver_truck_no.data
-                )
-                db.session.add(driver)
-                db.session.commit()
-                print(f"Driver created with ID: {driver.id}")
-
-                # 3. Determine order type and auto-fill customer name if needed
-                order_type = (form.order_type.data or "outgoing").strip().lower()
-                if order_type not in ["incoming", "outgoing"]:
-                    order_type = "outgoing"
-                customer_name = form.customer_name.data
-                
-                # 4. Compute addresses based on order type and selected warehouse
-                pickup_address_value = form.pickup_address.data
-                delivery_address_value = form.delivery_address.data
-                def format_wh_address(wh):
-                    return f"{wh.address}, {wh.city}, {wh.state}" if wh else ""
-
-                if order_type == "incoming":
-                    # Delivery goes to selected warehouse (fallback to current)
-                    target_wh = selected_wh or current_warehouse
-                    delivery_address_value = format_wh_address(target_wh)
-                    # Auto-fill customer name with MSME for incoming if blank
-                    if not customer_name:
-                        customer_name = current_user.name
-                else:
-                    # Outgoing: Pickup is from selected warehouse (fallback to current)
-                    source_wh = selected_wh or current_warehouse
-                    pickup_address_value = format_wh_address(source_wh)
-                
-                # 5. Save Order with current warehouse
-                order = Order(
-                    user_id=current_user.id,
-                    warehouse_id=current_user.current_warehouse_id,
-                    pickup_address=pickup_address_value,
-                    delivery_address=delivery_address_value,
+                order = create_order(
+                    current_user,
+                    current_warehouse,
+                    driver={
+                        'name': form.driver_name.data,
+                        'phone': form.driver_phone.data,
+                        'truck_no': form.driver_truck_no.data,
+                    },
+                    order_type=form.order_type.data,
+                    route_warehouse=selected_wh,
+                    pickup_address=form.pickup_address.data,
+                    delivery_address=form.delivery_address.data,
                     supplier_name=form.supplier_name.data,
                     supplier_phone=form.supplier_phone.data,
-                    customer_name=customer_name,
+                    customer_name=form.customer_name.data,
                     customer_phone=form.customer_phone.data,
                     package_name=form.package_name.data,
                     package_priority=form.package_priority.data,
@@ -325,19 +417,14 @@ def add_order():
                     package_type=form.package_type.data,
                     package_description=form.package_description.data,
                     logistic_company=form.logistic_company.data,
-                    driver_id=driver.id,
                     date=form.date.data,
                     time_slot=form.time_slot.data,
-                    order_type=order_type
                 )
-                db.session.add(order)
-                db.session.commit()
                 print(f"Order created successfully with ID: {order.id}")
                 flash("Order created successfully!", "success")
                 return redirect(url_for('msme.orders'))
                 
             except Exception as e:
-                db.session.rollback()
                 print(f"Error creating order: {e}")
                 flash(f"Error creating order: {str(e)}", "error")
         else:
@@ -370,7 +457,10 @@ def order_detail(order_id):
         flash("You are not authorized to view this order", "danger")
         return redirect(url_for('msme.orders'))
 
-    return render_template('msme/order_detail.html', order=order)
+    # Latest fix from the in-memory registry, no driver_locations query
+    position = current_app.extensions['driver_positions'].get(order.driver_id) if order.driver_id else None
+    driver_position = position_json(position) if position else None
+    return render_template('msme/order_detail.html', order=order, driver_position=driver_position)
 
 
 # Delete order
@@ -387,12 +477,15 @@ def delete_order(order_id):
     try:
         # Delete the associated driver if no other orders use it
         driver = order.driver
-        if driver and len(driver.orders) == 1:  # Only this order uses this driver
-            db.session.delete(driver)
+        orphaned = driver.id if driver and len(driver.orders) == 1 else None  # Only this order uses this driver
+        if orphaned:
+            delete_driver(driver)
         
         # Delete the order
         db.session.delete(order)
         db.session.commit()
+        if orphaned:
+            forget_driver(orphaned)
         
         flash("Order deleted successfully!", "success")
     except Exception as e:
@@ -425,34 +518,8 @@ def ltc():
 def inventory():
     """Inventory management page - scoped to current warehouse if selected"""
     current_wh = current_user.current_warehouse
-    # Placeholder inventory dataset; in real app this would query an Inventory model
-    # Here we just derive from recent orders to demonstrate structure
-    orders = Order.query.filter_by(user_id=current_user.id)
-    if current_wh:
-        orders = orders.filter_by(warehouse_id=current_wh.id)
-    orders = orders.order_by(Order.created_at.desc()).all()
-
-    # Group a simple inventory snapshot by package_name
-    inventory_items = {}
-    for o in orders:
-        key = (o.package_name or 'Unknown', o.package_type or 'general')
-        if key not in inventory_items:
-            inventory_items[key] = {
-                'name': o.package_name or 'Unknown',
-                'type': o.package_type or 'general',
-                'quantity': 0,
-                'last_movement': o.created_at,
-                'usage_count': 0,
-            }
-        inventory_items[key]['quantity'] += int(o.quantity or 0)
-        inventory_items[key]['usage_count'] += 1
-        if o.created_at and (inventory_items[key]['last_movement'] is None or o.created_at > inventory_items[key]['last_movement']):
-            inventory_items[key]['last_movement'] = o.created_at
-
-    # Convert to list
-    inventory_list = list(inventory_items.values())
-    # Sort by name
-    inventory_list.sort(key=lambda x: x['name'] or '')
+    # Stock per item from the inventory ledger (signed: incoming adds, outgoing removes)
+    inventory_list = inventory_snapshot(current_user.id, current_wh.id if current_wh else None)
 
     return render_template('msme/inventory.html',
                            items=inventory_list,
@@ -465,53 +532,18 @@ def analysis():
     """Analysis and insights page with forecasting capabilities"""
     current_wh = current_user.current_warehouse
     
-    # Get order statistics for analysis
-    orders = Order.query.filter_by(user_id=current_user.id)
-    if current_wh:
-        orders = orders.filter_by(warehouse_id=current_wh.id)
-    
-    # Calculate key metrics
-    total_orders = orders.count()
-    incoming_orders = orders.filter_by(order_type="incoming").count()
-    outgoing_orders = orders.filter_by(order_type="outgoing").count()
-    
-    # Priority distribution
-    priority_stats = {
-        'High': orders.filter_by(package_priority="High").count(),
-        'Medium': orders.filter_by(package_priority="Medium").count(),
-        'Low': orders.filter_by(package_priority="Low").count(),
-        'Urgent': orders.filter_by(package_priority="Urgent").count()
-    }
-    
-    # Package type distribution
-    package_type_stats = {
-        'Fragile': orders.filter_by(package_type="Fragile").count(),
-        'Heavy': orders.filter_by(package_type="Heavy").count(),
-        'Liquid': orders.filter_by(package_type="Liquid").count(),
-        'Solid': orders.filter_by(package_type="Solid").count(),
-        'Hazardous': orders.filter_by(package_type="Hazardous").count(),
-        'Regular': orders.filter_by(package_type="Regular").count()
-    }
-    
-    # Monthly trends (last 6 months)
-    from datetime import datetime, timedelta
-    monthly_data = []
-    for i in range(6):
-        month_start = datetime.now().replace(day=1) - timedelta(days=30*i)
-        month_end = month_start.replace(day=28) + timedelta(days=4)
-        month_end = month_end.replace(day=1) - timedelta(days=1)
-        
-        month_orders = orders.filter(
-            Order.created_at >= month_start,
-            Order.created_at <= month_end
-        ).count()
-        
-        monthly_data.append({
-            'month': month_start.strftime('%b %Y'),
-            'orders': month_orders
-        })
-    
-    monthly_data.reverse()  # Show oldest to newest
+    warehouse_id = current_wh.id if current_wh else None
+
+    # Key metrics and distributions from the pre-aggregated rollup table
+    breakdown = order_breakdown(current_user.id, warehouse_id)
+    total_orders = breakdown['total']
+    incoming_orders = breakdown['order_type']['incoming']
+    outgoing_orders = breakdown['order_type']['outgoing']
+    priority_stats = breakdown['priority']
+    package_type_stats = breakdown['package_type']
+
+    # Monthly trends (last 6 calendar months)
+    monthly_data = monthly_orders(current_user.id, warehouse_id, months=6)
     
     # Top logistics companies
     logistics_stats = db.session.query(
@@ -0,0 +1,265 @@
+"""Geofences around warehouses over the latest driver positions.
+
+Drivers and warehouses are bucketed in grid indexes of square cells
+(GEOFENCE_CELL_METERS on a side at the equator). A radius query only looks
+at the cells overlapping the circle's bounding box, so its cost depends on
+how many points are nearby, not on the size of the fleet.
+
+Each warehouse with coordinates is surrounded by the LTC page's zones.
+Geofence.update() places incoming positions and returns "exit" and
+"enter" events whenever a driver's zone at some warehouse changes; these
+go out on the live stream (see app.live). Moving or removing a warehouse
+re-zones the drivers around it the same way.
+"""
+import math
+import threading
+from datetime import datetime
+from sqlalchemy import event, inspect, select
+
+from . import db
+from .models import Warehouse
+
+EARTH_RADIUS_M = 6371000
+METERS_PER_DEGREE = math.pi / 180 * EARTH_RADIUS_M
+
+# (zone, radius in metres), innermost first; the same rings ltc.js draws
+ZONES = (
+    ("Warehouse Zone", 100),
+    ("Buffer Zone", 500),
+    ("Approach Zone", 1000),
+)
+
+
+def distance_m(lat1, lng1, lat2, lng2):
+    """Great-circle distance in metres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GridIndex:
+    """Points by key, bucketed into cells ``step`` degrees square"""
+
+    def __init__(self, cell_m=250):
+        self.step = cell_m / METERS_PER_DEGREE
+        self.points = {}
+        self.cells = {}
+
+    def __len__(self):
+        return len(self.points)
+
+    def cell(self, latitude, longitude):
+        return math.floor(latitude / self.step), math.floor(longitude / self.step)
+
+    def move(self, key, latitude, longitude):
+        """Place ``key`` at a position, replacing where it was"""
+        cell = self.cell(latitude, longitude)
+        old = self.points.get(key)
+        if old is not None and old[2] != cell:
+            self._unlink(key, old[2])
+        if old is None or old[2] != cell:
+            self.cells.setdefault(cell, set()).add(key)
+        self.points[key] = (latitude, longitude, cell)
+
+    def remove(self, key):
+        old = self.points.pop(key, None)
+        if old is not None:
+            self._unlink(key, old[2])
+
+    def _unlink(self, key, cell):
+        bucket = self.cells[cell]
+        bucket.discard(key)
+        if not bucket:
+            del self.cells[cell]
+
+    def get(self, key):
+        """``(latitude, longitude)`` of ``key``, or None"""
+        point = self.points.get(key)
+        return point[:2] if point is not None else None
+
+    def near(self, latitude, longitude, radius):
+        """``(key, distance)`` of every point within ``radius`` metres, nearest first"""
+        lat_span = radius / METERS_PER_DEGREE
+        # Longitude degrees shrink towards the poles; clamp so the box stays finite
+        lng_span = radius / (METERS_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01))
+        south, west = self.cell(latitude - lat_span, longitude - lng_span)
+        north, east = self.cell(latitude + lat_span, longitude + lng_span)
+
+        found = []
+        cells, points = self.cells, self.points
+        for row in range(south, north + 1):
+            for column in range(west, east + 1):
+                for key in cells.get((row, column), ()):
+                    lat, lng, _ = points[key]
+                    distance = distance_m(latitude, longitude, lat, lng)
+                    if distance <= radius:
+                        found.append((key, distance))
+        found.sort(key=lambda item: item[1])
+        return found
+
+
+def zone_for(distance):
+    """Name of the innermost zone containing a point ``distance`` metres from a warehouse, or None"""
+    for zone, radius in ZONES:
+        if distance <= radius:
+            return zone
+    return None
+
+
+class Geofence:
+    """Driver and warehouse grid indexes plus the zone each driver is currently in"""
+
+    def __init__(self, cell_m=250):
+        self.drivers = GridIndex(cell_m)
+        self.warehouses = GridIndex(cell_m)
+        self.current = {}
+        self.lock = threading.Lock()
+
+    def set_warehouse(self, warehouse_id, latitude, longitude):
+        """Place, move or (without coordinates) remove a warehouse.
+
+        Drivers in range of its old or new position are re-zoned; returns
+        the enter/exit events that caused, as update() does.
+        """
+        with self.lock:
+            old = self.warehouses.get(warehouse_id)
+            if latitude is None or longitude is None:
+                self.warehouses.remove(warehouse_id)
+            else:
+                self.warehouses.move(warehouse_id, latitude, longitude)
+            new = self.warehouses.get(warehouse_id)
+            if old == new:
+                return []
+
+            affected = {driver_id for driver_id, memberships in self.current.items() if warehouse_id in memberships}
+            for point in (old, new):
+                if point is not None:
+                    affected.update(driver_id for driver_id, _ in self.drivers.near(*point, ZONES[-1][1]))
+            at = datetime.now().isoformat(timespec="seconds")
+            events = []
+            for driver_id in sorted(affected):
+                events.extend(self._rezone(driver_id, *self.drivers.get(driver_id), at))
+        return events
+
+    def remove_driver(self, driver_id):
+        with self.lock:
+            self.drivers.remove(driver_id)
+            self.current.pop(driver_id, None)
+
+    def _zones_at(self, latitude, longitude):
+        """``{warehouse_id: (zone, distance)}`` for every warehouse whose zones contain the point"""
+        return {warehouse_id: (zone_for(distance), distance)
+                for warehouse_id, distance in self.warehouses.near(latitude, longitude, ZONES[-1][1])}
+
+    def zone_of(self, driver_id, warehouse_ids=None):
+        """``{"warehouse_id", "zone", "distance"}`` for the nearest of ``warehouse_ids`` (default all)
+        whose zones contain the driver's latest position, or None"""
+        with self.lock:
+            point = self.drivers.get(driver_id)
+            if point is None:
+                return None
+            nearest = self.warehouses.near(*point, ZONES[-1][1])
+        for warehouse_id, distance in nearest:
+            if warehouse_ids is None or warehouse_id in warehouse_ids:
+                return {"warehouse_id": warehouse_id, "zone": zone_for(distance), "distance": round(distance, 1)}
+        return None
+
+    def drivers_near(self, warehouse_id, radius):
+        """``(driver_id, distance)`` of drivers within ``radius`` metres of a warehouse, nearest first"""
+        with self.lock:
+            point = self.warehouses.get(warehouse_id)
+            return self.drivers.near(*point, radius) if point is not None else []
+
+    def zones(self, driver_ids):
+        """Current ``{"driver_id", "warehouse_id", "zone"}`` memberships of ``driver_ids``"""
+        with self.lock:
+            current = [(driver_id, dict(self.current.get(driver_id, {}))) for driver_id in driver_ids]
+        return [{"driver_id": driver_id, "warehouse_id": warehouse_id, "zone": zone}
+                for driver_id, memberships in current for warehouse_id, zone in memberships.items()]
+
+    def update(self, positions):
+        """Place Positions; returns enter/exit events for each warehouse where a driver's zone changed.
+
+        A driver can be in the zones of several warehouses at once, and
+        moving between the rings of one warehouse is an exit and an enter.
+        """
+        events = []
+        with self.lock:
+            for position in positions:
+                self.drivers.move(position.driver_id, position.latitude, position.longitude)
+                at = datetime.fromtimestamp(position.timestamp).isoformat(timespec="seconds")
+                events.extend(self._rezone(position.driver_id, position.latitude, position.longitude, at))
+        return events
+
+    def _rezone(self, driver_id, latitude, longitude, at):
+        """Recompute a driver's zone memberships at a point; returns the enter/exit events. Hold the lock."""
+        now = {warehouse_id: zone for warehouse_id, (zone, _) in self._zones_at(latitude, longitude).items()}
+        before = self.current.get(driver_id, {})
+        if now == before:
+            return []
+        events = []
+        for warehouse_id, zone in before.items():
+            if now.get(warehouse_id) != zone:
+                events.append({"change": "exit", "driver_id": driver_id,
+                               "warehouse_id": warehouse_id, "zone": zone, "timestamp": at})
+        for warehouse_id, zone in now.items():
+            if before.get(warehouse_id) != zone:
+                events.append({"change": "enter", "driver_id": driver_id,
+                               "warehouse_id": warehouse_id, "zone": zone, "timestamp": at})
+        if now:
+            self.current[driver_id] = now
+        else:
+            self.current.pop(driver_id, None)
+        return events
+
+
+# -----------------------------
+# Warehouse coordinates, applied once committed
+# -----------------------------
+def _queue(deleted):
+    def listener(mapper, connection, target):
+        inspect(target).session.info.setdefault("geofence_warehouses", []).append(
+            (target.id, None if deleted else target.latitude, None if deleted else target.longitude))
+    return listener
+
+
+event.listen(Warehouse, "after_insert", _queue(False))
+event.listen(Warehouse, "after_update", _queue(False))
+event.listen(Warehouse, "after_delete", _queue(True))
+
+
+@event.listens_for(db.session, "after_commit")
+def _apply_committed(session):
+    changes = session.info.pop("geofence_warehouses", None)
+    if changes:
+        from flask import current_app
+        geofence = current_app.extensions.get("geofence")
+        if geofence is not None:
+            events = []
+            for warehouse_id, latitude, longitude in changes:
+                events.extend(geofence.set_warehouse(warehouse_id, latitude, longitude))
+            hub = current_app.extensions.get("live_hub")
+            if hub is not None and events:
+                hub.publish_zone_events(events)
+
+
+@event.listens_for(db.session, "after_rollback")
+def _discard_rolled_back(session):
+    session.info.pop("geofence_warehouses", None)
+
+
+def init_app(app):
+    """Build the geofence from warehouse coordinates and the drivers' latest positions (no events)"""
+    geofence = Geofence(app.config['GEOFENCE_CELL_METERS'])
+    with app.app_context():
+        rows = db.session.execute(
+            select(Warehouse.id, Warehouse.latitude, Warehouse.longitude)
+            .where(Warehouse.latitude.isnot(None), Warehouse.longitude.isnot(None))
+        ).all()
+        db.session.remove()
+    for warehouse_id, latitude, longitude in rows:
+        geofence.set_warehouse(warehouse_id, latitude, longitude)
+    geofence.update(app.extensions['driver_positions'].active())
+    app.extensions['geofence'] = geofence
+    return geofence
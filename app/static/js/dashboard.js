@@ -510,27 +510,38 @@ function animateCard(card) {
 
 
 
-// Real-time updates simulation
-const deliveryIds = ['DEL-58823', 'JXK-26543', 'MNP-78912', 'QRS-45678', 'ABC-12345', 'XYZ-67890'];
-
-setInterval(() => {
-    const randomId = deliveryIds[Math.floor(Math.random() * deliveryIds.length)];
-    const rows = document.querySelectorAll('tbody tr');
-    
-    rows.forEach(row => {
-        if (row.textContent.includes(randomId)) {
+// Real-time order updates pushed by the server
+function highlightDelivery(orderId) {
+    const deliveryId = `DEL-${orderId}`;
+    document.querySelectorAll('tbody tr').forEach(row => {
+        const cell = row.querySelector('.delivery-row-id');
+        if (cell && cell.textContent.trim() === deliveryId) {
             row.classList.add('highlight');
             setTimeout(() => {
                 row.classList.remove('highlight');
             }, 1000);
         }
     });
-}, 7000);
+}
+
+function connectLiveUpdates() {
+    if (!window.EventSource || !window.LIVE_STREAM_URL) return;
+
+    const source = new EventSource(window.LIVE_STREAM_URL);
+    source.addEventListener('order', event => {
+        highlightDelivery(JSON.parse(event.data).id);
+    });
+    source.addEventListener('resync', () => {
+        source.close();
+        connectLiveUpdates();
+    });
+}
 
 // Initialize page
 document.addEventListener('DOMContentLoaded', function() {
     // Initialize dashboard map
     initializeDashboardMap();
+    connectLiveUpdates();
     
     // Start truck movement simulation
     // setInterval(simulateDashboardTruckMovement, 300); // This line is removed as per the new_code
@@ -62,10 +62,15 @@ class LogisticsControlSystem {
         this.map = null;
         this.truckMarkers = new Map();
         this.isPaused = false;
+        this.simulationTimer = null;
+        this.liveMarkers = new Map();
+        this.liveZones = new Map();
+        this.liveSource = null;
 
         this.initializeMap();
         this.renderAll();
         this.startAutoUpdate();
+        this.connectLiveStream();
     }
 
     initializeZones() {
@@ -412,12 +417,101 @@ class LogisticsControlSystem {
     }
 
     startAutoUpdate() {
-        setInterval(() => {
+        this.simulationTimer = setInterval(() => {
             this.checkAndRedirect();
             this.renderAll();
         }, 300);
     }
 
+    // Live driver positions pushed by the server; the simulation only runs until the first one arrives
+    connectLiveStream() {
+        if (!window.EventSource || !window.LIVE_STREAM_URL) return;
+
+        this.liveSource = new EventSource(window.LIVE_STREAM_URL);
+        this.liveSource.addEventListener('snapshot', event => {
+            const snapshot = JSON.parse(event.data);
+            // A snapshot replaces everything shown, including after a reconnect
+            this.liveMarkers.forEach(marker => this.map.removeLayer(marker));
+            this.liveMarkers.clear();
+            this.liveZones.clear();
+            snapshot.zones.forEach(zone => this.liveZones.set(zone.driver_id, zone.zone));
+            if (snapshot.positions.length) this.showLivePositions(snapshot.positions);
+        });
+        this.liveSource.addEventListener('zone', event => {
+            const change = JSON.parse(event.data);
+            if (change.change === 'enter') {
+                this.liveZones.set(change.driver_id, change.zone);
+            } else if (this.liveZones.get(change.driver_id) === change.zone) {
+                this.liveZones.delete(change.driver_id);
+            }
+            this.colorLiveMarker(change.driver_id);
+        });
+        this.liveSource.addEventListener('positions', event => {
+            this.showLivePositions(JSON.parse(event.data).positions);
+        });
+        this.liveSource.addEventListener('resync', () => {
+            // Updates were dropped; reconnecting delivers a fresh snapshot
+            this.liveSource.close();
+            this.connectLiveStream();
+        });
+    }
+
+    stopSimulation() {
+        if (this.simulationTimer === null) return;
+        clearInterval(this.simulationTimer);
+        this.simulationTimer = null;
+        this.truckMarkers.forEach(marker => this.map.removeLayer(marker));
+        this.truckMarkers.clear();
+    }
+
+    // Same colours as the zone rings drawn in initializeMap
+    liveZoneColor(driverId) {
+        const zone = this.liveZones.get(driverId);
+        if (zone === 'Warehouse Zone') return '#22c55e';
+        if (zone === 'Buffer Zone') return '#eab308';
+        if (zone === 'Approach Zone') return '#64748b';
+        return '#3b82f6';
+    }
+
+    colorLiveMarker(driverId) {
+        const marker = this.liveMarkers.get(driverId);
+        if (marker) {
+            const color = this.liveZoneColor(driverId);
+            marker.setStyle({ color: color, fillColor: color });
+        }
+    }
+
+    showLivePositions(positions) {
+        if (!this.map) return;
+        this.stopSimulation();
+
+        // Only the drivers in this delta are touched; existing markers are moved, not rebuilt
+        positions.forEach(position => {
+            const latLng = [position.latitude, position.longitude];
+            const popup = `
+                <div style="font-size: 0.875rem;">
+                    <strong>Driver ${position.driver_id}</strong><br/>
+                    Zone: ${this.liveZones.get(position.driver_id) || 'Outside'}<br/>
+                    Last fix: ${new Date(position.timestamp).toLocaleTimeString()}
+                    ${position.accuracy !== null ? `<br/>Accuracy: ${Math.round(position.accuracy)} m` : ''}
+                </div>
+            `;
+            const marker = this.liveMarkers.get(position.driver_id);
+            if (marker) {
+                marker.setLatLng(latLng).setPopupContent(popup);
+            } else {
+                const color = this.liveZoneColor(position.driver_id);
+                this.liveMarkers.set(position.driver_id, L.circleMarker(latLng, {
+                    color: color,
+                    fillColor: color,
+                    fillOpacity: 0.8,
+                    radius: 8,
+                    weight: 2
+                }).addTo(this.map).bindPopup(popup));
+            }
+        });
+    }
+
     // Rendering methods
     renderStatusCards() {
         const activeTrucks = this.trucks.filter(truck => truck.status !== 'Departed');
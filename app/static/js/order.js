@@ -6,6 +6,9 @@ document.addEventListener('DOMContentLoaded', function() {
     
     // Add event listeners
     addEventListeners();
+    
+    // Load further pages as the user scrolls
+    setupInfiniteScroll();
 });
 
 // Initialize the orders page
@@ -361,7 +364,52 @@ function parseDate(dateString) {
     return null;
 }
 
+// Load the next page of orders when the "load more" marker scrolls into view
+function setupInfiniteScroll() {
+    const loadMore = document.getElementById('ordersLoadMore');
+    if (!loadMore || !('IntersectionObserver' in window)) return;
+    
+    const observer = new IntersectionObserver(entries => {
+        if (entries.some(entry => entry.isIntersecting)) {
+            loadMoreOrders();
+        }
+    }, { rootMargin: '200px' });
+    observer.observe(loadMore);
+}
+
+// Fetch the next page and append its rows to the table
+function loadMoreOrders() {
+    const loadMore = document.getElementById('ordersLoadMore');
+    const tableBody = document.getElementById('ordersTableBody');
+    if (!loadMore || !tableBody || loadMore.dataset.loading === 'true') return;
+    
+    const cursor = loadMore.dataset.cursor;
+    if (!cursor) return;
+    
+    const url = new URL(loadMore.dataset.url, window.location.origin);
+    url.searchParams.set('cursor', cursor);
+    loadMore.dataset.loading = 'true';
+    loadMore.classList.add('loading');
+    
+    fetch(url, { headers: { 'X-Requested-With': 'XMLHttpRequest' } })
+        .then(response => response.json())
+        .then(data => {
+            tableBody.insertAdjacentHTML('beforeend', data.html);
+            if (data.next_cursor) {
+                loadMore.dataset.cursor = data.next_cursor;
+            } else {
+                loadMore.remove();
+            }
+        })
+        .catch(error => console.error('Error loading orders:', error))
+        .finally(() => {
+            loadMore.dataset.loading = 'false';
+            loadMore.classList.remove('loading');
+        });
+}
+
 // Export functions for global access
+window.loadMoreOrders = loadMoreOrders;
 window.filterOrders = filterOrders;
 window.searchOrders = searchOrders;
 window.selectOrder = selectOrder;
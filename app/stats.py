@@ -0,0 +1,50 @@
+from dataclasses import dataclass
+from datetime import datetime
+from sqlalchemy import case, func, select
+
+from . import db
+from .models import Order, Warehouse
+
+
+@dataclass(frozen=True)
+class DashboardStats:
+    """Counters shown on the MSME dashboard"""
+    warehouse_count: int
+    incoming_orders: int
+    outgoing_orders: int
+    active_orders: int
+
+    @property
+    def total_orders(self):
+        return self.incoming_orders + self.outgoing_orders
+
+
+def dashboard_stats(user_id, warehouse_id=None, today=None):
+    """All dashboard counters in a single query.
+
+    Order counters use conditional aggregation over the user's orders
+    (scoped to ``warehouse_id`` when given); the active warehouse count is
+    a scalar subquery in the same statement.
+    """
+    today = today or datetime.now().date()
+    warehouse_count = select(func.count(Warehouse.id)).where(
+        Warehouse.user_id == user_id,
+        Warehouse.is_active == True,
+    ).scalar_subquery()
+
+    query = db.session.query(
+        warehouse_count,
+        func.count(case((Order.order_type == "incoming", 1))),
+        func.count(case((Order.order_type == "outgoing", 1))),
+        func.count(case((Order.date >= today, 1))),
+    ).select_from(Order).filter(Order.user_id == user_id)
+    if warehouse_id:
+        query = query.filter(Order.warehouse_id == warehouse_id)
+
+    row = query.one()
+    return DashboardStats(
+        warehouse_count=row[0] or 0,
+        incoming_orders=row[1] or 0,
+        outgoing_orders=row[2] or 0,
+        active_orders=row[3] or 0,
+    )
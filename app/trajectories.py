@@ -0,0 +1,245 @@
+"""Driver location retention tiers and route history.
+
+driver_locations grows by every fix every driver reports, so compact()
+ages it through three tiers:
+
+- full: every fix, for the last LOCATION_FULL_RESOLUTION_HOURS;
+- simplified: older closed trips (runs of fixes without a gap of
+  LOCATION_TRIP_GAP_MINUTES) keep only the fixes Douglas-Peucker needs to
+  stay within LOCATION_SIMPLIFY_METERS of the original track;
+- minute: after LOCATION_MINUTES_AFTER_DAYS the remaining fixes are
+  averaged into one driver_location_minutes row per driver and minute.
+
+Anything older than LOCATION_RETENTION_DAYS is deleted. route_history()
+reads both tables, so callers get whichever tier covers the range asked
+for without knowing where it is stored.
+"""
+import math
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import bindparam, func, insert, select, text
+
+from . import db
+from .models import Driver, DriverLocation, DriverLocationMinute, LocationCompaction
+
+locations = DriverLocation.__table__
+minutes = DriverLocationMinute.__table__
+drivers = Driver.__table__
+
+EARTH_RADIUS_M = 6371000
+# Row ids per DELETE ... IN (...), below SQLite's bound parameter limit
+DELETE_CHUNK = 500
+
+
+def douglas_peucker(points, tolerance):
+    """Indexes of the ``(latitude, longitude)`` points to keep so the track stays within ``tolerance`` metres.
+
+    Points are projected onto a plane around the first one, which is
+    accurate to well under a metre over the length of a delivery trip.
+    """
+    if len(points) < 3:
+        return list(range(len(points)))
+    lat0 = math.radians(points[0][0])
+    scale_x = math.cos(lat0) * math.pi / 180 * EARTH_RADIUS_M
+    scale_y = math.pi / 180 * EARTH_RADIUS_M
+    xs = [lng * scale_x for _, lng in points]
+    ys = [lat * scale_y for lat, _ in points]
+
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        ax, ay = xs[first], ys[first]
+        dx, dy = xs[last] - ax, ys[last] - ay
+        length = math.hypot(dx, dy)
+        farthest, distance = None, tolerance
+        for i in range(first + 1, last):
+            if length:
+                d = abs(dx * (ys[i] - ay) - dy * (xs[i] - ax)) / length
+            else:
+                # Start and end coincide (a round trip): distance from that point
+                d = math.hypot(xs[i] - ax, ys[i] - ay)
+            if d > distance:
+                farthest, distance = i, d
+        if farthest is not None:
+            keep[farthest] = True
+            stack.append((first, farthest))
+            stack.append((farthest, last))
+    return [i for i, kept in enumerate(keep) if kept]
+
+
+def split_trips(rows, gap):
+    """Split time-ordered fixes into lists wherever consecutive fixes are more than ``gap`` apart"""
+    trips = []
+    for row in rows:
+        if not trips or row.timestamp - trips[-1][-1].timestamp > gap:
+            trips.append([])
+        trips[-1].append(row)
+    return trips
+
+
+def _delete_ids(connection, ids):
+    for start in range(0, len(ids), DELETE_CHUNK):
+        connection.execute(locations.delete().where(locations.c.id.in_(ids[start:start + DELETE_CHUNK])))
+
+
+def simplify_driver(connection, driver_id, since, until, gap, tolerance):
+    """Simplify one driver's closed trips between ``since`` and ``until``.
+
+    Returns ``(fixes removed, start of the trip still open at until or None)``.
+    A trip is closed once its driver has gone ``gap`` without reporting.
+    Douglas-Peucker keeps its own output unchanged, so running over a trip
+    that was already simplified removes nothing.
+    """
+    rows = connection.execute(
+        select(locations.c.id, locations.c.latitude, locations.c.longitude, locations.c.timestamp)
+        .where(locations.c.driver_id == driver_id, locations.c.timestamp >= since, locations.c.timestamp < until)
+        .order_by(locations.c.timestamp, locations.c.id)
+    ).all()
+    if not rows:
+        return 0, None
+    trips = split_trips(rows, gap)
+
+    following = connection.execute(
+        select(func.min(locations.c.timestamp))
+        .where(locations.c.driver_id == driver_id, locations.c.timestamp >= until)
+    ).scalar()
+    open_since = None
+    if following is not None and following - trips[-1][-1].timestamp <= gap:
+        open_since = trips.pop()[0].timestamp
+
+    dropped = []
+    for trip in trips:
+        kept = set(douglas_peucker([(row.latitude, row.longitude) for row in trip], tolerance))
+        dropped.extend(row.id for i, row in enumerate(trip) if i not in kept)
+    _delete_ids(connection, dropped)
+    return len(dropped), open_since
+
+
+def downsample_driver(connection, driver_id, before):
+    """Fold one driver's fixes older than ``before`` into per-minute points; returns fixes removed"""
+    rows = connection.execute(
+        select(locations.c.latitude, locations.c.longitude, locations.c.timestamp)
+        .where(locations.c.driver_id == driver_id, locations.c.timestamp < before)
+    ).all()
+    if not rows:
+        return 0
+
+    sums = defaultdict(lambda: [0.0, 0.0, 0])
+    for row in rows:
+        total = sums[row.timestamp.replace(second=0, microsecond=0)]
+        total[0] += row.latitude
+        total[1] += row.longitude
+        total[2] += 1
+
+    # Fixes that arrived after their minute was written are merged in, weighted by sample count
+    existing = connection.execute(
+        select(minutes.c.minute, minutes.c.latitude, minutes.c.longitude, minutes.c.samples)
+        .where(minutes.c.driver_id == driver_id, minutes.c.minute >= min(sums), minutes.c.minute <= max(sums))
+    ).all()
+    updates = []
+    for minute, latitude, longitude, samples in existing:
+        total = sums.pop(minute, None)
+        if total is not None:
+            count = samples + total[2]
+            updates.append({"driver": driver_id, "at": minute, "samples": count,
+                            "latitude": (latitude * samples + total[0]) / count,
+                            "longitude": (longitude * samples + total[1]) / count})
+    if updates:
+        connection.execute(
+            minutes.update()
+            .where(minutes.c.driver_id == bindparam("driver"), minutes.c.minute == bindparam("at")),
+            updates,
+        )
+    if sums:
+        connection.execute(insert(minutes), [
+            {"driver_id": driver_id, "minute": minute, "latitude": lat / count, "longitude": lng / count, "samples": count}
+            for minute, (lat, lng, count) in sums.items()
+        ])
+    connection.execute(locations.delete().where(locations.c.driver_id == driver_id, locations.c.timestamp < before))
+    return len(rows)
+
+
+def used_bytes(connection):
+    """Bytes of the SQLite database holding data (free pages excluded), or None on other databases"""
+    if connection.dialect.name != "sqlite":
+        return None
+    page_size = connection.execute(text("PRAGMA page_size")).scalar()
+    page_count = connection.execute(text("PRAGMA page_count")).scalar()
+    free = connection.execute(text("PRAGMA freelist_count")).scalar()
+    return (page_count - free) * page_size
+
+
+def compact(config, now=None, vacuum=False):
+    """Run one pass of purge, downsample and simplify; returns what was removed.
+
+    Each driver is compacted in its own transaction, so the location
+    writer is never blocked for long. Freed pages are reused by SQLite but
+    the file only shrinks with ``vacuum``.
+    """
+    now = now or datetime.now()
+    full_before = now - timedelta(hours=config['LOCATION_FULL_RESOLUTION_HOURS'])
+    minutes_before = now - timedelta(days=config['LOCATION_MINUTES_AFTER_DAYS'])
+    purge_before = now - timedelta(days=config['LOCATION_RETENTION_DAYS'])
+    gap = timedelta(minutes=config['LOCATION_TRIP_GAP_MINUTES'])
+    tolerance = config['LOCATION_SIMPLIFY_METERS']
+
+    with db.engine.connect() as connection:
+        bytes_before = used_bytes(connection)
+        last = connection.execute(
+            select(LocationCompaction.simplified_before).order_by(LocationCompaction.id.desc()).limit(1)
+        ).scalar()
+        driver_ids = connection.execute(select(drivers.c.id).order_by(drivers.c.id)).scalars().all()
+
+    report = {"purged": 0, "downsampled": 0, "simplified": 0}
+    with db.engine.begin() as connection:
+        report["purged"] += connection.execute(
+            locations.delete().where(locations.c.timestamp < purge_before)).rowcount
+        report["purged"] += connection.execute(
+            minutes.delete().where(minutes.c.minute < purge_before)).rowcount
+
+    # Closed trips before the last run's watermark are already simplified; trips it left open start after it
+    since = max(last, minutes_before) if last is not None else minutes_before
+    simplified_before = full_before
+    for driver_id in driver_ids:
+        with db.engine.begin() as connection:
+            report["downsampled"] += downsample_driver(connection, driver_id, minutes_before)
+            removed, open_since = simplify_driver(connection, driver_id, since, full_before, gap, tolerance)
+            report["simplified"] += removed
+            if open_since is not None:
+                simplified_before = min(simplified_before, open_since)
+
+    with db.engine.begin() as connection:
+        bytes_after = used_bytes(connection)
+        report["bytes_saved"] = bytes_before - bytes_after if bytes_before is not None else None
+        connection.execute(insert(LocationCompaction.__table__).values(
+            ran_at=now, simplified_before=simplified_before, **report))
+
+    if vacuum and bytes_before is not None:
+        with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            connection.execute(text("VACUUM"))
+    report["rows_removed"] = report["purged"] + report["downsampled"] + report["simplified"]
+    return report
+
+
+def route_history(driver_id, start, end):
+    """A driver's track between ``start`` and ``end`` from whichever tiers hold it, oldest first.
+
+    Points are dicts with the fix time, position and ``resolution``:
+    "fix" for stored fixes (full or simplified) and "minute" for averages.
+    """
+    fixes = db.session.execute(
+        select(locations.c.timestamp, locations.c.latitude, locations.c.longitude)
+        .where(locations.c.driver_id == driver_id, locations.c.timestamp >= start, locations.c.timestamp <= end)
+        .order_by(locations.c.timestamp)
+    ).all()
+    averaged = db.session.execute(
+        select(minutes.c.minute, minutes.c.latitude, minutes.c.longitude)
+        .where(minutes.c.driver_id == driver_id, minutes.c.minute >= start, minutes.c.minute <= end)
+        .order_by(minutes.c.minute)
+    ).all()
+    points = [{"timestamp": at, "latitude": lat, "longitude": lng, "resolution": "minute"} for at, lat, lng in averaged]
+    points += [{"timestamp": at, "latitude": lat, "longitude": lng, "resolution": "fix"} for at, lat, lng in fixes]
+    points.sort(key=lambda point: point["timestamp"])
+    return points
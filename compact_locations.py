@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Compact driver_locations into its retention tiers (see app/trajectories.py).
+
+Simplifies closed trips older than LOCATION_FULL_RESOLUTION_HOURS, folds
+fixes older than LOCATION_MINUTES_AFTER_DAYS into per-minute points and
+deletes everything past LOCATION_RETENTION_DAYS. Safe to run while the
+app is serving; schedule it daily (e.g. from cron).
+
+Usage: python compact_locations.py [--vacuum]
+"""
+
+import argparse
+import sys
+import os
+
+# Add the app directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
+
+from app import create_app
+from app.trajectories import compact
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compact driver location history')
+    parser.add_argument('--vacuum', action='store_true', help='VACUUM afterwards to shrink the database file')
+    args = parser.parse_args()
+
+    app = create_app()
+
+    with app.app_context():
+        report = compact(app.config, vacuum=args.vacuum)
+
+    print(f"🗑️  Purged {report['purged']:,} rows past {app.config['LOCATION_RETENTION_DAYS']} days")
+    print(f"📉 Folded {report['downsampled']:,} fixes into per-minute points")
+    print(f"✂️  Simplified away {report['simplified']:,} fixes from closed trips")
+    if report['bytes_saved'] is not None:
+        print(f"✅ Removed {report['rows_removed']:,} rows, {report['bytes_saved'] / 1024 / 1024:.1f} MB freed")
+    else:
+        print(f"✅ Removed {report['rows_removed']:,} rows")
+
+
+if __name__ == "__main__":
+    main()
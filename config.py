@@ -5,5 +5,58 @@ load_dotenv()
 
 class Config:
     SECRET_KEY = os.getenv('SECRET_KEY') or 'dev-secret-key-change-in-production'
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///park.db'
+    SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL') or 'sqlite:///park.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Orders per INSERT batch (and commit) in bulk imports
+    IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', 1000))
+
+    # Driver location write-behind buffer: flush after this many fixes or milliseconds
+    LOCATION_BUFFER_SIZE = int(os.getenv('LOCATION_BUFFER_SIZE', 500))
+    LOCATION_FLUSH_MS = int(os.getenv('LOCATION_FLUSH_MS', 250))
+    # Persist every fix to driver_locations; off keeps only the in-memory latest positions
+    LOCATION_WRITE_THROUGH = os.getenv('LOCATION_WRITE_THROUGH', '1') != '0'
+    # Shared secret a fleet gateway sends as "Authorization: Bearer <token>" to post fixes for
+    # any driver; unset, only the OTP-verified driver can post, and only their own fixes
+    LOCATION_GATEWAY_TOKEN = os.getenv('LOCATION_GATEWAY_TOKEN')
+    # Drivers who reported within this many seconds count as active on the fleet map
+    LOCATION_ACTIVE_SECONDS = int(os.getenv('LOCATION_ACTIVE_SECONDS', 600))
+
+    # Driver location retention (see app.trajectories): every fix for this many hours, then
+    # closed trips simplified to within LOCATION_SIMPLIFY_METERS, per-minute points after
+    # LOCATION_MINUTES_AFTER_DAYS and nothing after LOCATION_RETENTION_DAYS. A gap of
+    # LOCATION_TRIP_GAP_MINUTES between fixes ends a trip.
+    LOCATION_FULL_RESOLUTION_HOURS = int(os.getenv('LOCATION_FULL_RESOLUTION_HOURS', 48))
+    LOCATION_SIMPLIFY_METERS = float(os.getenv('LOCATION_SIMPLIFY_METERS', 10))
+    LOCATION_MINUTES_AFTER_DAYS = int(os.getenv('LOCATION_MINUTES_AFTER_DAYS', 14))
+    LOCATION_RETENTION_DAYS = int(os.getenv('LOCATION_RETENTION_DAYS', 180))
+    LOCATION_TRIP_GAP_MINUTES = int(os.getenv('LOCATION_TRIP_GAP_MINUTES', 15))
+
+    # Live tracking stream: minimum gap between pushes to one browser, order events queued per
+    # browser before it is told to resync, and the keepalive interval for idle streams
+    LIVE_PUSH_INTERVAL_MS = int(os.getenv('LIVE_PUSH_INTERVAL_MS', 250))
+    LIVE_MAX_PENDING = int(os.getenv('LIVE_MAX_PENDING', 200))
+    LIVE_HEARTBEAT_SECONDS = int(os.getenv('LIVE_HEARTBEAT_SECONDS', 15))
+
+    # Grid cell size of the geofence index over driver and warehouse positions (see app.spatial)
+    GEOFENCE_CELL_METERS = int(os.getenv('GEOFENCE_CELL_METERS', 250))
+
+    # Applied to every new SQLite connection (see app.database)
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',          # readers don't block the writer
+        'synchronous': 'NORMAL',        # safe with WAL, far fewer fsyncs
+        'busy_timeout': 5000,           # ms to wait for a lock instead of failing
+        'cache_size': -64000,           # 64 MB page cache (negative = KiB)
+        'mmap_size': 268435456,         # 256 MB memory-mapped reads
+        'temp_store': 'MEMORY',
+    }
+
+    # Connection pool for a server database (ignored for SQLite)
+    if not SQLALCHEMY_DATABASE_URI.startswith('sqlite'):
+        SQLALCHEMY_ENGINE_OPTIONS = {
+            'pool_size': int(os.getenv('DB_POOL_SIZE', 10)),
+            'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 20)),
+            'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', 30)),
+            'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+            'pool_pre_ping': True,
+        }
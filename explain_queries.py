@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Print the query plan of every SQL statement the MSME pages run.
+
+Each GET page is requested through the Flask test client as the given
+user; the SELECTs it issues are captured and re-run with EXPLAIN QUERY
+PLAN (plain EXPLAIN on server databases). Look for "SCAN orders" or
+"USE TEMP B-TREE" lines: those are full scans or sorts without an index.
+
+Usage: python explain_queries.py [--user-id ID] [--warehouse-id ID]
+"""
+
+import argparse
+import sys
+import os
+
+# Add the app directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
+
+from sqlalchemy import event, text
+from app import create_app, db
+from app.models import User, Order
+
+# MSME pages to profile, as (endpoint, query args)
+PAGES = [
+    ('msme.dashboard', {}),
+    ('msme.warehouses', {}),
+    ('msme.orders', {}),
+    ('msme.orders', {'order_type': 'incoming'}),
+    ('msme.orders', {'warehouse_id': None}),
+    ('msme.orders', {'warehouse_id': None, 'order_type': 'outgoing'}),
+    ('msme.orders_json', {'cursor': None}),
+    ('msme.inventory', {}),
+    ('msme.analysis', {}),
+]
+
+
+def capture(app, client, url):
+    """SELECT statements (with parameters) issued while serving ``url``"""
+    statements = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    engine = db.engine
+    event.listen(engine, 'before_cursor_execute', on_execute)
+    try:
+        response = client.get(url)
+    finally:
+        event.remove(engine, 'before_cursor_execute', on_execute)
+    return response.status_code, statements
+
+
+def explain(statement, parameters):
+    connection = db.session.connection().connection.driver_connection
+    cursor = connection.cursor()
+    prefix = 'EXPLAIN QUERY PLAN ' if db.engine.dialect.name == 'sqlite' else 'EXPLAIN '
+    cursor.execute(prefix + statement, parameters)
+    rows = cursor.fetchall()
+    cursor.close()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='EXPLAIN the queries behind each MSME page')
+    parser.add_argument('--user-id', type=int, help='User to log in as (default: the one with most orders)')
+    parser.add_argument('--warehouse-id', type=int, help='Warehouse for the filtered pages (default: the user\'s first)')
+    args = parser.parse_args()
+
+    app = create_app()
+    app.config['WTF_CSRF_ENABLED'] = False
+
+    with app.app_context():
+        user_id = args.user_id or db.session.execute(
+            text('SELECT user_id FROM orders GROUP BY user_id ORDER BY COUNT(*) DESC LIMIT 1')
+        ).scalar()
+        user = db.session.get(User, user_id) if user_id else None
+        if not user:
+            print("No user with orders found. Please create sample data first.")
+            return
+        warehouse_id = args.warehouse_id or (user.warehouses[0].id if user.warehouses else None)
+        oldest = Order.query.filter_by(user_id=user.id).order_by(Order.created_at.desc(), Order.id.desc()).offset(50).first()
+        cursor = f"{oldest.created_at.isoformat()}~{oldest.id}" if oldest else ''
+
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user.id)
+            session['_fresh'] = True
+
+        print(f"Profiling as {user.name} (user {user.id}), warehouse {warehouse_id}")
+        with app.test_request_context():
+            from flask import url_for
+            urls = []
+            for endpoint, page_args in PAGES:
+                page_args = dict(page_args)
+                if 'warehouse_id' in page_args:
+                    page_args['warehouse_id'] = warehouse_id
+                if 'cursor' in page_args:
+                    page_args['cursor'] = cursor
+                urls.append(url_for(endpoint, **page_args))
+
+        for url in urls:
+            status, statements = capture(app, client, url)
+            print(f"\n=== GET {url} -> {status}, {len(statements)} SELECT(s)")
+            for statement, parameters in statements:
+                print("\n  " + " ".join(statement.split())[:200])
+                for row in explain(statement, parameters):
+                    print(f"    {row[-1] if db.engine.dialect.name == 'sqlite' else row}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Generate a production-sized dataset for load testing the MSME pages.
+
+Creates N users x M warehouses, a pool of drivers per user, any number of
+orders and driver location points. Rows are built in batches and written
+with Core executemany inserts; the order rollups and stock ledger are
+rebuilt at the end with one set-based pass each (bulk inserts skip the ORM
+events that normally maintain them). The whole run is one transaction,
+so an interrupted run leaves nothing behind.
+
+The same --seed always produces the same data. Distributions are skewed
+the way real traffic is: order volume grows over the period and dips on
+Sundays, most orders are booked in business hours a few days ahead,
+priorities lean to Medium/Low, and each user's first warehouse is busiest.
+
+Usage: python generate_scale_data.py --users 10 --warehouses 5 --orders 1000000 --locations 2000000
+"""
+
+import argparse
+import random
+import sys
+import os
+import time
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+# Add the app directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
+
+from sqlalchemy import bindparam, func, insert, select
+from app import create_app, db
+from app.analytics import rebuild_rollups
+from app.inventory import rebuild_inventory
+from app.models import User, Warehouse, Order, Driver, DriverLocation
+from app.orders import format_warehouse_address
+
+CITIES = [
+    # (city, state, latitude, longitude)
+    ("Gurgaon", "Haryana", 28.4595, 77.0266),
+    ("Mumbai", "Maharashtra", 19.0760, 72.8777),
+    ("Bangalore", "Karnataka", 12.9716, 77.5946),
+    ("Chennai", "Tamil Nadu", 13.0827, 80.2707),
+    ("Hyderabad", "Telangana", 17.3850, 78.4867),
+    ("Ahmedabad", "Gujarat", 23.0225, 72.5714),
+    ("Pune", "Maharashtra", 18.5204, 73.8567),
+    ("Noida", "Uttar Pradesh", 28.5355, 77.3910),
+]
+STREETS = ["Industrial Area", "Business Park", "Tech Hub", "Export Zone", "Logistics Park",
+           "Distribution Center", "Warehouse Complex", "Manufacturing Complex", "Market Road", "MIDC"]
+
+PACKAGE_NAMES = [
+    "Electronics Components", "Textile Materials", "Automotive Parts", "Pharmaceutical Supplies",
+    "Food Products", "Construction Materials", "Machinery Equipment", "Chemical Products",
+    "Furniture Items", "Clothing & Apparel", "Books & Stationery", "Sports Equipment",
+    "Medical Devices", "Agricultural Products", "Industrial Tools",
+]
+
+
+def distribution(values, weights):
+    """Values with cumulative weights, so each draw skips re-summing them"""
+    return values, list(accumulate(weights))
+
+
+PACKAGE_TYPES = distribution(["Regular", "Heavy", "Fragile", "Solid", "Liquid", "Hazardous"], [40, 20, 15, 15, 7, 3])
+PRIORITIES = distribution(["Medium", "Low", "High", "Urgent"], [45, 30, 18, 7])
+ORDER_TYPES = distribution(["outgoing", "incoming"], [60, 40])
+TIME_SLOTS = distribution(["09:00-12:00", "12:00-15:00", "15:00-18:00", "18:00-21:00"], [35, 30, 25, 10])
+# Days between booking and the scheduled date
+LEAD_DAYS = distribution([0, 1, 2, 3, 5, 7, 14], [12, 30, 25, 15, 10, 5, 3])
+# Hour the order is booked
+BOOKING_HOURS = distribution(list(range(7, 22)), [2, 6, 10, 12, 12, 10, 8, 9, 10, 9, 6, 4, 3, 2, 1])
+
+LOGISTIC_COMPANIES = [
+    "Blue Dart Express", "DTDC Courier", "FedEx India", "DHL Express", "Professional Couriers",
+    "Gati Express", "Safexpress", "Delhivery", "Ecom Express", "Trackon Courier",
+]
+
+
+def weighted(rng, options):
+    values, cum_weights = options
+    return rng.choices(values, cum_weights=cum_weights)[0]
+
+
+def phone(rng):
+    return f"+91{rng.randint(7000000000, 9999999999)}"
+
+
+def insert_batches(table, rows, batch_size):
+    """executemany ``rows`` (any iterable of dicts) in batches; returns the row count"""
+    total = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            db.session.execute(insert(table), batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(table), batch)
+        total += len(batch)
+    return total
+
+
+def create_users(rng, args, now):
+    rows = []
+    for i in range(args.users):
+        company = f"{rng.choice(['Shree', 'Apex', 'Metro', 'Global', 'Sunrise', 'Prime'])} {rng.choice(['Industries', 'Traders', 'Exports', 'Textiles', 'Foods'])} {i + 1}"
+        rows.append({
+            "email": f"{args.prefix}-{args.seed}-{i + 1}@example.com",
+            "name": company,
+            "company_name": company,
+            "phone": phone(rng),
+            "created_at": now - timedelta(days=args.days + rng.randint(0, 90)),
+        })
+    return db.session.execute(insert(User).returning(User.id, User.email), rows).all()
+
+
+def create_warehouses(rng, args, user_ids, now):
+    rows = []
+    for user_id in user_ids:
+        for i in range(args.warehouses):
+            city, state, latitude, longitude = rng.choice(CITIES)
+            rows.append({
+                "user_id": user_id,
+                "name": f"{city} Warehouse {i + 1}",
+                "address": f"{rng.randint(1, 999)} {rng.choice(STREETS)}, {city}",
+                "city": city,
+                "state": state,
+                "pincode": f"{rng.randint(110001, 799999)}",
+                # Somewhere within ~5 km of the city centre
+                "latitude": round(latitude + rng.uniform(-0.05, 0.05), 6),
+                "longitude": round(longitude + rng.uniform(-0.05, 0.05), 6),
+                "contact_person": f"Manager {rng.randint(100, 999)}",
+                "contact_phone": phone(rng),
+                "is_active": True,
+                "created_at": now - timedelta(days=args.days),
+            })
+    db.session.execute(insert(Warehouse), rows)
+
+    warehouses = {}
+    for warehouse in Warehouse.query.filter(Warehouse.user_id.in_(user_ids)).order_by(Warehouse.id):
+        warehouses.setdefault(warehouse.user_id, []).append(warehouse)
+    for user_id, user_warehouses in warehouses.items():
+        db.session.execute(User.__table__.update().where(User.id == user_id)
+                           .values(current_warehouse_id=user_warehouses[0].id))
+    return warehouses
+
+
+def create_drivers(rng, args, now):
+    # Phone numbers continue after the highest existing driver so the unique index never clashes
+    start = (db.session.execute(select(func.max(Driver.id))).scalar() or 0) + 1
+    rows = []
+    for i in range(args.users * args.drivers):
+        number = f"6{rng.randint(0, 9)}{start + i:08d}"
+        rows.append({
+            "name": f"Driver {start + i}",
+            "phone": number,
+            "phone_normalized": number,
+            "truck_no": f"{rng.choice(['DL', 'MH', 'KA', 'TN', 'TS', 'GJ', 'UP'])}{rng.randint(1, 99):02d}AB{rng.randint(1000, 9999)}",
+            "is_active": True,
+            "created_at": now - timedelta(days=args.days),
+        })
+    return db.session.execute(insert(Driver).returning(Driver.id), rows).scalars().all()
+
+
+def order_rows(rng, args, warehouses, driver_ids, now):
+    """Orders for every user, generated lazily so millions of rows never sit in memory at once"""
+    user_ids = list(warehouses)
+    drivers_per_user = args.drivers
+    for n in range(args.orders):
+        index = n % len(user_ids)
+        user_id = user_ids[index]
+        user_warehouses = warehouses[user_id]
+        user_drivers = driver_ids[index * drivers_per_user:(index + 1) * drivers_per_user]
+
+        # Volume grows over the period: more orders closer to now, fewer on Sundays
+        while True:
+            created = now - timedelta(days=args.days - rng.triangular(0, args.days, args.days))
+            if created.weekday() != 6 or rng.random() < 0.3:
+                break
+        hour = weighted(rng, BOOKING_HOURS)
+        created = created.replace(hour=hour, minute=rng.randint(0, 59), second=rng.randint(0, 59), microsecond=0)
+
+        warehouse = rng.choices(user_warehouses, [1 / (i + 1) for i in range(len(user_warehouses))])[0]
+        order_type = weighted(rng, ORDER_TYPES)
+        city, _, _, _ = rng.choice(CITIES)
+        other_end = f"{rng.randint(1, 999)} {rng.choice(STREETS)}, {city}"
+        package_name = rng.choice(PACKAGE_NAMES)
+        yield {
+            "user_id": user_id,
+            "warehouse_id": warehouse.id,
+            "pickup_address": other_end if order_type == "incoming" else format_warehouse_address(warehouse),
+            "delivery_address": format_warehouse_address(warehouse) if order_type == "incoming" else other_end,
+            "supplier_name": f"Supplier {rng.randint(1000, 9999)}",
+            "supplier_phone": phone(rng),
+            "customer_name": f"Customer {rng.randint(1000, 9999)}",
+            "customer_phone": phone(rng),
+            "package_name": package_name,
+            "package_priority": weighted(rng, PRIORITIES),
+            "quantity": min(int(rng.lognormvariate(2.5, 0.9)) + 1, 1000),
+            "package_type": weighted(rng, PACKAGE_TYPES),
+            "package_description": f"Package description for {package_name}",
+            "order_type": order_type,
+            "logistic_company": rng.choice(LOGISTIC_COMPANIES),
+            "driver_id": rng.choice(user_drivers),
+            "date": (created + timedelta(days=weighted(rng, LEAD_DAYS))).date(),
+            "time_slot": weighted(rng, TIME_SLOTS),
+            "created_at": created,
+        }
+
+
+def location_rows(rng, args, driver_ids, now, last_fixes):
+    """GPS trails: each driver random-walks out of a city, reporting every 30 seconds.
+
+    Each driver's final fix time is recorded in ``last_fixes``.
+    """
+    if not driver_ids:
+        return
+    per_driver, extra = divmod(args.locations, len(driver_ids))
+    for i, driver_id in enumerate(driver_ids):
+        points = per_driver + (1 if i < extra else 0)
+        _, _, latitude, longitude = rng.choice(CITIES)
+        timestamp = now - timedelta(seconds=30 * points)
+        heading_lat, heading_lng = rng.uniform(-1, 1), rng.uniform(-1, 1)
+        for _ in range(points):
+            # Mostly keep heading, occasionally turn
+            if rng.random() < 0.05:
+                heading_lat, heading_lng = rng.uniform(-1, 1), rng.uniform(-1, 1)
+            latitude += heading_lat * 0.0015 + rng.gauss(0, 0.0002)
+            longitude += heading_lng * 0.0015 + rng.gauss(0, 0.0002)
+            timestamp += timedelta(seconds=30)
+            yield {
+                "driver_id": driver_id,
+                "latitude": round(latitude, 6),
+                "longitude": round(longitude, 6),
+                "accuracy": round(rng.uniform(3, 25), 1),
+                "timestamp": timestamp,
+            }
+        if points:
+            last_fixes[driver_id] = timestamp
+
+
+def set_last_location_updates(last_fixes):
+    """Stamp each driver with the time of their final fix, as live ingest does"""
+    drivers = Driver.__table__
+    if last_fixes:
+        db.session.execute(
+            drivers.update().where(drivers.c.id == bindparam("driver_id")).values(last_location_update=bindparam("at")),
+            [{"driver_id": driver_id, "at": at} for driver_id, at in last_fixes.items()],
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate load-test data at production scale')
+    parser.add_argument('--users', type=int, default=10, help='MSME users to create')
+    parser.add_argument('--warehouses', type=int, default=5, help='Warehouses per user')
+    parser.add_argument('--drivers', type=int, default=50, help='Drivers per user')
+    parser.add_argument('--orders', type=int, default=100000, help='Orders in total, spread over the users')
+    parser.add_argument('--locations', type=int, default=100000, help='Driver location points in total')
+    parser.add_argument('--days', type=int, default=365, help='Period the orders are spread over, ending today')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed; the same seed gives the same data')
+    parser.add_argument('--prefix', default='loadtest', help='Email prefix for generated users')
+    parser.add_argument('--batch-size', type=int, default=5000, help='Rows per executemany')
+    args = parser.parse_args()
+    if args.users < 1 or args.warehouses < 1 or args.drivers < 1:
+        parser.error('--users, --warehouses and --drivers must be at least 1')
+
+    app = create_app()
+    rng = random.Random(args.seed)
+    # Fixed to midnight so a seed reproduces the same timestamps all day
+    now = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+    with app.app_context():
+        if User.query.filter(User.email.like(f"{args.prefix}-{args.seed}-%")).first():
+            print(f"❌ Data for seed {args.seed} already exists. Use another --seed or --prefix.")
+            return
+
+        started = time.time()
+        users = create_users(rng, args, now)
+        user_ids = [user_id for user_id, _ in users]
+        warehouses = create_warehouses(rng, args, user_ids, now)
+        driver_ids = create_drivers(rng, args, now)
+        print(f"✅ {len(users)} users, {sum(len(w) for w in warehouses.values())} warehouses, {len(driver_ids)} drivers")
+
+        count = insert_batches(Order.__table__, order_rows(rng, args, warehouses, driver_ids, now), args.batch_size)
+        print(f"✅ {count} orders ({time.time() - started:.1f}s)")
+
+        last_fixes = {}
+        count = insert_batches(DriverLocation.__table__, location_rows(rng, args, driver_ids, now, last_fixes),
+                               args.batch_size)
+        set_last_location_updates(last_fixes)
+        print(f"✅ {count} driver locations ({time.time() - started:.1f}s)")
+
+        rebuild_rollups()
+        rebuild_inventory()
+        # Commits the whole run: everything above is still one open transaction
+        db.session.commit()
+        print(f"🎉 Done in {time.time() - started:.1f}s (rollups and inventory rebuilt)")
+
+
+if __name__ == "__main__":
+    main()
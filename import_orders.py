@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Bulk-import orders from a CSV file or JSON array for one MSME user.
+
+Columns are OrderForm's field names (see app/importer.py); rejected rows
+are printed with their errors and don't stop the rest of the import.
+
+Usage: python import_orders.py FILE --email USER_EMAIL [--batch-size N]
+"""
+
+import argparse
+import json
+import sys
+import os
+
+# Add the app directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
+
+from app import create_app
+from app.importer import import_orders, read_rows
+from app.models import User
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk-import orders from CSV or JSON')
+    parser.add_argument('file', help='CSV file, or JSON file holding an array of orders')
+    parser.add_argument('--email', required=True, help='Email of the MSME user the orders belong to')
+    parser.add_argument('--batch-size', type=int, help='Orders per insert batch (default: IMPORT_BATCH_SIZE)')
+    args = parser.parse_args()
+
+    app = create_app()
+
+    with app.app_context():
+        user = User.query.filter_by(email=args.email).first()
+        if not user:
+            print(f"❌ No user with email {args.email}")
+            sys.exit(1)
+
+        with open(args.file, 'rb') as f:
+            try:
+                rows = read_rows(f.read(), args.file)
+            except ValueError as e:
+                print(f"❌ Could not read {args.file}: {e}")
+                sys.exit(1)
+
+        print(f"Importing {len(rows)} rows for {user.name}")
+        batch_size = args.batch_size or app.config['IMPORT_BATCH_SIZE']
+        for event in import_orders(user, rows, batch_size):
+            if 'errors' in event:
+                print(f"  row {event['row']}: {json.dumps(event['errors'])}")
+            elif 'error' in event:
+                print(f"  ❌ rows {event['rows'][0]}-{event['rows'][1]} failed: {event['error']}")
+            elif 'rows' in event:
+                print(f"  rows {event['rows'][0]}-{event['rows'][1]}: {event['imported']} imported")
+            else:
+                print(f"✅ Imported {event['imported']} orders, {event['failed']} rows failed")
+
+
+if __name__ == "__main__":
+    main()
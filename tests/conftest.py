@@ -0,0 +1,59 @@
+import pytest
+from datetime import date, datetime, timedelta
+
+from config import Config
+
+
+@pytest.fixture
+def app(monkeypatch):
+    """The app on a fresh in-memory SQLite database"""
+    monkeypatch.setattr(Config, 'SQLALCHEMY_DATABASE_URI', 'sqlite://')
+    monkeypatch.setattr(Config, 'WTF_CSRF_ENABLED', False, raising=False)
+    from app import create_app, db
+    app = create_app()
+    app.config['TESTING'] = True
+    yield app
+    # The in-memory database goes with the engine
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def user(app):
+    """An MSME user with two warehouses (the first selected) and 20 orders, each with its own driver"""
+    from app import db
+    from app.models import Driver, Order, User, Warehouse
+    with app.app_context():
+        user = User(email='msme@example.com', name='Test MSME')
+        db.session.add(user)
+        db.session.flush()
+        warehouses = [Warehouse(name=f'Warehouse {i}', address=f'{i} Main Road', city='Delhi', state='DL',
+                                pincode='110001', user_id=user.id) for i in range(2)]
+        db.session.add_all(warehouses)
+        db.session.flush()
+        user.current_warehouse_id = warehouses[0].id
+        for i in range(20):
+            driver = Driver(name=f'Driver {i}', phone=f'98{i:08d}')
+            db.session.add(driver)
+            db.session.flush()
+            db.session.add(Order(
+                user_id=user.id, warehouse_id=warehouses[i % 2].id, driver_id=driver.id,
+                pickup_address='Pickup', delivery_address='Delivery', package_name='Bolts',
+                package_priority='High', quantity=i + 1, package_type='Regular',
+                order_type='incoming' if i % 3 else 'outgoing', logistic_company='DHL',
+                date=date.today() + timedelta(days=i - 10), time_slot='10-12',
+                created_at=datetime.now() - timedelta(hours=i),
+            ))
+        db.session.commit()
+        return user.id
+
+
+@pytest.fixture
+def client(app, user):
+    """Test client logged in as ``user``"""
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user)
+        session['_fresh'] = True
+    return client
@@ -0,0 +1,22 @@
+from sqlalchemy import event
+
+from app import db
+
+
+def test_dashboard_statement_count(app, client):
+    """The dashboard costs 4 statements: the login user, the counters,
+    recent orders with their drivers, and the warehouse list"""
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', count)
+        try:
+            response = client.get('/msme/')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count)
+
+    assert response.status_code == 200
+    assert len(statements) == 4, "\n\n".join(statements)
@@ -0,0 +1,49 @@
+from datetime import date
+
+from sqlalchemy import func, select
+
+from app import db, importer
+from app.models import Driver, Order, User
+
+
+def import_rows(count, first_phone=9999900000):
+    return [{
+        'order_type': 'outgoing', 'delivery_address': f'{i} Market Road', 'package_name': 'Bolts',
+        'package_priority': 'High', 'quantity': '3', 'package_type': 'Regular', 'logistic_company': 'DHL',
+        'driver_name': f'Import Driver {i}', 'driver_phone': str(first_phone + i), 'date': date.today().isoformat(),
+        'time_slot': '09:00-12:00',
+    } for i in range(count)]
+
+
+def counts():
+    return (db.session.execute(select(func.count(Driver.id))).scalar(),
+            db.session.execute(select(func.count(Order.id))).scalar())
+
+
+def test_failed_batch_leaves_no_drivers(app, user, monkeypatch):
+    def fail_second_batch(connection, orders, sign):
+        if orders[0]['delivery_address'].startswith('2 '):
+            raise RuntimeError('batch failed')
+
+    monkeypatch.setattr(importer, 'apply_orders', fail_second_batch)
+    with app.app_context():
+        drivers_before, orders_before = counts()
+        events = list(importer.import_orders(db.session.get(User, user), import_rows(4), batch_size=2))
+
+        assert events[-1] == {'imported': 2, 'failed': 2}
+        # Only the first batch's drivers and orders remain
+        assert counts() == (drivers_before + 2, orders_before + 2)
+
+
+def test_imported_orders_reach_live_viewers(app, user):
+    with app.app_context():
+        msme = db.session.get(User, user)
+        subscriber = app.extensions['live_hub'].subscribe(msme.id, [msme.current_warehouse_id], [])
+        events = list(importer.import_orders(msme, import_rows(3), batch_size=2))
+
+        assert events[-1] == {'imported': 3, 'failed': 0}
+        _, published, _ = subscriber.drain()
+        assert [(name, payload['change'], payload['package_name']) for name, payload in published] == [
+            ('order', 'created', 'Bolts')] * 3
+        # The viewer now also follows the new drivers
+        assert len(subscriber.driver_ids) == 3
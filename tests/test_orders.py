@@ -0,0 +1,67 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+
+from app import db, orders
+from app.models import Driver, Order, User, Warehouse
+
+DRIVER = {'name': 'New Driver', 'phone': '+91 99999 00001', 'truck_no': 'DL01AB1234'}
+
+
+def order_fields(**overrides):
+    fields = dict(pickup_address='Pickup', delivery_address='Delivery', package_name='Bolts',
+                  package_priority='High', quantity=5, package_type='Regular', logistic_company='DHL',
+                  date=date.today(), time_slot='10-12')
+    fields.update(overrides)
+    return fields
+
+
+def drivers_with_phone(phone):
+    return db.session.execute(
+        select(func.count(Driver.id)).where(Driver.phone_normalized == orders.normalize_phone(phone))).scalar()
+
+
+def test_failed_order_leaves_no_driver(app, user):
+    with app.app_context():
+        msme = db.session.get(User, user)
+        warehouse = db.session.get(Warehouse, msme.current_warehouse_id)
+        order_count = db.session.execute(select(func.count(Order.id))).scalar()
+
+        with pytest.raises(IntegrityError):
+            orders.create_order(msme, warehouse, DRIVER, **order_fields(package_name=None))
+
+        assert drivers_with_phone(DRIVER['phone']) == 0
+        assert db.session.execute(select(func.count(Order.id))).scalar() == order_count
+
+
+def test_driver_created_concurrently_is_reused(app, user, monkeypatch):
+    """A driver inserted by another request after our lookup loses on the unique index; the retry uses theirs"""
+    with app.app_context():
+        msme = db.session.get(User, user)
+        warehouse = db.session.get(Warehouse, msme.current_warehouse_id)
+        existing = Driver(name='Other MSME Driver', phone='9999900001', phone_normalized='9999900001')
+        db.session.add(existing)
+        db.session.commit()
+
+        real_upsert = orders.upsert_driver
+        calls = []
+
+        def stale_lookup(name, phone, truck_no=None):
+            calls.append(phone)
+            if len(calls) == 1:
+                # As if the lookup ran before the other request committed
+                driver = Driver(name=name, phone=phone, truck_no=truck_no, phone_normalized=orders.normalize_phone(phone))
+                db.session.add(driver)
+                return driver
+            return real_upsert(name, phone, truck_no)
+
+        monkeypatch.setattr(orders, 'upsert_driver', stale_lookup)
+        order = orders.create_order(msme, warehouse, DRIVER, **order_fields())
+
+        assert len(calls) == 2
+        assert order.driver_id == existing.id
+        assert drivers_with_phone(DRIVER['phone']) == 1
+        assert existing.name == 'Other MSME Driver'
+        assert existing.truck_no == DRIVER['truck_no']
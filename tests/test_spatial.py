@@ -0,0 +1,40 @@
+import time
+
+from app.locations import Position
+from app.spatial import Geofence
+
+
+def fenced_driver():
+    """A geofence with warehouse 1 in Delhi and driver 7 standing at it"""
+    geofence = Geofence()
+    geofence.set_warehouse(1, 28.6, 77.2)
+    events = geofence.update([Position(7, 28.6, 77.2, 5.0, time.time())])
+    assert [(e["change"], e["zone"]) for e in events] == [("enter", "Warehouse Zone")]
+    return geofence
+
+
+def test_moving_a_warehouse_rezones_its_drivers():
+    geofence = fenced_driver()
+
+    # About 300 m north: the driver is now in the buffer ring
+    events = geofence.set_warehouse(1, 28.6027, 77.2)
+
+    assert [(e["change"], e["driver_id"], e["zone"]) for e in events] == [
+        ("exit", 7, "Warehouse Zone"), ("enter", 7, "Buffer Zone")]
+    assert geofence.zones([7]) == [{"driver_id": 7, "warehouse_id": 1, "zone": "Buffer Zone"}]
+    assert geofence.zone_of(7)["zone"] == "Buffer Zone"
+
+
+def test_removing_a_warehouse_drops_its_memberships():
+    geofence = fenced_driver()
+
+    events = geofence.set_warehouse(1, None, None)
+
+    assert [(e["change"], e["driver_id"], e["warehouse_id"]) for e in events] == [("exit", 7, 1)]
+    assert geofence.zones([7]) == []
+    assert geofence.zone_of(7) is None
+
+
+def test_unchanged_warehouse_sends_no_events():
+    geofence = fenced_driver()
+    assert geofence.set_warehouse(1, 28.6, 77.2) == []